@@ -1,23 +1,106 @@
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
-from typing import List
+from typing import List, Optional
 
+from app.core.conditional import conditional_response
 from app.core.database import get_db
+from app.core.responses import ORJSONResponse, json_response
 from app.services.analytics import AnalyticsService
-from app.schemas.common import ForecastResponse, AdviceResponse
+from app.schemas.common import ForecastResponse, AdviceResponse, DashboardResponse
+from app.services.data_version import get_validator
 
 router = APIRouter()
 
-@router.get("/cashflow/{user_id}")
-async def get_cashflow(user_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    return await AnalyticsService.get_cashflow_summary(db, user_id)
+# Reads below answer If-None-Match with 304 after a version lookup (see get_validator),
+# before any aggregate is read or forecast computed. Large payloads are built as
+# plain rows and rendered by orjson (json_response); response_model documents them.
 
-@router.get("/forecast/{user_id}", response_model=ForecastResponse)
-async def get_forecast(user_id: uuid.UUID, days: int = 30, db: AsyncSession = Depends(get_db)):
-    return await AnalyticsService.generate_forecast(db, user_id, days)
+@router.get("/cashflow/{user_id}", response_class=ORJSONResponse)
+async def get_cashflow(user_id: uuid.UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    not_modified = conditional_response(request, response, *await get_validator(db, user_id))
+    if not_modified is not None:
+        return not_modified
+    return json_response(await AnalyticsService.get_cashflow_summary(db, user_id), response)
+
+@router.get("/forecast/{user_id}", response_model=ForecastResponse, response_class=ORJSONResponse)
+async def get_forecast(
+    user_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    days: int = 30,
+    model: Optional[str] = Query(None, description="Forecast model (see /forecast-models); defaults to the user's preference"),
+    granularity: Optional[str] = Query(
+        None,
+        pattern="^(monthly|daily)$",
+        description="'daily' returns exactly `days` daily points. Defaults to daily below 90 days, monthly otherwise"
+    ),
+    db: AsyncSession = Depends(get_db)
+):
+    from app.services.model_registry import resolve_forecaster
+    from app.services.daily_forecasting import DAILY_DEFAULT_BELOW_DAYS, MAX_DAILY_DAYS, DAILY_MODEL_VERSION
+    if granularity is None:
+        granularity = "daily" if days < DAILY_DEFAULT_BELOW_DAYS else "monthly"
+    try:
+        if granularity == "daily":
+            if not 1 <= days <= MAX_DAILY_DAYS:
+                raise ValueError(f"days must be between 1 and {MAX_DAILY_DAYS} for daily forecasts")
+            # The daily projection starts from the current balance
+            balance = await AnalyticsService.get_current_balance(db, user_id)
+            validator = await get_validator(db, user_id, DAILY_MODEL_VERSION, balance)
+        else:
+            validator = await get_validator(db, user_id, (await resolve_forecaster(db, user_id, model)).key)
+        not_modified = conditional_response(request, response, *validator)
+        if not_modified is not None:
+            return not_modified
+
+        if granularity == "daily":
+            return json_response(await AnalyticsService.generate_daily_forecast(db, user_id, days), response)
+        return json_response(await AnalyticsService.generate_forecast(db, user_id, days, model), response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/forecast-models")
+async def list_forecast_models(db: AsyncSession = Depends(get_db)):
+    """Registered forecasting models and their ml_models rows (registered at startup)."""
+    from app.services.model_registry import list_forecasters
+    return await list_forecasters(db)
 
 @router.get("/advice/{user_id}", response_model=List[AdviceResponse])
-async def get_advice(user_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+async def get_advice(user_id: uuid.UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    advice_state = await AnalyticsService.get_advice_state(db, user_id)
+    not_modified = conditional_response(request, response, *await get_validator(db, user_id, *advice_state))
+    if not_modified is not None:
+        return not_modified
     return await AnalyticsService.get_latest_advice(db, user_id)
+
+@router.get("/dashboard/{user_id}", response_model=DashboardResponse, response_class=ORJSONResponse)
+async def get_dashboard(
+    user_id: uuid.UUID,
+    request: Request,
+    response: Response,
+    days: int = 180,
+    model: Optional[str] = Query(None, description="Forecast model (see /forecast-models); defaults to the user's preference"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Cashflow summary, monthly forecast and advice in one response (see AnalyticsService.get_dashboard)."""
+    from app.services.model_registry import resolve_forecaster
+    try:
+        forecaster = await resolve_forecaster(db, user_id, model)
+        advice_state = await AnalyticsService.get_advice_state(db, user_id)
+        not_modified = conditional_response(
+            request, response, *await get_validator(db, user_id, forecaster.key, *advice_state)
+        )
+        if not_modified is not None:
+            return not_modified
+        return json_response(await AnalyticsService.get_dashboard(db, user_id, days, model), response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/forecast-cache/stats")
+async def get_forecast_cache_stats():
+    """Hit/miss/eviction counters of this worker's forecast cache."""
+    from app.services.forecast_cache import forecast_cache
+    from app.services.model_registry import fitted_params_cache
+    return {**forecast_cache.stats(), "fitted_params": fitted_params_cache.stats()}
@@ -1,26 +1,66 @@
 
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from decimal import Decimal
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
+from app.core.conditional import conditional_response
 from app.core.database import get_db
 from app.services.analytics import AnalyticsService
-from app.services.simulation_engine import SimulationEngine
+from app.services.scenarios import ScenarioService, ScenarioNotFound
+from app.schemas.common import (
+    ScenarioCreate, ScenarioUpdate, ScenarioSummary, ScenarioResponse, ScenarioModificationCreate,
+    ScenarioComparison
+)
+from app.services.simulation_engine import SimulationEngine, SAFETY_BUFFER, MC_PATHS, MC_BLOCK_MONTHS
 
 router = APIRouter()
 
-class SimulationRequest(BaseModel):
-    user_id: uuid.UUID
+class SimulationDecision(BaseModel):
     decision_type: str # ONE_TIME, RECURRING, EMI
     amount: Decimal
     start_date: date
     duration_months: Optional[int] = None
     description: Optional[str] = "Simulated Expense"
 
+class SimulationRequest(SimulationDecision):
+    user_id: uuid.UUID
+
+class BatchSimulationRequest(BaseModel):
+    user_id: uuid.UUID
+    decisions: List[SimulationDecision] = Field(..., min_length=1, max_length=1000)
+
+
+class MaxAffordableRequest(BaseModel):
+    user_id: uuid.UUID
+    decision_type: str # ONE_TIME, RECURRING, EMI
+    start_date: date
+    duration_months: Optional[int] = None
+    safety_buffer: float = SAFETY_BUFFER
+
+
+class MonteCarloRequest(BaseModel):
+    user_id: uuid.UUID
+    months: int = Field(24, ge=1, le=120)
+    paths: int = Field(MC_PATHS, ge=100, le=100_000)
+    block_size: int = Field(MC_BLOCK_MONTHS, ge=1, le=12)
+    seed: Optional[int] = None
+    decision: Optional[SimulationDecision] = None
+
+
+def adjust_for_low_data(result: dict) -> dict:
+    """Downgrades a result computed against the zero-growth fallback forecast."""
+    # If mathematically "Safe" (because Balance > Cost), downgrade to "Caution" due to uncertainty
+    if result["recommendation"] == "Safe":
+        result["recommendation"] = "Caution"
+        
+    result["confidence"] = 40
+    result["explanation"] = "Limited historical data. Recommendation based on conservative estimates (zero future growth) + current balance. " + result["explanation"]
+    return result
+
 @router.post("/run")
 async def run_simulation(
     request: SimulationRequest,
@@ -29,56 +69,8 @@ async def run_simulation(
     """
     Runs a financial simulation against the user's forecast.
     """
-    # 1. Get Forecast
-    # Note: effectively re-using logic from analytics
-    # In a real app we might cache the forecast or have a unified call
-    # For now, we regenerate it to ensure freshness.
-    
-    # We need the DATAFRAME, not the formatted response object from AnalyticsService.generate_forecast.
-    # So we call the underlying helpers directly or refactor AnalyticsService to expose the DF.
-    # Refactoring AnalyticsService is cleaner but for speed let's just use helpers.
-    
-    from sqlalchemy import select
-    from app.models.database_schema import Transaction, FinancialAccount
-    from app.services.data_processing import compute_monthly_cashflow
-    from app.services.forecasting import generate_simple_forecast
-    
-    # Fetch Txns
-    q_txn = select(Transaction).where(Transaction.user_id == request.user_id)
-    res_txn = await db.execute(q_txn)
-    txns = res_txn.scalars().all()
-    
-    # Fetch Current Balance (moved up for fallback usage)
-    q_bal = select(FinancialAccount).where(FinancialAccount.user_id == request.user_id)
-    res_bal = await db.execute(q_bal)
-    accounts = res_bal.scalars().all()
-    current_balance = sum((a.current_balance for a in accounts), Decimal(0))
-    
-    hist_df = compute_monthly_cashflow(txns)
-    
-    # NEW: Fallback Logic
-    is_low_data = False
-    
-    # If we have less than 2 months of history, we can't do a trend
-    if len(hist_df) < 2:
-        is_low_data = True
-        # Create dummy forecast: 12 months of 0 net cashflow (conservative)
-        from dateutil.relativedelta import relativedelta
-        import pandas as pd
-        
-        today = date.today()
-        forecast_rows = []
-        for i in range(12):
-            next_month = today + relativedelta(months=i+1)
-            forecast_rows.append({
-                "forecast_month": next_month.strftime("%Y-%m"),
-                "predicted_cashflow": 0.0,
-                "lower_bound": 0.0,
-                "upper_bound": 0.0
-            })
-        forecast_df = pd.DataFrame(forecast_rows)
-    else:
-        forecast_df = generate_simple_forecast(hist_df, months_to_forecast=12) # 1 year lookahead
+    # 1. Get Forecast (cached per user data version) + current balance
+    current_balance, forecast_df, is_low_data = await AnalyticsService.get_simulation_baseline(db, request.user_id)
     
     # Run Simulation
     result = SimulationEngine.simulate_decision(
@@ -92,11 +84,190 @@ async def run_simulation(
     
     # Adjust Confidence if Data was Low
     if is_low_data:
-        # If mathematically "Safe" (because Balance > Cost), downgrade to "Caution" due to uncertainty
-        if result["recommendation"] == "Safe":
-            result["recommendation"] = "Caution"
-            
-        result["confidence"] = 40
-        result["explanation"] = "Limited historical data. Recommendation based on conservative estimates (zero future growth) + current balance. " + result["explanation"]
+        result = adjust_for_low_data(result)
+    
+    return result
+
+@router.post("/batch")
+async def run_batch_simulation(
+    request: BatchSimulationRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Evaluates many candidate decisions in one call.
+    The baseline forecast is built (or read from cache) once and all decisions
+    are evaluated together as a decisions x months matrix.
+    """
+    current_balance, forecast_df, is_low_data = await AnalyticsService.get_simulation_baseline(db, request.user_id)
     
+    decisions = [d.model_dump() for d in request.decisions]
+    results = SimulationEngine.simulate_batch(current_balance, forecast_df, decisions)
+    
+    for decision, result in zip(decisions, results):
+        result["description"] = decision["description"]
+        if is_low_data:
+            adjust_for_low_data(result)
+    
+    return {
+        "current_balance": float(current_balance),
+        "is_low_data": is_low_data,
+        "results": results
+    }
+
+
+@router.post("/max-affordable")
+async def max_affordable(
+    request: MaxAffordableRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Answers "how much can I spend without going below my buffer?" in one call:
+    the largest ONE_TIME amount, RECURRING amount or EMI size that keeps every
+    projected balance at or above the safety buffer over the forecast horizon.
+    """
+    current_balance, forecast_df, is_low_data = await AnalyticsService.get_simulation_baseline(db, request.user_id)
+    
+    result = SimulationEngine.max_affordable_amount(
+        current_balance=current_balance,
+        forecast_df=forecast_df,
+        decision_type=request.decision_type,
+        start_date=request.start_date,
+        duration_months=request.duration_months,
+        safety_buffer=request.safety_buffer
+    )
+    result["current_balance"] = float(current_balance)
+    result["is_low_data"] = is_low_data
+    return result
+
+
+@router.post("/monte-carlo")
+async def run_monte_carlo(
+    request: MonteCarloRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Probabilistic runway: resamples the user's monthly net cashflow history
+    into many balance paths and reports overdraft probability, expected runway
+    and P5/P50/P95 balance bands. Pass `seed` for reproducible results and
+    `decision` to see how a purchase or EMI shifts the overdraft risk.
+    """
+    from app.services.data_processing import fetch_monthly_cashflow
+
+    current_balance = await AnalyticsService.get_current_balance(db, request.user_id)
+    history_df = await fetch_monthly_cashflow(db, request.user_id, exclude_from_forecast=True)
+    if history_df.empty:
+        raise HTTPException(status_code=404, detail="No cashflow history available")
+
+    result = SimulationEngine.monte_carlo(
+        current_balance=current_balance,
+        history_df=history_df,
+        months=request.months,
+        n_paths=request.paths,
+        block_size=request.block_size,
+        seed=request.seed,
+        decision=request.decision.model_dump() if request.decision else None
+    )
+    result["current_balance"] = float(current_balance)
+    # A bootstrap over one or two months can't show much spread
+    result["is_low_data"] = len(history_df) < 2
     return result
+
+
+# ==========================================
+# Persisted Scenarios
+# ==========================================
+async def _scenario_call(coro):
+    """Maps scenario service errors onto HTTP responses."""
+    try:
+        return await coro
+    except ScenarioNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/scenarios", response_model=ScenarioResponse, status_code=201)
+async def create_scenario(request: ScenarioCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Creates a scenario with any number of modifications and stores its projected series.
+    """
+    return await _scenario_call(ScenarioService.create_scenario(db, request))
+
+@router.get("/scenarios", response_model=List[ScenarioSummary])
+async def list_scenarios(
+    request: Request, response: Response, user_id: uuid.UUID = Query(...), db: AsyncSession = Depends(get_db)
+):
+    validator = await ScenarioService.get_validator(db, user_id=user_id)
+    not_modified = conditional_response(request, response, *validator)
+    if not_modified is not None:
+        return not_modified
+    return await ScenarioService.list_scenarios(db, user_id)
+
+@router.get("/compare", response_model=ScenarioComparison)
+async def compare_scenarios(
+    request: Request,
+    response: Response,
+    user_id: uuid.UUID = Query(...),
+    scenario_ids: List[uuid.UUID] = Query([], max_length=50, description="Scenarios to compare against the baseline"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Baseline vs any number of scenarios as aligned balance series in one response,
+    with per-scenario min balance and deltas against the baseline.
+    """
+    scenario_ids = list(dict.fromkeys(scenario_ids))
+    # A computed baseline of a low-data user also depends on today's date
+    validator = await ScenarioService.get_validator(
+        db, user_id=user_id, scenario_ids=scenario_ids, extra=(date.today(),)
+    )
+    not_modified = conditional_response(request, response, *validator)
+    if not_modified is not None:
+        return not_modified
+    return await _scenario_call(ScenarioService.compare(db, user_id, scenario_ids))
+
+@router.get("/scenarios/{scenario_id}", response_model=ScenarioResponse)
+async def get_scenario(
+    scenario_id: uuid.UUID, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
+    """
+    Scenario with its modifications and stored projected series
+    (recomputed first if it is stale, see series_is_fresh).
+    """
+    validator = await ScenarioService.get_validator(db, scenario_ids=[scenario_id])
+    if validator is not None:
+        not_modified = conditional_response(request, response, *validator)
+        if not_modified is not None:
+            return not_modified
+    return await _scenario_call(ScenarioService.get_scenario(db, scenario_id))
+
+@router.patch("/scenarios/{scenario_id}", response_model=ScenarioResponse)
+async def update_scenario(scenario_id: uuid.UUID, request: ScenarioUpdate, db: AsyncSession = Depends(get_db)):
+    return await _scenario_call(ScenarioService.update_scenario(db, scenario_id, request))
+
+@router.delete("/scenarios/{scenario_id}", status_code=204)
+async def delete_scenario(scenario_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    await _scenario_call(ScenarioService.delete_scenario(db, scenario_id))
+
+@router.post("/scenarios/{scenario_id}/modifications", response_model=ScenarioResponse, status_code=201)
+async def add_modification(
+    scenario_id: uuid.UUID, request: ScenarioModificationCreate, db: AsyncSession = Depends(get_db)
+):
+    """
+    Adds one modification; only its cost is applied to the stored series.
+    """
+    return await _scenario_call(ScenarioService.add_modification(db, scenario_id, request))
+
+@router.put("/scenarios/{scenario_id}/modifications/{modification_id}", response_model=ScenarioResponse)
+async def update_modification(
+    scenario_id: uuid.UUID, modification_id: uuid.UUID, request: ScenarioModificationCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Replaces one modification; the stored series is shifted by (new cost - old cost).
+    """
+    return await _scenario_call(ScenarioService.update_modification(db, scenario_id, modification_id, request))
+
+@router.delete("/scenarios/{scenario_id}/modifications/{modification_id}", response_model=ScenarioResponse)
+async def delete_modification(
+    scenario_id: uuid.UUID, modification_id: uuid.UUID, db: AsyncSession = Depends(get_db)
+):
+    return await _scenario_call(ScenarioService.delete_modification(db, scenario_id, modification_id))
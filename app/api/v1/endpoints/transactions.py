@@ -1,38 +1,136 @@
-
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from decimal import Decimal
+from typing import Optional
 import uuid
 
 from app.core.database import get_db
+from app.schemas.common import TransactionDirection, TransactionPage, TransactionSearchResult
 from app.services.ingestion import IngestionService
+from app.services.ingestion_jobs import job_manager
+from app.services.transactions import TransactionService, InvalidCursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.search import SearchService, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
 
 router = APIRouter()
 
+@router.get("", response_model=TransactionPage)
+async def list_transactions(
+    user_id: uuid.UUID = Query(...),
+    account_id: Optional[uuid.UUID] = Query(None),
+    start_date: Optional[date] = Query(None, description="Inclusive"),
+    end_date: Optional[date] = Query(None, description="Inclusive"),
+    category: Optional[str] = Query(None, description="category_primary"),
+    direction: Optional[TransactionDirection] = Query(None),
+    min_amount: Optional[Decimal] = Query(None, ge=0),
+    max_amount: Optional[Decimal] = Query(None, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lists a user's transactions, newest first, filtered by account, date range,
+    category, direction and amount range (amounts are absolute values).
+    Cursor-paginated: every page costs the same, however deep.
+    """
+    try:
+        return await TransactionService.list_transactions(
+            db, user_id,
+            account_id=account_id,
+            start_date=start_date,
+            end_date=end_date,
+            category=category,
+            direction=direction.value if direction else None,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            limit=limit,
+            cursor=cursor,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/search", response_model=TransactionSearchResult)
+async def search_transactions(
+    user_id: uuid.UUID = Query(...),
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find; each matches as a prefix"),
+    start_date: Optional[date] = Query(None, description="Inclusive"),
+    end_date: Optional[date] = Query(None, description="Inclusive"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search over transaction descriptions and merchants, best matches first.
+    Also returns the count and amount totals of every match.
+    """
+    return await SearchService.search_transactions(
+        db, user_id, q, start_date=start_date, end_date=end_date, limit=limit, offset=offset
+    )
+
 @router.post("/upload-csv")
 async def upload_transactions(
+    request: Request,
     user_id: uuid.UUID = Query(..., description="The user to attach transactions to"),
     account_id: uuid.UUID = Form(..., description="The bank account ID these transactions belong to"),
+    stream: bool = Query(False, description="Parse and commit the file in chunks (for very large exports)"),
+    background: bool = Query(False, description="Queue the file as an ingestion job and return 202 right away"),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Ingests a CSV of bank transactions.
     Required Columns: date, description, amount
+
+    With `stream=true` the upload is read chunk by chunk straight from the
+    spooled upload file, so memory stays flat regardless of file size.
+    The response then also carries per-chunk stats.
+
+    With `background=true` the file is spooled to disk and ingested by a
+    background job; the response is 202 with a job id to poll at /jobs/{job_id}.
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files allowed")
-        
-    content = await file.read()
-    
-    if len(content) == 0:
-        raise HTTPException(status_code=400, detail="Empty file")
 
     try:
+        if background:
+            if file.size == 0:
+                raise HTTPException(status_code=400, detail="Empty file")
+            job = await job_manager.submit(file.file, user_id, account_id)
+            return JSONResponse(status_code=202, content={
+                "job_id": str(job.id),
+                "status": job.status,
+                "status_url": str(request.url_for("get_ingestion_job", job_id=job.id)),
+            })
+
+        if stream:
+            if file.size == 0:
+                raise HTTPException(status_code=400, detail="Empty file")
+            return await IngestionService.process_csv_stream(db, user_id, account_id, file.file)
+
+        content = await file.read()
+
+        if len(content) == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+
         result = await IngestionService.process_csv_upload(db, user_id, account_id, content)
         return result
+    except HTTPException:
+        raise
     except ValueError as e:
         # Validation Errors (Missing columns, bad format)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Unexpected Server Errors
         raise HTTPException(status_code=500, detail=f"Internal Processing Error: {str(e)}")
+
+
+@router.get("/jobs/{job_id}", name="get_ingestion_job")
+async def get_ingestion_job(job_id: uuid.UUID):
+    """
+    Progress of a background ingestion job: rows parsed/inserted/skipped, errors and ETA.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
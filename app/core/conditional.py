@@ -0,0 +1,58 @@
+import hashlib
+import datetime
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Clients may keep a copy but must revalidate it (If-None-Match) before each use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Weak ETag over the given validator parts (data versions, model keys, row timestamps...).
+    Weak because equal parts mean an equivalent body, not byte-identical JSON.
+    """
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(moment: datetime.datetime) -> str:
+    """RFC 7231 date; naive datetimes (SQLite CURRENT_TIMESTAMP) are UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(moment.astimezone(datetime.timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime.datetime] = None
+) -> Optional[Response]:
+    """
+    Puts the validators on `response` and returns a bodyless 304 to send
+    instead when the request's If-None-Match already holds `etag`.
+
+    Only If-None-Match is honoured: Last-Modified has one-second resolution,
+    so two changes within a second would make If-Modified-Since unsafe.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=dict(response.headers))
+    return None
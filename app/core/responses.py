@@ -0,0 +1,53 @@
+import json
+from decimal import Decimal
+from typing import Any, List, Optional
+
+import numpy as np
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson doesn't serialize natively, encoded the way pydantic's JSON mode does."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson: dates, datetimes, UUIDs and numpy
+    arrays natively, Decimals as strings and pydantic models through
+    model_dump, so the body matches what a response_model would produce.
+    Renders with the stdlib encoder when orjson isn't installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            from fastapi.encoders import jsonable_encoder
+            content = jsonable_encoder(content, custom_encoder={Decimal: str})
+            return json.dumps(content, separators=(",", ":")).encode()
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """
+    ORJSONResponse for an endpoint's payload, skipping response_model
+    validation. Carries over the headers already set on FastAPI's injected
+    `response` (ETag etc.), which a directly returned Response would drop.
+    """
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def money(values) -> List[str]:
+    """Amounts as 2-decimal strings, the JSON form of the Decimal(f"{x:.2f}") fields they replace."""
+    return [f"{x:.2f}" for x in np.asarray(values, dtype=np.float64).tolist()]
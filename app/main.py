@@ -13,6 +13,10 @@ from fastapi.middleware.cors import CORSMiddleware
 # The following lines are added/modified based on the instruction
 from app.api.v1.endpoints import transactions, analytics, simulation
 
+# gzip / brotli for large responses (forecast series, transaction pages)
+from app.core.compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # Allow frontend origin
@@ -45,6 +49,30 @@ async def on_startup():
         # Create tables if they don't exist
         await conn.run_sync(Base.metadata.create_all)
 
+        # Columns/indexes added to existing tables since the database was created
+        from app.services.migrations import upgrade_schema
+        await upgrade_schema(conn)
+
+        # Full-text index over transactions (FTS5 / tsvector), maintained by the database
+        from app.services.search import ensure_search_index
+        await ensure_search_index(conn)
+
+    # Record every forecasting model in ml_models
+    from app.core.database import AsyncSessionLocal
+    from app.services.model_registry import register_forecasters
+    async with AsyncSessionLocal() as session:
+        await register_forecasters(session)
+
+    # Rollups for transactions written before rollups existed or outside the bulk writer
+    from app.services.rollups import reconcile_monthly_rollups
+    async with AsyncSessionLocal() as session:
+        await reconcile_monthly_rollups(session)
+
+    # Merchant keys (and recurring flags) for rows written before keys existed
+    from app.services.recurring import backfill_merchant_keys
+    async with AsyncSessionLocal() as session:
+        await backfill_merchant_keys(session)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
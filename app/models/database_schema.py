@@ -135,14 +135,56 @@ class Transaction(Base, TimestampMixin):
     is_excluded_from_forecast: Mapped[bool] = mapped_column(Boolean, default=False)
     
     raw_import_data: Mapped[dict] = mapped_column(JSON, default=dict)
+    # SHA-256 of (account, date, amount, normalized description, import ordinal).
+    # Makes CSV re-uploads idempotent; NULL for rows that didn't come from an import.
+    fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
 
     account: Mapped["FinancialAccount"] = relationship(back_populates="transactions")
 
     __table_args__ = (
-        Index('idx_transactions_user_date', 'user_id', 'transaction_date'),
+        # id makes (transaction_date, id) a unique sort key for keyset pagination
+        Index('idx_transactions_user_date', 'user_id', 'transaction_date', 'id'),
+        Index('uq_transactions_fingerprint', 'fingerprint', unique=True),
     )
 
 
+class MonthlyCashflowRollup(Base, TimestampMixin):
+    """
+    Per user/account/month totals, maintained incrementally by ingestion.
+    Lets dashboards read one row per month instead of scanning the ledger.
+    """
+    __tablename__ = "monthly_cashflow_rollups"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    account_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("financial_accounts.id"), primary_key=True)
+    month: Mapped[str] = mapped_column(String(7), primary_key=True)  # YYYY-MM
+
+    income_total: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False, default=0)
+    expense_total: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False, default=0)
+    transfer_total: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False, default=0)
+    income_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    expense_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    transfer_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Portion of the totals above flagged is_excluded_from_forecast
+    excluded_income_total: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False, default=0)
+    excluded_expense_total: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False, default=0)
+    # NULL on rows rolled up before these existed; reconcile_monthly_rollups rebuilds those
+    excluded_income_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, default=0)
+    excluded_expense_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, default=0)
+
+
+class UserDataVersion(Base, TimestampMixin):
+    """
+    Per-user counter bumped whenever the user's ledger changes.
+    Derived data (cached forecasts, HTTP validators) keys off it instead of a TTL.
+    """
+    __tablename__ = "user_data_versions"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class MLModel(Base, TimestampMixin):
     __tablename__ = "ml_models"
 
@@ -179,6 +221,8 @@ class CashflowForecast(Base, TimestampMixin):
     
     confidence_interval_lower: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 4))
     confidence_interval_upper: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 4))
+    # Cash on hand the balances were projected from; a different current balance makes the rows stale
+    starting_balance: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 4))
 
     __table_args__ = (
         Index('idx_forecast_user_scenario_date', 'user_id', 'scenario_id', 'forecast_date'),
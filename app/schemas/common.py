@@ -35,6 +35,29 @@ class TransactionResponse(TransactionBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class TransactionListItem(TransactionBase):
+    id: uuid.UUID
+    currency: str
+    merchant_name: Optional[str] = None
+    is_recurring: bool = False
+    recurring_frequency: Optional[str] = None
+
+class TransactionPage(BaseModel):
+    items: List[TransactionListItem]
+    next_cursor: Optional[str] = None # Pass back as ?cursor= for the next page; None on the last page
+    has_more: bool
+
+class TransactionSearchHit(TransactionListItem):
+    rank: float # Relevance score; BM25 on SQLite (lower is better), ts_rank on PostgreSQL (higher is better)
+
+class TransactionSearchResult(BaseModel):
+    items: List[TransactionSearchHit]
+    # Totals over every match, not just this page
+    total_count: int
+    total_amount: Decimal
+    income_total: Decimal
+    expense_total: Decimal
+
 # ==========================================
 # Forecasts
 # ==========================================
@@ -57,11 +80,54 @@ class ForecastResponse(BaseModel):
 # ==========================================
 class ScenarioModificationCreate(BaseModel):
     name: str
-    amount: Decimal
+    modification_type: str = "ONE_TIME" # ONE_TIME, RECURRING, EMI
+    amount: Decimal # Positive value treated as expense
     start_date: date
-    end_date: Optional[date] = None
+    end_date: Optional[date] = None # Last month a RECURRING/EMI modification applies
+    duration_months: Optional[int] = None # EMI length, alternative to end_date
     # recurring_rule: str ... kept simple for MVP
 
+class ScenarioModificationResponse(ScenarioModificationCreate):
+    id: uuid.UUID
+
+class ScenarioCreate(BaseModel):
+    user_id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    modifications: List[ScenarioModificationCreate] = []
+
+class ScenarioUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+class ScenarioSummary(BaseModel):
+    id: uuid.UUID
+    user_id: uuid.UUID
+    name: str
+    description: Optional[str] = None
+    modification_count: int
+    updated_at: datetime
+
+class ScenarioResponse(ScenarioSummary):
+    modifications: List[ScenarioModificationResponse]
+    forecast: ForecastResponse
+
+class ScenarioComparisonSeries(BaseModel):
+    scenario_id: Optional[uuid.UUID] = None # None for the baseline
+    name: str
+    source: str # "stored" or "computed"
+    balance: List[Optional[float]] # aligned with ScenarioComparison.months
+    delta_vs_baseline: List[Optional[float]]
+    min_balance: Optional[float] = None
+    min_balance_month: Optional[str] = None
+    min_balance_delta: Optional[float] = None # vs the baseline's own minimum
+
+class ScenarioComparison(BaseModel):
+    """Columnar payload: one month axis shared by every series."""
+    user_id: uuid.UUID
+    months: List[str]
+    series: List[ScenarioComparisonSeries]
+
 class SimulationRequest(BaseModel):
     scenario_name: str
     modifications: List[ScenarioModificationCreate]
@@ -83,3 +149,17 @@ class AdviceResponse(BaseModel):
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
+
+# ==========================================
+# Dashboard
+# ==========================================
+class CashflowMonth(BaseModel):
+    month: str
+    income: float
+    expense: float
+    net: float
+
+class DashboardResponse(BaseModel):
+    cashflow: List[CashflowMonth]
+    forecast: ForecastResponse
+    advice: List[AdviceResponse]
@@ -1,37 +1,131 @@
 
 import uuid
 from decimal import Decimal
-from datetime import date, timedelta
-from typing import List
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+import pandas as pd
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.models.database_schema import Transaction, CashflowForecast, FinancialAdvice
-from app.schemas.common import ForecastResponse, ForecastPoint, AdviceResponse
+from app.models.database_schema import Transaction, CashflowForecast, FinancialAdvice, FinancialAccount
+from app.schemas.common import AdviceResponse
 
 class AnalyticsService:
 
+    @staticmethod
+    async def get_forecast_frame(
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        months: int,
+        model: Optional[str] = None,
+        history_df: Optional[pd.DataFrame] = None
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        Monthly forecast frame for a user, served from the forecast cache when possible.
+
+        The model is `model` if given, else the user's preferred model (see
+        model_registry.resolve_forecaster). The cache key includes the model
+        version and the user's data version, which ingestion bumps, so a hit
+        is always exact. On a miss, fresh rows from the nightly batch are used
+        (default model only) before computing from history, reusing this
+        process's fitted parameters for the user when it has them. The
+        returned frame is shared: treat it as read-only.
+
+        `history_df` is the caller's already-fetched forecast history
+        (fetch_monthly_cashflow with exclude_from_forecast=True); when given,
+        a miss computes from it instead of reading history again.
+
+        Returns:
+            (forecast_df, history_months) where history_months is how many months
+            of history the forecast was based on.
+        """
+        from app.services.data_version import get_data_version
+        from app.services.forecast_cache import forecast_cache
+        from app.services.forecasting import forecast_frame, DEFAULT_MODEL
+        from app.services.model_registry import resolve_forecaster, get_fitted_params
+
+        forecaster = await resolve_forecaster(db, user_id, model)
+        version, version_changed_at = await get_data_version(db, user_id)
+        key = (user_id, months, forecaster.key, version)
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Precomputed by the nightly batch (run_batch_forecasts.py)
+        if forecaster.name == DEFAULT_MODEL:
+            from app.services.batch_forecasting import fetch_stored_forecast, MIN_HISTORY_MONTHS
+            stored_df = await fetch_stored_forecast(db, user_id, months, version_changed_at)
+            if stored_df is not None:
+                # The batch only stores users with a full WMA window of history
+                value = (stored_df, MIN_HISTORY_MONTHS)
+                forecast_cache.put(key, value, int(stored_df.memory_usage(deep=True).sum()))
+                return value
+
+        if history_df is None:
+            from app.services.data_processing import fetch_monthly_cashflow
+            history_df = await fetch_monthly_cashflow(db, user_id, exclude_from_forecast=True)
+        params = get_fitted_params(user_id, version, forecaster, history_df) if not history_df.empty else None
+        forecast_df = forecast_frame(history_df, months, forecaster, params)
+
+        value = (forecast_df, len(history_df))
+        forecast_cache.put(key, value, int(forecast_df.memory_usage(deep=True).sum()))
+        return value
+
+    @staticmethod
+    async def get_current_balance(db: AsyncSession, user_id: uuid.UUID) -> Decimal:
+        """Cash on hand across all of the user's accounts."""
+        q_bal = select(FinancialAccount.current_balance).where(FinancialAccount.user_id == user_id)
+        res_bal = await db.execute(q_bal)
+        return sum(res_bal.scalars().all(), Decimal(0))
+
+    @staticmethod
+    async def get_simulation_baseline(db: AsyncSession, user_id: uuid.UUID) -> Tuple[Decimal, pd.DataFrame, bool]:
+        """
+        Everything a simulation runs against: current cash, a 12-month forecast
+        and whether that forecast is a low-data fallback.
+
+        Returns:
+            (current_balance, forecast_df, is_low_data)
+        """
+        current_balance = await AnalyticsService.get_current_balance(db, user_id)
+
+        forecast_df, history_months = await AnalyticsService.get_forecast_frame(db, user_id, 12) # 1 year lookahead
+
+        # If we have less than 2 months of history, we can't do a trend
+        if history_months < 2:
+            # Create dummy forecast: 12 months of 0 net cashflow (conservative)
+            from dateutil.relativedelta import relativedelta
+
+            today = date.today()
+            forecast_rows = []
+            for i in range(12):
+                next_month = today + relativedelta(months=i+1)
+                forecast_rows.append({
+                    "forecast_month": next_month.strftime("%Y-%m"),
+                    "predicted_cashflow": 0.0,
+                    "lower_bound": 0.0,
+                    "upper_bound": 0.0
+                })
+            return current_balance, pd.DataFrame(forecast_rows), True
+
+        return current_balance, forecast_df, False
+
     @staticmethod
     async def get_cashflow_summary(db: AsyncSession, user_id: uuid.UUID) -> List[dict]:
         """
         Aggregates monthly income vs expense history (past 12 months).
         """
-        # 1. Fetch Transactions (last 12 months to roughly now)
-        today = date.today()
-        # Fetch loosely all history or last year. For charts, usually last 12 months.
-        query = select(Transaction).where(
-            Transaction.user_id == user_id
-        ).order_by(Transaction.transaction_date.asc())
-        
-        result = await db.execute(query)
-        transactions = result.scalars().all()
-        
-        # 2. Compute Monthly Cashflow
-        from app.services.data_processing import compute_monthly_cashflow
-        df = compute_monthly_cashflow(transactions)
-        
-        # 3. Format for API
-        # Expected: [{month: "2024-01", income: 5000, expense: 2000, net: 3000}, ...]
+        # 1+2. Monthly Cashflow, aggregated in the database
+        from app.services.data_processing import fetch_monthly_cashflow
+        df = await fetch_monthly_cashflow(db, user_id)
+        return AnalyticsService.format_cashflow(df)
+
+    @staticmethod
+    def format_cashflow(df: pd.DataFrame) -> List[dict]:
+        """
+        API rows for a monthly cashflow frame: the last 12 months as
+        [{month: "2024-01", income: 5000, expense: 2000, net: 3000}, ...].
+        """
         data = []
         # If empty df, return empty list or defaults? Frontend handles empty list.
         
@@ -53,46 +147,106 @@ class AnalyticsService:
 
 
     @staticmethod
-    async def generate_forecast(db: AsyncSession, user_id: uuid.UUID, days: int = 180) -> ForecastResponse:
+    async def generate_forecast(
+        db: AsyncSession, user_id: uuid.UUID, days: int = 180, model: Optional[str] = None
+    ) -> dict:
         """
         Generates a 6-month forecast based on historical transaction data.
+        `model` picks a registered forecaster; defaults to the user's preference.
         """
-        # 1. Fetch Transactions
-        query = select(Transaction).where(
-            Transaction.user_id == user_id,
-            Transaction.is_excluded_from_forecast == False
-        )
-        result = await db.execute(query)
-        transactions = result.scalars().all()
-        
-        # 2. Compute Historical Cashflow
-        from app.services.data_processing import compute_monthly_cashflow
-        history_df = compute_monthly_cashflow(transactions)
-        
-        # 3. Generate Forecast
-        from app.services.forecasting import generate_simple_forecast
+        from app.services.model_registry import resolve_forecaster
+
+        # 1-3. Historical Cashflow + Forecast (cached per user data version)
         # approx months
         mnths = max(1, days // 30)
-        forecast_df = generate_simple_forecast(history_df, months_to_forecast=mnths)
-        
-        # 4. Format for API
-        points = []
-        for _, row in forecast_df.iterrows():
-            # Convert YYYY-MM to date
-            dt = date.fromisoformat(f"{row['forecast_month']}-01")
-            
-            points.append(ForecastPoint(
-                date=dt,
-                balance=Decimal(f"{row['predicted_cashflow']:.2f}"), 
-                income=Decimal(0),
-                expense=Decimal(0),
-                # Map new fields
-                predicted_balance=Decimal(f"{row['predicted_cashflow']:.2f}"),
-                lower_bound=Decimal(f"{row['lower_bound']:.2f}"),
-                upper_bound=Decimal(f"{row['upper_bound']:.2f}")
-            ))
-            
-        return ForecastResponse(scenario_name="Weighted Moving Avg (3M)", data_points=points)
+        forecaster = await resolve_forecaster(db, user_id, model)
+        forecast_df, _ = await AnalyticsService.get_forecast_frame(db, user_id, mnths, forecaster.name)
+        return AnalyticsService.format_forecast(forecast_df, forecaster.label)
+
+    @staticmethod
+    def format_forecast(forecast_df: pd.DataFrame, scenario_name: str) -> dict:
+        """
+        API payload (ForecastResponse shape) for a monthly forecast frame (see
+        get_forecast_frame). Rows are built directly, amounts as the 2-decimal
+        strings the Decimal fields serialize to, without per-point validation.
+        """
+        from app.core.responses import money
+
+        predicted = money(forecast_df["predicted_cashflow"])
+        points = [
+            {
+                "date": date.fromisoformat(f"{month}-01"),
+                "balance": value,
+                "income": "0",
+                "expense": "0",
+                "predicted_balance": value,
+                "lower_bound": lo,
+                "upper_bound": hi,
+            }
+            for month, value, lo, hi in zip(
+                forecast_df["forecast_month"].tolist(), predicted,
+                money(forecast_df["lower_bound"]), money(forecast_df["upper_bound"])
+            )
+        ]
+        return {"scenario_name": scenario_name, "data_points": points}
+
+    @staticmethod
+    async def generate_daily_forecast(db: AsyncSession, user_id: uuid.UUID, days: int) -> dict:
+        """
+        Exactly `days` daily points of projected income, expense and balance
+        (see daily_forecasting.forecast_daily). The flows are cached per user
+        data version; the current balance, which changes without a data
+        version bump, is added after the lookup.
+        """
+        from app.services.daily_forecasting import (
+            fetch_daily_history, forecast_flows, project_balance, DAILY_MODEL_VERSION
+        )
+        from app.services.data_version import get_data_version
+        from app.services.forecast_cache import forecast_cache
+
+        version, _ = await get_data_version(db, user_id)
+        key = (user_id, "daily", days, DAILY_MODEL_VERSION, version)
+        flows = forecast_cache.get(key)
+        if flows is None:
+            anchor, daily, recurring = await fetch_daily_history(db, user_id)
+            flows = forecast_flows(anchor, daily, recurring, days)
+            forecast_cache.put(key, flows, int(flows.memory_usage(deep=True).sum()))
+
+        current_balance = await AnalyticsService.get_current_balance(db, user_id)
+        return AnalyticsService.format_daily_forecast(project_balance(flows, float(current_balance)))
+
+    @staticmethod
+    def format_daily_forecast(forecast_df: pd.DataFrame) -> dict:
+        """API payload (ForecastResponse shape) for a daily forecast frame, built like format_forecast."""
+        from app.core.responses import money
+
+        balance = money(forecast_df["balance"])
+        points = [
+            {
+                "date": d,
+                "balance": bal,
+                "income": inc,
+                "expense": exp,
+                "predicted_balance": bal,
+                "lower_bound": lo,
+                "upper_bound": hi,
+            }
+            for d, inc, exp, bal, lo, hi in zip(
+                forecast_df["date"].tolist(), money(forecast_df["income"]), money(forecast_df["expense"]),
+                balance, money(forecast_df["lower_bound"]), money(forecast_df["upper_bound"])
+            )
+        ]
+        return {"scenario_name": "Daily (day-of-month/weekday + recurring)", "data_points": points}
+
+    @staticmethod
+    async def get_advice_state(db: AsyncSession, user_id: uuid.UUID) -> Tuple[int, Optional[datetime]]:
+        """(count, latest updated_at) of the user's open advice, for HTTP validators."""
+        result = await db.execute(
+            select(func.count(FinancialAdvice.id), func.max(FinancialAdvice.updated_at))
+            .where(FinancialAdvice.user_id == user_id, FinancialAdvice.is_dismissed == False)
+        )
+        count, latest = result.one()
+        return count, latest
 
     @staticmethod
     async def get_latest_advice(db: AsyncSession, user_id: uuid.UUID) -> List[AdviceResponse]:
@@ -106,3 +260,47 @@ class AnalyticsService:
         
         result = await db.execute(query)
         return [AdviceResponse.model_validate(adv) for adv in result.scalars().all()]
+
+    @staticmethod
+    async def get_dashboard(
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        days: int = 180,
+        model: Optional[str] = None,
+        session_factory=None
+    ) -> dict:
+        """
+        Everything the dashboard shows, in one call: the cashflow summary
+        (as get_cashflow_summary), the monthly forecast (as generate_forecast)
+        and the latest advice (as get_latest_advice).
+
+        The monthly aggregates are read once (fetch_monthly_cashflows) and
+        both the summary and the forecast are derived from them. The advice
+        query runs concurrently on its own session from `session_factory`
+        (AsyncSessionLocal by default), since one session can't run two
+        statements at a time.
+        """
+        import asyncio
+        from app.services.data_processing import fetch_monthly_cashflows
+        from app.services.model_registry import resolve_forecaster
+
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal as session_factory
+
+        async def load_advice() -> List[AdviceResponse]:
+            async with session_factory() as advice_db:
+                return await AnalyticsService.get_latest_advice(advice_db, user_id)
+
+        async def load_cashflow_and_forecast() -> Tuple[List[dict], dict]:
+            cashflow_df, history_df = await fetch_monthly_cashflows(db, user_id)
+            forecaster = await resolve_forecaster(db, user_id, model)
+            forecast_df, _ = await AnalyticsService.get_forecast_frame(
+                db, user_id, max(1, days // 30), forecaster.name, history_df=history_df
+            )
+            return (
+                AnalyticsService.format_cashflow(cashflow_df),
+                AnalyticsService.format_forecast(forecast_df, forecaster.label),
+            )
+
+        (cashflow, forecast), advice = await asyncio.gather(load_cashflow_and_forecast(), load_advice())
+        return {"cashflow": cashflow, "forecast": forecast, "advice": advice}
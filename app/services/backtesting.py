@@ -0,0 +1,169 @@
+import time
+import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.services.forecasting import FORECASTERS, Forecaster
+
+# Rolling-origin defaults: train on at least MIN_TRAIN_MONTHS, score the next HORIZON_MONTHS
+MIN_TRAIN_MONTHS = 6
+HORIZON_MONTHS = 3
+
+# Months whose actual is closer to zero than this are left out of MAPE (it blows up near 0)
+MAPE_MIN_ACTUAL = 1.0
+
+# Relative slack before compare_reports() flags a regression
+ACCURACY_TOLERANCE = 0.05
+LATENCY_TOLERANCE = 0.5
+
+
+def synthetic_histories(n_users: int = 50, months: int = 36, seed: int = 0) -> Dict[str, List[np.ndarray]]:
+    """
+    Seeded synthetic monthly net-cashflow histories, grouped by shape:
+    stable salary, trending, yearly seasonal, spiky (bonuses/one-offs) and
+    volatile freelance income.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    datasets = {"stable": [], "trend": [], "seasonal": [], "spiky": [], "volatile": []}
+    for _ in range(n_users):
+        base = rng.uniform(200, 3000)
+        datasets["stable"].append(base + rng.normal(0, base * 0.1, months))
+        datasets["trend"].append(base + rng.uniform(-40, 60) * t + rng.normal(0, base * 0.1, months))
+        datasets["seasonal"].append(
+            base + base * 0.5 * np.sin(2 * np.pi * (t + rng.integers(12)) / 12) + rng.normal(0, base * 0.1, months)
+        )
+        spikes = rng.random(months) < 0.08
+        datasets["spiky"].append(base + rng.normal(0, base * 0.1, months) + spikes * rng.uniform(3, 8) * base)
+        datasets["volatile"].append(rng.normal(base * 0.3, base, months))
+    return datasets
+
+
+def _percentiles(samples_us: List[float]) -> dict:
+    if not samples_us:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(samples_us, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+
+def backtest_model(
+    forecaster: Forecaster,
+    histories: Iterable[np.ndarray],
+    min_train: int = MIN_TRAIN_MONTHS,
+    horizon: int = HORIZON_MONTHS
+) -> dict:
+    """
+    Rolling-origin backtest: for every origin from min_train to len - horizon,
+    fit on the months before it and score the next `horizon` months.
+
+    Returns:
+        mae, mape (%), interval coverage (share of actuals inside
+        [lower, upper]), forecast counts and fit/predict latency percentiles in µs.
+    """
+    abs_errors, pct_errors, covered = [], [], []
+    fit_us, predict_us = [], []
+
+    for values in histories:
+        values = np.asarray(values, dtype=np.float64)
+        for origin in range(min_train, len(values) - horizon + 1):
+            train, actual = values[:origin], values[origin:origin + horizon]
+
+            started = time.perf_counter()
+            params = forecaster.fit(train)
+            fitted = time.perf_counter()
+            prediction, lower, upper = forecaster.predict(params, horizon)
+            predicted = time.perf_counter()
+
+            fit_us.append((fitted - started) * 1e6)
+            predict_us.append((predicted - fitted) * 1e6)
+
+            abs_errors.append(np.abs(actual - prediction))
+            scored = np.abs(actual) >= MAPE_MIN_ACTUAL
+            pct_errors.append(np.abs(actual - prediction)[scored] / np.abs(actual[scored]))
+            covered.append((actual >= lower) & (actual <= upper))
+
+    if not abs_errors:
+        return {"forecasts": 0}
+
+    abs_errors = np.concatenate(abs_errors)
+    pct_errors = np.concatenate(pct_errors)
+    covered = np.concatenate(covered)
+    return {
+        "forecasts": len(fit_us),
+        "points": int(len(abs_errors)),
+        "mae": round(float(abs_errors.mean()), 4),
+        "mape": round(float(pct_errors.mean() * 100), 4) if len(pct_errors) else None,
+        "coverage": round(float(covered.mean()), 4),
+        "fit_us": _percentiles(fit_us),
+        "predict_us": _percentiles(predict_us),
+    }
+
+
+def run_backtest(
+    datasets: Dict[str, List[np.ndarray]],
+    models: Optional[List[str]] = None,
+    min_train: int = MIN_TRAIN_MONTHS,
+    horizon: int = HORIZON_MONTHS
+) -> dict:
+    """
+    Backtests every registered forecaster (or `models`) on every dataset.
+
+    Returns:
+        JSON-serializable report: config, then per model its version, the
+        pooled metrics ("overall") and the metrics per dataset.
+    """
+    names = models or list(FORECASTERS)
+    report = {
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {
+            "min_train_months": min_train,
+            "horizon_months": horizon,
+            "datasets": {name: len(histories) for name, histories in datasets.items()},
+        },
+        "models": {},
+    }
+    every_history = [h for histories in datasets.values() for h in histories]
+    for name in names:
+        forecaster = FORECASTERS[name]
+        report["models"][name] = {
+            "version": forecaster.version,
+            "overall": backtest_model(forecaster, every_history, min_train, horizon),
+            "datasets": {
+                dataset: backtest_model(forecaster, histories, min_train, horizon)
+                for dataset, histories in datasets.items()
+            },
+        }
+    return report
+
+
+def compare_reports(
+    baseline: dict,
+    current: dict,
+    accuracy_tolerance: float = ACCURACY_TOLERANCE,
+    latency_tolerance: float = LATENCY_TOLERANCE
+) -> List[str]:
+    """
+    Regressions of `current` against `baseline` (overall metrics per model):
+    MAE/MAPE up by more than accuracy_tolerance, coverage down by more than
+    accuracy_tolerance (absolute), or fit/predict p95 latency up by more than
+    latency_tolerance. Models missing from either report are skipped.
+    """
+    problems = []
+    for name, model in current["models"].items():
+        before = baseline.get("models", {}).get(name)
+        if before is None:
+            continue
+        old, new = before["overall"], model["overall"]
+
+        for metric in ("mae", "mape"):
+            if old.get(metric) and new.get(metric) is not None and new[metric] > old[metric] * (1 + accuracy_tolerance):
+                problems.append(f"{name}: {metric} {old[metric]} -> {new[metric]}")
+        if old.get("coverage") is not None and new.get("coverage") is not None:
+            if new["coverage"] < old["coverage"] - accuracy_tolerance:
+                problems.append(f"{name}: coverage {old['coverage']} -> {new['coverage']}")
+        for timing in ("fit_us", "predict_us"):
+            old_p95, new_p95 = old.get(timing, {}).get("p95"), new.get(timing, {}).get("p95")
+            if old_p95 and new_p95 and new_p95 > old_p95 * (1 + latency_tolerance):
+                problems.append(f"{name}: {timing} p95 {old_p95} -> {new_p95}")
+    return problems
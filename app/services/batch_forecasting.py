@@ -0,0 +1,293 @@
+import os
+import time
+import uuid
+import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import (
+    CashflowForecast, FinancialAccount, MLModel, MonthlyCashflowRollup, Transaction
+)
+from app.services.forecasting import FORECASTERS, WMA_WEIGHTS, UNCERTAINTY_BAND
+from app.services.model_registry import get_model_id
+from app.services.rollups import included_count
+
+# The batch writes the weighted-moving-average model (the registry default)
+BATCH_FORECASTER = FORECASTERS["wma"]
+
+# Users per page: each page is one grouped rollup query, one forecast pass and
+# one bulk write, so memory is bounded by the page size, not the user count.
+BATCH_PAGE_SIZE = int(os.environ.get("FORECAST_BATCH_PAGE_SIZE", "1000"))
+
+# Horizon written for every user. Covers the 6-month forecast endpoint and the
+# 12-month simulation baseline.
+BATCH_HORIZON_MONTHS = 12
+
+# The batch only stores the 3-month weighted average. Users with less history
+# get the global-mean fallback, which is cheap enough to compute on request.
+MIN_HISTORY_MONTHS = len(WMA_WEIGHTS)
+
+WRITE_BATCH_ROWS = 5_000
+
+
+def forecast_page(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Weighted-moving-average forecast for many users at once.
+
+    Args:
+        history: One row per (user_id, month) with income and expense columns.
+
+    Returns:
+        One row per user with at least MIN_HISTORY_MONTHS months: user_id,
+        last_month_index, income and expense (the WMA of each), and net: the
+        WMA of net cashflow, computed with the same float operations as the
+        forecaster's fit, so it equals the on-demand prediction exactly.
+    """
+    if history.empty:
+        return pd.DataFrame(columns=["user_id", "last_month_index", "income", "expense", "net"])
+
+    # Pages made only of legacy users are concatenated onto an empty (object) frame
+    history = history.astype({"income": float, "expense": float}).sort_values(["user_id", "month"])
+    grouped = history.groupby("user_id", sort=False)
+    from_end = grouped.cumcount(ascending=False)
+    counts = grouped["month"].transform("size")
+
+    window = len(WMA_WEIGHTS)
+    recent = history[(from_end < window) & (counts >= window)].copy()
+    if recent.empty:
+        return pd.DataFrame(columns=["user_id", "last_month_index", "income", "expense", "net"])
+
+    # Each user's last `window` months are consecutive rows, oldest first: (values[-3] * w0) + ... as in fit()
+    net = (recent["income"].to_numpy() - recent["expense"].to_numpy()).reshape(-1, window)
+    level = net[:, 0] * WMA_WEIGHTS[0]
+    for k in range(1, window):
+        level = level + net[:, k] * WMA_WEIGHTS[k]
+
+    # Weight of each row by its position in the user's last 3 months (oldest first)
+    weights = np.asarray(WMA_WEIGHTS)[window - 1 - from_end[recent.index].to_numpy()]
+    recent["income"] = recent["income"].to_numpy() * weights
+    recent["expense"] = recent["expense"].to_numpy() * weights
+
+    page = recent.groupby("user_id", sort=False)[["income", "expense"]].sum()
+    page["net"] = level
+    # Rows are sorted by month, so from_end == 0 is each user's last month
+    last = history.loc[(from_end == 0) & (counts >= window), ["user_id", "month"]].set_index("user_id")["month"]
+    page["last_month_index"] = [int(m[:4]) * 12 + int(m[5:7]) - 1 for m in last.reindex(page.index)]
+    return page.reset_index()[["user_id", "last_month_index", "income", "expense", "net"]]
+
+
+def build_forecast_rows(
+    page: pd.DataFrame,
+    balances: dict,
+    model_id: uuid.UUID,
+    months: int = BATCH_HORIZON_MONTHS
+) -> List[dict]:
+    """
+    Baseline CashflowForecast rows (scenario_id NULL) for a page of forecasts.
+    Balances are computed for the whole page as one (users x months) array.
+    """
+    if page.empty:
+        return []
+
+    steps = np.arange(1, months + 1)
+    # Same rounding as generate_simple_forecast
+    raw = page["net"].to_numpy(dtype=np.float64)
+    band = np.abs(raw) * UNCERTAINTY_BAND
+    start = np.array([float(balances.get(u, 0)) for u in page["user_id"]])
+
+    balance = start[:, None] + np.round(raw, 2)[:, None] * steps
+    lower = start[:, None] + np.round(raw - band, 2)[:, None] * steps
+    upper = start[:, None] + np.round(raw + band, 2)[:, None] * steps
+    month_idx = page["last_month_index"].to_numpy()[:, None] + steps
+
+    rows = []
+    for u, user_id in enumerate(page["user_id"].tolist()):
+        income = Decimal(f"{page['income'].iat[u]:.4f}")
+        expense = Decimal(f"{page['expense'].iat[u]:.4f}")
+        for m, bal, lo, hi in zip(month_idx[u].tolist(), balance[u].tolist(), lower[u].tolist(), upper[u].tolist()):
+            rows.append({
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "scenario_id": None,
+                "generated_by_model_id": model_id,
+                "starting_balance": Decimal(balances.get(user_id, 0)),
+                "forecast_date": datetime.date(m // 12, m % 12 + 1, 1),
+                "projected_balance": Decimal(f"{bal:.4f}"),
+                "projected_income": income,
+                "projected_expense": expense,
+                "confidence_interval_lower": Decimal(f"{lo:.4f}"),
+                "confidence_interval_upper": Decimal(f"{hi:.4f}"),
+            })
+    return rows
+
+
+async def fetch_page_history(db: AsyncSession, user_ids: List[uuid.UUID]) -> pd.DataFrame:
+    """
+    Monthly income/expense for a page of users, in one grouped rollup query.
+    The excluded totals are subtracted in float after the read, as
+    rollup_cashflow does, so the history matches the on-demand one bit for bit.
+    """
+    r = MonthlyCashflowRollup
+    result = await db.execute(
+        select(
+            r.user_id,
+            r.month,
+            func.sum(r.income_total), func.sum(r.expense_total),
+            func.sum(r.excluded_income_total), func.sum(r.excluded_expense_total),
+        )
+        .where(r.user_id.in_(user_ids))
+        # Same filters as fetch_monthly_rollup: transfer-only months don't count,
+        # nor do months whose rows are all excluded from forecasts
+        .where((r.income_count + r.expense_count) > 0)
+        .group_by(r.user_id, r.month)
+        .having(func.sum(included_count(r)) > 0)
+    )
+    return pd.DataFrame(
+        [
+            (u, m, float(i or 0) - float(xi or 0), float(e or 0) - float(xe or 0))
+            for u, m, i, e, xi, xe in result.all()
+        ],
+        columns=["user_id", "month", "income", "expense"],
+    )
+
+
+async def fetch_legacy_history(db: AsyncSession, user_ids: List[uuid.UUID]) -> pd.DataFrame:
+    """History for users without rollup rows (imported before rollups existed)."""
+    from app.services.data_processing import fetch_monthly_cashflow
+
+    frames = []
+    for user_id in user_ids:
+        df = await fetch_monthly_cashflow(db, user_id, exclude_from_forecast=True)
+        if not df.empty:
+            frames.append(pd.DataFrame({
+                "user_id": user_id,
+                "month": df["month"],
+                "income": df["total_income"].astype(float),
+                "expense": df["total_expense"].astype(float),
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["user_id", "month", "income", "expense"])
+    return pd.concat(frames, ignore_index=True)
+
+
+async def fetch_page_balances(db: AsyncSession, user_ids: List[uuid.UUID]) -> dict:
+    result = await db.execute(
+        select(FinancialAccount.user_id, func.sum(FinancialAccount.current_balance))
+        .where(FinancialAccount.user_id.in_(user_ids))
+        .group_by(FinancialAccount.user_id)
+    )
+    return {u: b or 0 for u, b in result.all()}
+
+
+async def run_batch_forecasts(
+    db: AsyncSession,
+    page_size: int = BATCH_PAGE_SIZE,
+    months: int = BATCH_HORIZON_MONTHS
+) -> dict:
+    """
+    Precomputes the baseline forecast of every user with data into cashflow_forecasts.
+
+    Users are walked in id order over the distinct transactions.user_id
+    values (an index-only scan of ix_transactions_user_id) with keyset
+    pagination. A user_data_versions row only exists once a user's data has
+    changed, so paging over that table would skip users with older data. Each page:
+    1. reads monthly history for the whole page with one grouped query,
+    2. forecasts all of the page's users at once,
+    3. replaces their baseline rows (scenario_id NULL) and commits.
+    Memory stays bounded by the page size regardless of how many users exist.
+
+    Returns:
+        Run stats (pages, users, users_forecast, rows_written, seconds).
+    """
+    started = time.perf_counter()
+    model_id = await get_model_id(db, BATCH_FORECASTER)
+    stats = {"pages": 0, "users": 0, "users_forecast": 0, "legacy_users": 0, "rows_written": 0}
+
+    last_user: Optional[uuid.UUID] = None
+    while True:
+        query = select(Transaction.user_id).distinct().order_by(Transaction.user_id).limit(page_size)
+        if last_user is not None:
+            query = query.where(Transaction.user_id > last_user)
+        user_ids = (await db.execute(query)).scalars().all()
+        if not user_ids:
+            break
+        last_user = user_ids[-1]
+
+        history = await fetch_page_history(db, user_ids)
+        legacy = set(user_ids) - set(history["user_id"])
+        if legacy:
+            stats["legacy_users"] += len(legacy)
+            history = pd.concat([history, await fetch_legacy_history(db, list(legacy))], ignore_index=True)
+
+        page = forecast_page(history)
+        balances = await fetch_page_balances(db, page["user_id"].tolist()) if not page.empty else {}
+        rows = build_forecast_rows(page, balances, model_id, months)
+
+        await db.execute(
+            delete(CashflowForecast)
+            .where(CashflowForecast.user_id.in_(user_ids), CashflowForecast.scenario_id.is_(None))
+        )
+        # Core insert on the table: plain executemany, no ORM bulk bookkeeping
+        for i in range(0, len(rows), WRITE_BATCH_ROWS):
+            await db.execute(insert(CashflowForecast.__table__), rows[i:i + WRITE_BATCH_ROWS])
+        await db.commit()
+
+        stats["pages"] += 1
+        stats["users"] += len(user_ids)
+        stats["users_forecast"] += len(page)
+        stats["rows_written"] += len(rows)
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+async def fetch_stored_forecast(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    months: int,
+    data_changed_at: Optional[datetime.datetime]
+) -> Optional[pd.DataFrame]:
+    """
+    The user's precomputed baseline as a generate_simple_forecast-style frame,
+    or None unless the rows were written by the current batch model version after
+    the user's data last changed and cover `months` months.
+
+    Each month's balance and bounds step by the prediction and band exactly
+    as build_forecast_rows rounded them, so the frame is the one forecast_frame
+    computes on demand. Rows from before starting_balance existed are unused.
+    """
+    f = CashflowForecast
+    result = await db.execute(
+        select(
+            f.forecast_date, f.projected_balance, f.projected_income, f.projected_expense,
+            f.confidence_interval_lower, f.confidence_interval_upper, f.starting_balance, f.created_at,
+        )
+        .join(MLModel, MLModel.id == f.generated_by_model_id)
+        .where(f.user_id == user_id, f.scenario_id.is_(None))
+        .where(MLModel.name == BATCH_FORECASTER.model_name, MLModel.version == BATCH_FORECASTER.version)
+        .order_by(f.forecast_date)
+        .limit(months)
+    )
+    rows = result.all()
+    if len(rows) < months or any(r.starting_balance is None for r in rows):
+        return None
+    if data_changed_at is not None and data_changed_at >= min(r.created_at for r in rows):
+        return None
+
+    # Rows hold cumulative values from the starting balance; each month's own
+    # value is the step from the month before
+    def steps(values):
+        cumulative = np.array([float(v - r.starting_balance) for v, r in zip(values, rows)])
+        return np.round(np.diff(cumulative, prepend=0.0), 2)
+
+    return pd.DataFrame({
+        "forecast_month": [r.forecast_date.strftime("%Y-%m") for r in rows],
+        "predicted_cashflow": steps([r.projected_balance for r in rows]),
+        "lower_bound": steps([r.confidence_interval_lower for r in rows]),
+        "upper_bound": steps([r.confidence_interval_upper for r in rows]),
+    })
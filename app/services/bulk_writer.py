@@ -0,0 +1,161 @@
+import json
+import uuid
+from decimal import Decimal
+from typing import List, Sequence
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import Transaction
+from app.services.rollups import DELTA_SOURCE_COLUMNS, roll_up_written_rows
+from app.services.data_version import bump_data_versions
+
+# Rows written (and committed) per round trip. Large enough to amortize the
+# statement overhead, small enough to keep a single transaction short.
+INSERT_BATCH_SIZE = 5_000
+
+# Column order used for both the Core INSERT and the PostgreSQL COPY path.
+# created_at/updated_at are left to their server defaults.
+TRANSACTION_COLUMNS = [
+    "id", "account_id", "user_id", "amount", "direction", "currency",
+    "description", "merchant_name", "transaction_date", "category_primary",
+    "category_detailed", "tags", "is_recurring",
+    "is_excluded_from_forecast", "raw_import_data", "fingerprint",
+]
+
+# Session-local staging table for the COPY path. Rows are COPY'd here first and
+# then moved with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+STAGING_TABLE = "transactions_stage"
+
+
+def build_transaction_rows(
+    clean: pd.DataFrame,
+    user_id: uuid.UUID,
+    account_id: uuid.UUID
+) -> List[dict]:
+    """
+    Turns a normalized ingestion frame into plain row dicts for bulk writing.
+    Every column in TRANSACTION_COLUMNS is filled explicitly, since COPY does
+    not apply the ORM's Python-side defaults.
+    """
+    return [
+        {
+            "id": uuid.uuid4(),
+            "account_id": account_id,
+            "user_id": user_id,
+            "amount": Decimal(str(amount)),
+            "direction": direction,
+            "currency": "USD",
+            "description": desc,
+            "merchant_name": merchant,
+            "transaction_date": txn_date,
+            "category_primary": primary,
+            "category_detailed": detailed,
+            "tags": [],
+            "is_recurring": False,
+            "is_excluded_from_forecast": False,
+            "raw_import_data": raw_data,
+            "fingerprint": fingerprint,
+        }
+        for txn_date, desc, merchant, primary, detailed, amount, direction, raw_data, fingerprint in zip(
+            clean["transaction_date"],
+            clean["description"],
+            clean["merchant_name"],
+            clean["category_primary"],
+            clean["category_detailed"],
+            clean["amount"],
+            clean["direction"],
+            clean["raw_import_data"],
+            clean["fingerprint"],
+        )
+    ]
+
+
+async def _copy_batch(db: AsyncSession, rows: Sequence[dict]) -> list:
+    """
+    Native bulk load through asyncpg's COPY protocol.
+    COPY has no conflict handling, so rows go through a staging table and are
+    then moved over in one set-based statement that skips known fingerprints.
+    Returns the DELTA_SOURCE_COLUMNS of the rows actually inserted.
+    """
+    conn = await db.connection()
+    await conn.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+        f"(LIKE {Transaction.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    ))
+    raw = await conn.get_raw_connection()
+    records = [
+        tuple(
+            json.dumps(row[col]) if col in ("tags", "raw_import_data") else row[col]
+            for col in TRANSACTION_COLUMNS
+        )
+        for row in rows
+    ]
+    await raw.driver_connection.copy_records_to_table(
+        STAGING_TABLE, records=records, columns=TRANSACTION_COLUMNS
+    )
+    columns = ", ".join(TRANSACTION_COLUMNS)
+    result = await conn.execute(text(
+        f"INSERT INTO {Transaction.__tablename__} ({columns}) "
+        f"SELECT {columns} FROM {STAGING_TABLE} "
+        f"ON CONFLICT (fingerprint) DO NOTHING RETURNING {', '.join(DELTA_SOURCE_COLUMNS)}"
+    ))
+    return result.all()
+
+
+def _insert_skipping_duplicates(db: AsyncSession):
+    """INSERT ... ON CONFLICT (fingerprint) DO NOTHING for the bound dialect, returning what the rollups need."""
+    table = Transaction.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return (
+        dialect.insert(table)
+        .on_conflict_do_nothing(index_elements=["fingerprint"])
+        .returning(*(table.c[col] for col in DELTA_SOURCE_COLUMNS))
+    )
+
+
+def supports_copy(db: AsyncSession) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "asyncpg"
+
+
+async def bulk_insert_transactions(
+    db: AsyncSession,
+    rows: Sequence[dict],
+    batch_size: int = INSERT_BATCH_SIZE
+) -> int:
+    """
+    Writes Transaction rows without going through the ORM unit of work.
+
+    Uses COPY on PostgreSQL (asyncpg) and a Core executemany INSERT elsewhere
+    (SQLAlchemy batches that into multi-row VALUES statements). Rows whose
+    fingerprint already exists are skipped by the database itself via
+    ON CONFLICT DO NOTHING, so there are no per-row lookups. Each batch of
+    `batch_size` rows is committed on its own, together with the monthly
+    rollup updates for the rows it actually inserted (see
+    rollups.roll_up_written_rows) and a bump of the affected users' data
+    versions.
+
+    Returns:
+        Number of rows actually inserted (duplicates excluded).
+    """
+    use_copy = supports_copy(db)
+    stmt = _insert_skipping_duplicates(db)
+    inserted = 0
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if use_copy:
+            written = await _copy_batch(db, batch)
+        else:
+            result = await db.execute(stmt, list(batch))
+            written = result.all()
+        if written:
+            await roll_up_written_rows(db, written)
+            await bump_data_versions(db, (row.user_id for row in written))
+        await db.commit()
+        inserted += len(written)
+
+    return inserted
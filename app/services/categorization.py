@@ -0,0 +1,317 @@
+import os
+import re
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import Transaction, User
+from app.services.data_processing import normalize_direction, normalize_merchant_column
+from app.services.data_version import bump_data_versions
+
+Category = Tuple[Optional[str], Optional[str]]
+
+# (category_primary, category_detailed, keywords). Keywords match whole words of
+# the match text (see match_text); when several match, the leftmost (then longest) wins.
+KEYWORD_RULES = [
+    ("Income", "Salary", ["PAYROLL", "SALARY", "PAYCHECK", "WAGES", "DIRECT DEP", "DIRECT DEPOSIT"]),
+    ("Income", "Interest & Dividends", ["INTEREST", "DIVIDEND"]),
+    ("Income", "Refunds", ["REFUND", "REVERSAL", "CASHBACK", "CASH BACK", "REBATE"]),
+    ("Housing", "Rent", ["RENT", "LEASE", "APARTMENTS", "PROPERTY MGMT", "PROPERTY MANAGEMENT"]),
+    ("Housing", "Mortgage", ["MORTGAGE", "HOME LOAN"]),
+    ("Utilities", "Electricity & Gas", ["ELECTRIC", "ENERGY", "POWER", "PG&E", "CON EDISON", "NATIONAL GRID"]),
+    ("Utilities", "Water", ["WATER", "SEWER"]),
+    ("Utilities", "Internet & Phone", ["COMCAST", "XFINITY", "VERIZON", "AT&T", "T-MOBILE", "SPECTRUM", "INTERNET"]),
+    ("Food & Dining", "Groceries", [
+        "GROCERY", "GROCERIES", "SUPERMARKET", "WHOLE FOODS", "TRADER JOE'S", "TRADER JOES", "SAFEWAY",
+        "KROGER", "ALDI", "LIDL", "COSTCO", "PUBLIX", "WEGMANS", "INSTACART",
+    ]),
+    ("Food & Dining", "Coffee", ["COFFEE", "CAFE", "STARBUCKS", "DUNKIN", "ESPRESSO"]),
+    ("Food & Dining", "Restaurants", [
+        "RESTAURANT", "GRILL", "PIZZA", "SUSHI", "BURGER", "TACO", "DINER", "BISTRO", "MCDONALD'S",
+        "MCDONALDS", "CHIPOTLE", "SUBWAY", "DOORDASH", "UBER EATS", "GRUBHUB",
+    ]),
+    ("Transportation", "Rideshare", ["UBER", "LYFT"]),
+    ("Transportation", "Fuel", ["SHELL", "CHEVRON", "EXXON", "EXXONMOBIL", "BP", "FUEL", "GAS STATION"]),
+    ("Transportation", "Transit & Parking", ["TRANSIT", "METRO", "MTA", "PARKING", "TOLL"]),
+    ("Subscriptions", "Streaming", [
+        "NETFLIX", "SPOTIFY", "HULU", "DISNEY PLUS", "DISNEY+", "HBO", "YOUTUBE PREMIUM", "APPLE MUSIC", "PRIME VIDEO",
+    ]),
+    ("Subscriptions", "Software", ["ADOBE", "MICROSOFT", "DROPBOX", "GITHUB", "ICLOUD", "GOOGLE STORAGE"]),
+    ("Shopping", "Online", ["AMAZON", "EBAY", "ETSY", "SHOPIFY"]),
+    ("Shopping", "General Merchandise", ["TARGET", "WALMART", "IKEA", "BEST BUY", "HOME DEPOT"]),
+    ("Health", "Pharmacy", ["PHARMACY", "CVS", "WALGREENS"]),
+    ("Health", "Fitness", ["GYM", "FITNESS", "YOGA", "PELOTON"]),
+    ("Health", "Medical", ["DENTAL", "DENTIST", "DOCTOR", "CLINIC", "HOSPITAL", "MEDICAL"]),
+    ("Insurance", "Insurance", ["INSURANCE", "GEICO", "STATE FARM", "PROGRESSIVE", "ALLSTATE"]),
+    ("Travel", "Flights", ["AIRLINES", "AIRWAYS", "AIR LINES"]),
+    ("Travel", "Lodging", ["HOTEL", "MOTEL", "AIRBNB", "MARRIOTT", "HILTON", "HYATT"]),
+    ("Entertainment", "Entertainment", ["CINEMA", "THEATRE", "THEATER", "TICKETMASTER", "STEAM", "PLAYSTATION"]),
+    ("Education", "Education", ["TUITION", "UNIVERSITY", "COLLEGE", "COURSERA", "UDEMY"]),
+    ("Loans", "Loan Payment", ["LOAN", "EMI", "FINANCE CHARGE"]),
+    ("Transfers", "Transfer", ["TRANSFER", "ZELLE", "VENMO", "PAYPAL", "CASH APP", "WIRE"]),
+    ("Fees", "Bank Fees", ["OVERDRAFT", "SERVICE FEE", "MONTHLY FEE", "MAINTENANCE FEE", "NSF"]),
+    ("Cash", "ATM", ["ATM", "CASH WITHDRAWAL"]),
+]
+
+# Patterns keywords can't express. Tried before the keywords, in order.
+REGEX_RULES = [
+    (r"\bATM\b.*\bFEE\b", "Fees", "Bank Fees"),
+    (r"\b(?:TFR|XFER|TRNSFR)\b", "Transfers", "Transfer"),
+    (r"\bINT(?:EREST)?\s+(?:PAID|EARNED|CR(?:EDIT)?)\b", "Income", "Interest & Dividends"),
+]
+
+# Abbreviations banks print, rewritten to the name the keyword rules know
+MERCHANT_ALIASES = {
+    "AMZN": "AMAZON",
+    "AMZN MKTP": "AMAZON",
+    "AMAZON MKTP": "AMAZON",
+    "WHOLEFDS": "WHOLE FOODS",
+    "WM SUPERCENTER": "WALMART",
+    "WAL-MART": "WALMART",
+    "TGT": "TARGET",
+    "SBUX": "STARBUCKS",
+    "NFLX": "NETFLIX",
+    "DD DOORDASH": "DOORDASH",
+    "APPLE.COM/BILL": "ICLOUD",
+}
+
+# Categories that fit money coming in. An income row matching any other rule
+# is money back from a merchant, i.e. a refund.
+INCOME_PRIMARIES = {"Income", "Transfers"}
+REFUND: Category = ("Income", "Refunds")
+OTHER_INCOME: Category = ("Income", "Other Income")
+
+# (match text, direction) -> category under the built-in rules, shared across uploads
+MEMO_MAX_ENTRIES = int(os.environ.get("CATEGORY_MEMO_MAX_ENTRIES", "200000"))
+_memo: Dict[Tuple[str, str], Category] = {}
+
+# Built-in rules never name a digit (see categorize_frame)
+DIGITS_AS_ZERO = bytes.maketrans(b"123456789", b"000000000")
+
+# Ids per IN (...) list when writing categories back, below SQLite's parameter limit
+IN_CHUNK = 500
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex alternation for `words` factored into a character trie, so the
+    engine walks shared prefixes once instead of trying every word in turn.
+    Longer words win over their own prefixes ("UBER EATS" before "UBER").
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = "|".join(branches)
+        if "" in node:
+            # A word ends here: the (greedy) rest is optional
+            return "(?:" + body + ")?"
+        return body if len(branches) == 1 else "(?:" + body + ")"
+
+    return build(trie)
+
+
+def _word_regex(words: Iterable[str]) -> re.Pattern:
+    # Words are delimited by anything but letters/digits, which also works for "AT&T" or "DISNEY+"
+    return re.compile(r"(?<![A-Z0-9])(?:" + trie_pattern(words) + r")(?![A-Z0-9])")
+
+
+def _keyword_index() -> Dict[str, Category]:
+    index: Dict[str, Category] = {}
+    for primary, detailed, keywords in KEYWORD_RULES:
+        for keyword in keywords:
+            index.setdefault(keyword, (primary, detailed))
+    return index
+
+
+KEYWORD_CATEGORIES = _keyword_index()
+KEYWORD_REGEX = _word_regex(KEYWORD_CATEGORIES)
+ALIAS_REGEX = _word_regex(MERCHANT_ALIASES)
+COMPILED_REGEX_RULES = [(re.compile(pattern), (primary, detailed)) for pattern, primary, detailed in REGEX_RULES]
+
+
+def match_text(descriptions: pd.Series, merchants: pd.Series) -> pd.Series:
+    """
+    What the rules are matched against, per row: the description upper-cased
+    with whitespace collapsed, so the tokens merchant keys strip (reference
+    numbers, "ACH", "PAYMENT", ...) stay matchable, followed by the merchant
+    name when the description doesn't already contain it.
+    """
+    texts = []
+    for description, merchant in zip(descriptions.astype(str).tolist(), merchants.fillna("").astype(str).tolist()):
+        text = " ".join(description.upper().split())
+        texts.append(text if not merchant or merchant in text else f"{text} {merchant}")
+    return pd.Series(texts, index=descriptions.index, dtype=object)
+
+
+def match_rules(text: str) -> Category:
+    """Category of a match text under the built-in rules, (None, None) if nothing matches."""
+    text = ALIAS_REGEX.sub(lambda m: MERCHANT_ALIASES[m.group(0)], text)
+    for pattern, category in COMPILED_REGEX_RULES:
+        if pattern.search(text):
+            return category
+    found = KEYWORD_REGEX.search(text)
+    if found:
+        return KEYWORD_CATEGORIES[found.group(0)]
+    return None, None
+
+
+def _for_direction(category: Category, direction: str) -> Category:
+    if direction != "income":
+        return category if category[0] != "Income" else (None, None)
+    if category[0] is None:
+        return OTHER_INCOME
+    return category if category[0] in INCOME_PRIMARIES else REFUND
+
+
+def compile_user_rules(rules: Optional[List[dict]]) -> List[Tuple[re.Pattern, Category]]:
+    """
+    A user's override rules from preferences["category_rules"], in priority order.
+
+    Each rule is {"pattern": str, "category_primary": str, "category_detailed": str?,
+    "regex": bool?}; plain patterns match as whole words of the match text,
+    case-insensitively. Malformed rules are skipped rather than failing the upload.
+    """
+    compiled = []
+    for rule in rules or []:
+        if not isinstance(rule, dict) or not rule.get("pattern") or not rule.get("category_primary"):
+            continue
+        try:
+            if rule.get("regex"):
+                pattern = re.compile(rule["pattern"], re.IGNORECASE)
+            else:
+                pattern = _word_regex([str(rule["pattern"]).upper()])
+        except re.error:
+            continue
+        compiled.append((pattern, (rule["category_primary"], rule.get("category_detailed"))))
+    return compiled
+
+
+def builtin_category(text: str, direction: str) -> Category:
+    """Category for one (match text, direction) under the built-in rules, memoized."""
+    key = (text, direction)
+    category = _memo.get(key)
+    if category is None:
+        category = _for_direction(match_rules(text), direction)
+        if len(_memo) >= MEMO_MAX_ENTRIES:
+            _memo.clear()
+        _memo[key] = category
+    return category
+
+
+def user_category(text: str, user_rules: List[Tuple[re.Pattern, Category]]) -> Optional[Category]:
+    """The first of a user's override rules matching a match text, None if none does."""
+    for pattern, category in user_rules:
+        if pattern.search(text):
+            return category
+    return None
+
+
+def categorize_frame(
+    clean: pd.DataFrame,
+    user_rules: Optional[List[Tuple[re.Pattern, Category]]] = None
+) -> pd.DataFrame:
+    """
+    Categories for a normalized ingestion frame (needs 'description',
+    'merchant_name' and 'direction'): user overrides first, then the
+    built-in rules.
+
+    Rules run once per distinct match text, not per row, and the results are
+    broadcast back with an integer take. No built-in rule names a digit, so
+    for them every digit is read as 0 first: reference numbers then no
+    longer make each charge of a merchant distinct.
+
+    Returns:
+        DataFrame with ['category_primary', 'category_detailed'] aligned with `clean`.
+    """
+    text = match_text(clean["description"], clean["merchant_name"])
+    keys = [
+        t.encode().translate(DIGITS_AS_ZERO).decode() + "\x1f" + direction
+        for t, direction in zip(text.tolist(), clean["direction"].astype(str).tolist())
+    ]
+    codes, uniques = pd.factorize(np.array(keys, dtype=object))
+    categories = [builtin_category(*key.split("\x1f", 1)) for key in uniques]
+    primary = pd.Series([c[0] for c in categories], dtype=object).take(codes).to_numpy()
+    detailed = pd.Series([c[1] for c in categories], dtype=object).take(codes).to_numpy()
+
+    if user_rules:
+        # Overrides may name digits, so they see the exact text
+        codes, uniques = pd.factorize(text)
+        overrides = [user_category(t, user_rules) for t in uniques]
+        matched = np.array([o is not None for o in overrides], dtype=bool)[codes]
+        primary = np.where(matched, np.array([o and o[0] for o in overrides], dtype=object)[codes], primary)
+        detailed = np.where(matched, np.array([o and o[1] for o in overrides], dtype=object)[codes], detailed)
+
+    return pd.DataFrame({
+        "category_primary": primary,
+        "category_detailed": detailed,
+    }, index=clean.index, dtype=object)
+
+
+async def load_user_rules(db: AsyncSession, user_id: uuid.UUID) -> List[Tuple[re.Pattern, Category]]:
+    """Compiled override rules of a user (empty when the user or the preference doesn't exist)."""
+    result = await db.execute(select(User.preferences).where(User.id == user_id))
+    preferences = result.scalar_one_or_none() or {}
+    return compile_user_rules(preferences.get("category_rules"))
+
+
+async def recategorize_transactions(db: AsyncSession, user_id: uuid.UUID) -> int:
+    """
+    Re-applies the current rules (and the user's overrides) to a user's whole
+    ledger, e.g. after the rules or preferences changed. Writes only rows whose
+    category changes, one UPDATE ... WHERE id IN (...) per category and chunk.
+
+    Returns:
+        Number of transactions whose category changed.
+    """
+    t = Transaction
+    result = await db.execute(
+        select(t.id, t.merchant_name, t.description, t.direction, t.category_primary, t.category_detailed)
+        .where(t.user_id == user_id)
+    )
+    rows = pd.DataFrame(result.all(), columns=[
+        "id", "merchant_name", "description", "direction", "category_primary", "category_detailed",
+    ])
+    if rows.empty:
+        return 0
+
+    missing = rows["merchant_name"].isna()
+    rows.loc[missing, "merchant_name"] = normalize_merchant_column(rows.loc[missing, "description"])
+    labels = rows["direction"].unique()
+    rows["direction"] = rows["direction"].map(dict(zip(labels, map(normalize_direction, labels))))
+
+    categories = categorize_frame(rows, await load_user_rules(db, user_id))
+    changed = (
+        (categories["category_primary"].fillna("") != rows["category_primary"].fillna(""))
+        | (categories["category_detailed"].fillna("") != rows["category_detailed"].fillna(""))
+    )
+
+    updates: Dict[Category, list] = {}
+    for row_id, primary, detailed in zip(
+        rows.loc[changed, "id"], categories.loc[changed, "category_primary"], categories.loc[changed, "category_detailed"]
+    ):
+        updates.setdefault((primary, detailed), []).append(row_id)
+    for (primary, detailed), ids in updates.items():
+        for start in range(0, len(ids), IN_CHUNK):
+            await db.execute(
+                update(t)
+                .where(t.id.in_(ids[start:start + IN_CHUNK]))
+                .values(category_primary=primary, category_detailed=detailed)
+                .execution_options(synchronize_session=False)
+            )
+
+    if updates:
+        await bump_data_versions(db, [user_id])
+    await db.commit()
+    return int(changed.sum())
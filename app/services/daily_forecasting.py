@@ -0,0 +1,232 @@
+import uuid
+import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import Transaction
+from app.services.data_processing import normalize_direction
+from app.services.forecasting import Z_80
+
+# Bump whenever the daily model changes so cached daily forecasts aren't reused.
+DAILY_MODEL_VERSION = "daily-dom-dow:1"
+
+# Forecast requests for fewer days than this are answered day by day unless
+# they ask for a granularity; longer horizons keep the monthly model.
+DAILY_DEFAULT_BELOW_DAYS = 90
+
+# Longest daily forecast served
+MAX_DAILY_DAYS = 1096
+
+# History the daily effects are estimated from
+LOOKBACK_DAYS = 365
+
+# Effects for a day-of-month / weekday seen n times are scaled by n / (n + SHRINKAGE),
+# so sparse slots (the 31st, short histories) stay close to the average day
+SHRINKAGE = 2.0
+
+# Step between occurrences of a recurring item, by Transaction.recurring_frequency
+RECURRING_STEPS = {
+    "weekly": relativedelta(weeks=1),
+    "biweekly": relativedelta(weeks=2),
+    "monthly": relativedelta(months=1),
+    "yearly": relativedelta(years=1),
+}
+
+
+async def fetch_daily_history(
+    db: AsyncSession, user_id: uuid.UUID
+) -> Tuple[Optional[datetime.date], pd.DataFrame, pd.DataFrame]:
+    """
+    Inputs of the daily model for a user.
+
+    Returns:
+        (anchor, daily, recurring): anchor is the latest transaction date
+        (None without data); daily holds one row per (date, direction) with
+        the summed amount of non-recurring rows over the LOOKBACK_DAYS up to
+        the anchor; recurring holds the recurring rows of the same window.
+    """
+    t = Transaction
+    result = await db.execute(select(func.max(t.transaction_date)).where(t.user_id == user_id))
+    anchor = result.scalar_one_or_none()
+    empty = pd.DataFrame(columns=["date", "direction", "amount"])
+    if anchor is None:
+        return None, empty, pd.DataFrame(columns=["item", "frequency", "date", "direction", "amount"])
+
+    since = anchor - datetime.timedelta(days=LOOKBACK_DAYS - 1)
+    filters = [
+        t.user_id == user_id,
+        t.transaction_date >= since,
+        t.is_excluded_from_forecast == False,
+    ]
+
+    result = await db.execute(
+        select(t.transaction_date, t.direction, func.sum(t.amount))
+        .where(*filters, t.is_recurring != True)
+        .group_by(t.transaction_date, t.direction)
+    )
+    daily = pd.DataFrame(
+        [(d, normalize_direction(direction), float(total or 0)) for d, direction, total in result.all()],
+        columns=["date", "direction", "amount"],
+    )
+
+    result = await db.execute(
+        select(
+            func.coalesce(t.merchant_name, t.description), t.recurring_frequency,
+            t.transaction_date, t.direction, t.amount,
+        ).where(*filters, t.is_recurring == True)
+    )
+    recurring = pd.DataFrame(
+        [(item, freq, d, normalize_direction(direction), float(amount)) for item, freq, d, direction, amount in result.all()],
+        columns=["item", "frequency", "date", "direction", "amount"],
+    )
+    return anchor, daily, recurring
+
+
+def _effects(residual: np.ndarray, slots: np.ndarray, n_slots: int) -> np.ndarray:
+    """Shrunken mean of `residual` (series x days) per slot (day-of-month or weekday)."""
+    counts = np.bincount(slots, minlength=n_slots)
+    sums = np.stack([np.bincount(slots, weights=row, minlength=n_slots) for row in residual])
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return means * (counts / (counts + SHRINKAGE))
+
+
+def recurring_schedule(
+    recurring: pd.DataFrame, anchor: datetime.date, days: int
+) -> np.ndarray:
+    """
+    (2 x days) income/expense array of known recurring items, projected from
+    each item's last occurrence by its frequency. Items that missed two
+    periods in a row are treated as cancelled.
+    """
+    schedule = np.zeros((2, days))
+    if recurring.empty:
+        return schedule
+
+    end = anchor + datetime.timedelta(days=days)
+    for (item, frequency, direction), rows in recurring.groupby(["item", "frequency", "direction"]):
+        step = RECURRING_STEPS.get(frequency)
+        if step is None or direction not in ("income", "expense"):
+            continue
+        last = max(rows["date"])
+        if last + step + step < anchor:
+            continue
+        amount = float(np.median(rows["amount"]))
+        row = 0 if direction == "income" else 1
+
+        k = 1
+        occurrence = last + step
+        while occurrence <= end:
+            offset = (occurrence - anchor).days - 1
+            if offset >= 0:
+                schedule[row, offset] += amount
+            k += 1
+            occurrence = last + step * k
+    return schedule
+
+
+def forecast_daily(
+    anchor: Optional[datetime.date],
+    daily: pd.DataFrame,
+    recurring: pd.DataFrame,
+    current_balance: float,
+    days: int
+) -> pd.DataFrame:
+    """
+    Daily cashflow/balance forecast for the `days` days after `anchor`:
+    forecast_flows projected onto current_balance (see project_balance).
+
+    Returns:
+        DataFrame with ['date', 'income', 'expense', 'net', 'balance', 'lower_bound', 'upper_bound']
+    """
+    return project_balance(forecast_flows(anchor, daily, recurring, days), current_balance)
+
+
+def forecast_flows(
+    anchor: Optional[datetime.date],
+    daily: pd.DataFrame,
+    recurring: pd.DataFrame,
+    days: int
+) -> pd.DataFrame:
+    """
+    Daily cashflow forecast for the `days` days after `anchor`, independent of
+    the account balance (so it can be cached per data version alone).
+
+    Non-recurring income and expense are modelled together as a (2 x days)
+    array: average daily flow plus shrunken day-of-month and day-of-week
+    effects, estimated from the dense daily history. Known recurring items are
+    scheduled on their own dates on top. The 80% band grows with the square
+    root of the horizon from the history's residual spread.
+
+    Returns:
+        DataFrame with ['date', 'income', 'expense', 'net', 'cumulative_net', 'width'];
+        the last two are unrounded
+    """
+    columns = ["date", "income", "expense", "net", "cumulative_net", "width"]
+    if anchor is None:
+        return pd.DataFrame(columns=columns)
+
+    # 1. Dense (2 x history days) array, income row then expense row
+    start = min(daily["date"].min(), anchor) if not daily.empty else anchor
+    if not recurring.empty:
+        start = min(start, recurring["date"].min())
+    n_hist = (anchor - start).days + 1
+    history = np.zeros((2, n_hist))
+    if not daily.empty:
+        known = daily[daily["direction"].isin(["income", "expense"])]
+        offsets = np.array([(d - start).days for d in known["date"]], dtype=np.int64)
+        rows = np.where(known["direction"].to_numpy() == "income", 0, 1)
+        np.add.at(history, (rows, offsets), known["amount"].to_numpy(dtype=np.float64))
+
+    hist_dates = pd.date_range(start, periods=n_hist, freq="D")
+    hist_dom = hist_dates.day.to_numpy() - 1
+    hist_dow = hist_dates.dayofweek.to_numpy()
+
+    # 2. Average day, then day-of-month and day-of-week effects on what's left
+    base = history.mean(axis=1, keepdims=True)
+    dom_effect = _effects(history - base, hist_dom, 31)
+    dow_effect = _effects(history - base - dom_effect[:, hist_dom], hist_dow, 7)
+    fitted = base + dom_effect[:, hist_dom] + dow_effect[:, hist_dow]
+    sigma = float(np.std((history[0] - history[1]) - (fitted[0] - fitted[1])))
+
+    # 3. Project
+    future = pd.date_range(anchor + datetime.timedelta(days=1), periods=days, freq="D")
+    dom = future.day.to_numpy() - 1
+    dow = future.dayofweek.to_numpy()
+    expected = np.clip(base + dom_effect[:, dom] + dow_effect[:, dow], 0, None)
+    expected += recurring_schedule(recurring, anchor, days)
+
+    net = expected[0] - expected[1]
+    return pd.DataFrame({
+        "date": future.date,
+        "income": expected[0].round(2),
+        "expense": expected[1].round(2),
+        "net": net.round(2),
+        "cumulative_net": np.cumsum(net),
+        "width": Z_80 * sigma * np.sqrt(np.arange(1, days + 1)),
+    })
+
+
+def project_balance(flows: pd.DataFrame, current_balance: float) -> pd.DataFrame:
+    """
+    A forecast_flows frame as balances: the cumulative sum from
+    current_balance, with the band around it.
+
+    Returns:
+        DataFrame with ['date', 'income', 'expense', 'net', 'balance', 'lower_bound', 'upper_bound']
+    """
+    balance = current_balance + flows["cumulative_net"].to_numpy(dtype=np.float64)
+    width = flows["width"].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        "date": flows["date"],
+        "income": flows["income"],
+        "expense": flows["expense"],
+        "net": flows["net"],
+        "balance": balance.round(2),
+        "lower_bound": (balance - width).round(2),
+        "upper_bound": (balance + width).round(2),
+    })
@@ -1,9 +1,25 @@
 
+import re
+import uuid
 import pandas as pd
-from typing import List
+from typing import Iterable, List, Tuple
 from decimal import Decimal
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.database_schema import Transaction, TransactionDirection
 
+CASHFLOW_COLUMNS = ["month", "total_income", "total_expense", "net_cashflow"]
+
+# Statement noise stripped from descriptions to get a merchant key: payment rail and card
+# wording plus any token containing a digit (reference numbers, dates, masked cards),
+# e.g. "POS DEBIT NETFLIX.COM 8665797172" -> "NETFLIX.COM"
+MERCHANT_NOISE = re.compile(
+    r"\b(?:pos|ach|debit|credit|card|checkcard|purchase|payment|pmt|recurring|online|"
+    r"visa|mastercard|ref|txn|trans|id|web|ppd|ccd)\b"
+    r"|\S*\d\S*",
+    re.IGNORECASE,
+)
+
 def compute_monthly_cashflow(transactions: List[Transaction]) -> pd.DataFrame:
     """
     Computes monthly cashflow (Income, Expense, Net) from a list of transactions.
@@ -85,6 +101,153 @@ def compute_monthly_cashflow(transactions: List[Transaction]) -> pd.DataFrame:
     
     return grouped.sort_values('month')
 
+def normalize_direction(raw_dir) -> str:
+    """
+    Handles cases where direction is an Enum object, a string, or a string repr
+    of an Enum (TransactionDirection.INCOME).
+    """
+    if hasattr(raw_dir, 'value'):
+        return raw_dir.value.lower()
+    d_val = str(raw_dir)
+    if "." in d_val:
+        d_val = d_val.split(".")[-1]
+    return d_val.lower()
+
+
+def normalize_merchant_column(descriptions: pd.Series) -> pd.Series:
+    """
+    Merchant key per description: upper-cased, with MERCHANT_NOISE removed and
+    whitespace collapsed, so every charge of a merchant maps onto the same key
+    whatever reference numbers the bank appends. Descriptions that are nothing
+    but noise keep their whole (collapsed) text.
+    """
+    collapsed = descriptions.astype(str).str.upper().str.replace(r"\s+", " ", regex=True).str.strip()
+    merchant = (
+        collapsed.str.replace(MERCHANT_NOISE, " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip(" -/.,:;*#&")
+    )
+    return merchant.where(merchant.str.len() > 0, collapsed).str.slice(0, 255)
+
+
+def month_bucket(column, dialect_name: str):
+    """SQL expression formatting a date column as 'YYYY-MM', or None if the dialect isn't supported."""
+    if dialect_name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    if dialect_name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return None
+
+
+async def fetch_monthly_cashflow(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    exclude_from_forecast: bool = False
+) -> pd.DataFrame:
+    """
+    Same output as compute_monthly_cashflow, but aggregated by the database.
+
+    Reads the monthly rollup table first (one row per account/month). A
+    user's rollups always cover their whole ledger: they're rebuilt on the
+    first upload into an un-rolled-up history and reconciled against the
+    transactions at startup (see rollups.reconcile_monthly_rollups). Users
+    with no rollup rows are grouped by month and direction in SQL (driven by
+    idx_transactions_user_date), so only one row per month/direction comes back
+    instead of the full ledger. Falls back to fetching (date, amount, direction)
+    and running compute_monthly_cashflow on dialects without a month expression.
+
+    Args:
+        exclude_from_forecast: Drop rows flagged is_excluded_from_forecast.
+    """
+    from app.services.rollups import fetch_monthly_rollup
+    rollup_df = await fetch_monthly_rollup(db, user_id, exclude_from_forecast)
+    if not rollup_df.empty:
+        return rollup_df
+
+    filters = [Transaction.user_id == user_id]
+    if exclude_from_forecast:
+        filters.append(Transaction.is_excluded_from_forecast == False)
+
+    month = month_bucket(Transaction.transaction_date, db.get_bind().dialect.name)
+    if month is None:
+        query = select(
+            Transaction.transaction_date, Transaction.amount, Transaction.direction
+        ).where(*filters)
+        result = await db.execute(query)
+        return compute_monthly_cashflow(result.all())
+
+    query = select(
+        month.label("month"),
+        Transaction.direction,
+        func.sum(Transaction.amount).label("total")
+    ).where(*filters).group_by(month, Transaction.direction)
+    result = await db.execute(query)
+    return pivot_monthly_totals(result.all())
+
+
+async def fetch_monthly_cashflows(db: AsyncSession, user_id: uuid.UUID) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Both monthly cashflow views of a user from a single aggregate read: the
+    full history (as fetch_monthly_cashflow) and the forecast history (as
+    fetch_monthly_cashflow with exclude_from_forecast=True).
+
+    The rollup read carries the excluded totals next to the full ones; the
+    legacy fallback groups by month, direction and the exclusion flag at once.
+
+    Returns:
+        (cashflow_df, forecast_history_df)
+    """
+    from app.services.rollups import fetch_monthly_rollup_totals, rollup_cashflow
+    totals = await fetch_monthly_rollup_totals(db, user_id)
+    if not totals.empty:
+        return rollup_cashflow(totals), rollup_cashflow(totals, exclude_from_forecast=True)
+
+    month = month_bucket(Transaction.transaction_date, db.get_bind().dialect.name)
+    if month is None:
+        return (
+            await fetch_monthly_cashflow(db, user_id),
+            await fetch_monthly_cashflow(db, user_id, exclude_from_forecast=True),
+        )
+
+    query = select(
+        month.label("month"),
+        Transaction.direction,
+        Transaction.is_excluded_from_forecast,
+        func.sum(Transaction.amount).label("total")
+    ).where(Transaction.user_id == user_id).group_by(month, Transaction.direction, Transaction.is_excluded_from_forecast)
+    result = await db.execute(query)
+    rows = result.all()
+    return (
+        pivot_monthly_totals((m, d, total) for m, d, _, total in rows),
+        # Same as the `is_excluded_from_forecast == False` filter: NULL flags don't qualify
+        pivot_monthly_totals((m, d, total) for m, d, x, total in rows if x is not None and not x),
+    )
+
+
+def pivot_monthly_totals(rows: Iterable) -> pd.DataFrame:
+    """Monthly cashflow (CASHFLOW_COLUMNS) from (month, direction, total) rows."""
+    # Direction is normalized on the (tiny) grouped result, so legacy spellings still count
+    df = pd.DataFrame(
+        [(m, normalize_direction(d), float(total or 0)) for m, d, total in rows],
+        columns=["month", "direction", "total"]
+    )
+    df = df[df["direction"].isin(["income", "expense"])]
+    if df.empty:
+        return pd.DataFrame(columns=CASHFLOW_COLUMNS)
+
+    grouped = (
+        df.pivot_table(index="month", columns="direction", values="total", aggfunc="sum", fill_value=0.0)
+        .reindex(columns=["income", "expense"], fill_value=0.0)
+        .reset_index()
+        .rename(columns={"income": "total_income", "expense": "total_expense"})
+        # Amounts are in cents; rounding drops float noise from summing partial totals
+        .round({"total_income": 2, "total_expense": 2})
+    )
+    grouped.columns.name = None
+    grouped["net_cashflow"] = grouped["total_income"] - grouped["total_expense"]
+    return grouped[CASHFLOW_COLUMNS].sort_values("month").reset_index(drop=True)
+
+
 # Example Usage (not run on import)
 if __name__ == "__main__":
     # Mock Objects
@@ -0,0 +1,79 @@
+import uuid
+import datetime
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import UserDataVersion
+
+
+async def bump_data_versions(db: AsyncSession, user_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Increments the data version of each user (creating it at 1).
+    Does not commit: call it inside the transaction that changes the data.
+    """
+    rows = [{"user_id": uid, "version": 1} for uid in set(user_ids)]
+    if not rows:
+        return
+
+    table = UserDataVersion.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={"version": table.c.version + 1, "updated_at": func.now()},
+    )
+    await db.execute(stmt, rows)
+
+
+async def bump_all_data_versions(db: AsyncSession) -> None:
+    """Invalidates every user's derived data (e.g. after a full rollup rebuild). Does not commit."""
+    await db.execute(
+        update(UserDataVersion).values(version=UserDataVersion.version + 1, updated_at=func.now())
+    )
+
+
+async def get_data_version(
+    db: AsyncSession,
+    user_id: uuid.UUID
+) -> Tuple[int, Optional[datetime.datetime]]:
+    """
+    Current (version, last_changed_at) for a user; (0, None) if nothing was ever ingested.
+    A primary-key lookup, so it's cheap enough to run before every read.
+    """
+    result = await db.execute(
+        select(UserDataVersion.version, UserDataVersion.updated_at)
+        .where(UserDataVersion.user_id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+async def get_validator(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    *parts
+) -> Tuple[str, Optional[datetime.datetime]]:
+    """
+    HTTP validators (ETag, Last-Modified) for a response derived from the
+    user's data plus whatever else it depends on (`parts`: model keys,
+    scenario rows...). The ETag carries the version, not just the timestamp,
+    since two bumps can land within the same second. Datetimes among `parts`
+    count towards Last-Modified.
+
+    Costs the version lookup only, so endpoints check it before any heavy work.
+    """
+    from app.core.conditional import make_etag
+
+    version, changed_at = await get_data_version(db, user_id)
+    moments = [p for p in (changed_at, *parts) if isinstance(p, datetime.datetime)]
+    last_modified = max(moments, key=_utc) if moments else None
+    return make_etag(user_id, version, changed_at, *parts), last_modified
+
+
+def _utc(moment: datetime.datetime) -> datetime.datetime:
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=datetime.timezone.utc)
@@ -0,0 +1,70 @@
+import os
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+# Entry and memory caps for the per-process forecast cache
+FORECAST_CACHE_MAX_ENTRIES = int(os.environ.get("FORECAST_CACHE_MAX_ENTRIES", "10000"))
+FORECAST_CACHE_MAX_BYTES = int(os.environ.get("FORECAST_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class ForecastCache:
+    """
+    LRU cache for computed forecasts, bounded by entry count and approximate memory.
+
+    Keys are expected to include the user's data version (see
+    app.services.data_version), so an ingestion makes older entries unreachable
+    instead of relying on a TTL; they age out through LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = FORECAST_CACHE_MAX_ENTRIES, max_bytes: int = FORECAST_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, size_bytes: int) -> None:
+        if size_bytes > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+
+        self._entries[key] = (value, size_bytes)
+        self.current_bytes += size_bytes
+
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+forecast_cache = ForecastCache()
@@ -1,10 +1,19 @@
 
+from abc import ABC, abstractmethod
+
 import pandas as pd
 import numpy as np
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 
+# Bump whenever the forecasting logic changes so cached forecasts aren't reused.
+MODEL_VERSION = "wma-3m:1"
+
+# Weights of the last 3 months, oldest first, and the +/- band around the prediction
+WMA_WEIGHTS = (0.3, 0.3, 0.4)
+UNCERTAINTY_BAND = 0.2
+
 def generate_simple_forecast(
     history_df: pd.DataFrame, 
     months_to_forecast: int = 6
@@ -12,6 +21,8 @@ def generate_simple_forecast(
     """
     Generates a generic MVP forecast based on historical cashflow.
     
+    This is the default registered model (WeightedMovingAverageForecaster).
+
     Algorithm:
     1. Weighted Moving Average of last 3 months (30%, 30%, 40%).
     2. Fallback to Global Average if < 3 months data.
@@ -20,50 +31,276 @@ def generate_simple_forecast(
     Args:
         history_df: DataFrame with ['month', 'net_cashflow']
         
+    Returns:
+        DataFrame with ['forecast_month', 'predicted_cashflow', 'lower_bound', 'upper_bound']
+    """
+    return forecast_frame(history_df, months_to_forecast, FORECASTERS[DEFAULT_MODEL])
+
+
+# ==========================================
+# Forecaster registry
+# ==========================================
+# z-score of the central 80% interval, used by the models with residual-based bands
+Z_80 = 1.2816
+
+SEASON_MONTHS = 12
+
+
+class Forecaster(ABC):
+    """
+    A forecasting model over a user's monthly net cashflow.
+
+    fit() turns the history into a small dict of plain floats/lists (so it can
+    be cached or stored as JSON), predict() turns those parameters into
+    (prediction, lower, upper) arrays for the next `horizon` months.
+    Subclasses are registered in FORECASTERS and recorded in the ml_models
+    table as MLModel(name=model_name, version=version).
+    """
+    name: str = ""
+    version: str = ""
+    label: str = ""
+    # Fill months without activity with 0 so positions line up with the calendar
+    contiguous_history: bool = False
+
+    @property
+    def model_name(self) -> str:
+        return f"cashflow-{self.name}"
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.version}"
+
+    def describe(self) -> dict:
+        return {}
+
+    @abstractmethod
+    def fit(self, values: np.ndarray) -> dict:
+        ...
+
+    @abstractmethod
+    def predict(self, params: dict, horizon: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        ...
+
+
+class WeightedMovingAverageForecaster(Forecaster):
+    """Weighted average of the last 3 months (global mean below that), flat, fixed +/- 20% band."""
+    name = "wma"
+    version = MODEL_VERSION
+    label = "Weighted Moving Avg (3M)"
+
+    def describe(self) -> dict:
+        return {"weights": list(WMA_WEIGHTS), "uncertainty_band": UNCERTAINTY_BAND}
+
+    def fit(self, values: np.ndarray) -> dict:
+        if len(values) >= 3:
+            # Giving slight weight to most recent
+            baseline = (values[-3] * WMA_WEIGHTS[0]) + (values[-2] * WMA_WEIGHTS[1]) + (values[-1] * WMA_WEIGHTS[2])
+        else:
+            # Not enough data, use global mean
+            baseline = np.mean(values)
+        return {"level": float(baseline)}
+
+    def predict(self, params: dict, horizon: int):
+        prediction = np.full(horizon, params["level"])
+        uncertainty = np.abs(prediction) * UNCERTAINTY_BAND
+        return prediction, prediction - uncertainty, prediction + uncertainty
+
+
+class ExponentialSmoothingForecaster(Forecaster):
+    """
+    Simple exponential smoothing. The smoothing factor is picked from a grid
+    by one-step-ahead squared error, with all candidates run in one pass.
+    """
+    name = "ses"
+    version = "ses-grid:1"
+    label = "Exponential Smoothing"
+    alphas = np.linspace(0.05, 0.95, 19)
+
+    def describe(self) -> dict:
+        return {"alpha_grid": [round(a, 2) for a in self.alphas.tolist()]}
+
+    def fit(self, values: np.ndarray) -> dict:
+        if len(values) < 2:
+            return {"level": float(values[0]), "alpha": 0.5, "sigma": abs(float(values[0])) * UNCERTAINTY_BAND}
+
+        levels = np.full(len(self.alphas), float(values[0]))
+        sse = np.zeros(len(self.alphas))
+        for v in values[1:]:
+            err = v - levels
+            sse += err ** 2
+            levels += self.alphas * err
+
+        best = int(np.argmin(sse))
+        return {
+            "level": float(levels[best]),
+            "alpha": float(self.alphas[best]),
+            "sigma": float(np.sqrt(sse[best] / (len(values) - 1))),
+        }
+
+    def predict(self, params: dict, horizon: int):
+        prediction = np.full(horizon, params["level"])
+        # SES h-step variance: sigma^2 * (1 + (h - 1) * alpha^2)
+        width = Z_80 * params["sigma"] * np.sqrt(1 + np.arange(horizon) * params["alpha"] ** 2)
+        return prediction, prediction - width, prediction + width
+
+
+class HoltWintersForecaster(Forecaster):
+    """
+    Additive Holt-Winters with a damped trend and yearly (12-month) seasonality.
+    Needs two full years for the seasonal part; with less history the seasonal
+    terms stay at zero and it reduces to damped Holt. Smoothing parameters are
+    grid-searched with every combination run in one vectorized pass.
+    """
+    name = "holt-winters"
+    version = "hw-add-12:1"
+    label = "Holt-Winters (yearly seasonality)"
+    contiguous_history = True
+    phi = 0.9
+    grid = np.array([
+        (a, b, g)
+        for a in (0.1, 0.3, 0.5, 0.7)
+        for b in (0.0, 0.05, 0.1, 0.2)
+        for g in (0.05, 0.1, 0.3)
+    ])
+
+    def describe(self) -> dict:
+        return {"season_months": SEASON_MONTHS, "phi": self.phi, "grid_size": len(self.grid)}
+
+    def fit(self, values: np.ndarray) -> dict:
+        m = SEASON_MONTHS
+        n = len(values)
+        alpha, beta, gamma = self.grid.T
+        k = len(self.grid)
+
+        seasonal = n >= 2 * m
+        if seasonal:
+            level = np.full(k, values[:m].mean())
+            trend = np.full(k, (values[m:2 * m].mean() - values[:m].mean()) / m)
+            season = np.tile(values[:m] - values[:m].mean(), (k, 1))
+            first = m
+        else:
+            level = np.full(k, float(values[0]))
+            trend = np.zeros(k)
+            season = np.zeros((k, m))
+            first = 1
+
+        sse = np.zeros(k)
+        for t in range(first, n):
+            s = season[:, t % m]
+            err = values[t] - (level + self.phi * trend + s)
+            sse += err ** 2
+            new_level = alpha * (values[t] - s) + (1 - alpha) * (level + self.phi * trend)
+            trend = beta * (new_level - level) + (1 - beta) * self.phi * trend
+            level = new_level
+            if seasonal:
+                season[:, t % m] = gamma * (values[t] - level) + (1 - gamma) * s
+
+        best = int(np.argmin(sse))
+        steps = max(n - first, 1)
+        return {
+            "level": float(level[best]),
+            "trend": float(trend[best]),
+            # Rotated so index 0 is the first forecast month
+            "season": np.roll(season[best], -(n % m)).tolist(),
+            "sigma": float(np.sqrt(sse[best] / steps)) if n > first else abs(float(values[-1])) * UNCERTAINTY_BAND,
+            "alpha": float(alpha[best]), "beta": float(beta[best]), "gamma": float(gamma[best]),
+        }
+
+    def predict(self, params: dict, horizon: int):
+        h = np.arange(1, horizon + 1)
+        damped = np.cumsum(self.phi ** h)
+        season = np.asarray(params["season"])[(h - 1) % SEASON_MONTHS]
+        prediction = params["level"] + damped * params["trend"] + season
+        width = Z_80 * params["sigma"] * np.sqrt(h)
+        return prediction, prediction - width, prediction + width
+
+
+class RobustMedianForecaster(Forecaster):
+    """Median of the last 6 months with a MAD-based band; one-off spikes barely move it."""
+    name = "median"
+    version = "median-6m:1"
+    label = "Robust Median (6M)"
+    window = 6
+
+    def describe(self) -> dict:
+        return {"window": self.window}
+
+    def fit(self, values: np.ndarray) -> dict:
+        recent = values[-self.window:]
+        median = float(np.median(recent))
+        # 1.4826 * MAD estimates the standard deviation for normal data
+        return {"level": median, "scale": float(1.4826 * np.median(np.abs(recent - median)))}
+
+    def predict(self, params: dict, horizon: int):
+        prediction = np.full(horizon, params["level"])
+        width = Z_80 * params["scale"]
+        return prediction, prediction - width, prediction + width
+
+
+DEFAULT_MODEL = "wma"
+
+FORECASTERS: Dict[str, Forecaster] = {
+    f.name: f for f in (
+        WeightedMovingAverageForecaster(),
+        ExponentialSmoothingForecaster(),
+        HoltWintersForecaster(),
+        RobustMedianForecaster(),
+    )
+}
+
+
+def get_forecaster(name: Optional[str] = None) -> Forecaster:
+    """Registered forecaster by name (default model when None). Raises ValueError for unknown names."""
+    forecaster = FORECASTERS.get(name or DEFAULT_MODEL)
+    if forecaster is None:
+        raise ValueError(f"Unknown forecast model '{name}', expected one of {sorted(FORECASTERS)}")
+    return forecaster
+
+
+def history_values(history_df: pd.DataFrame, forecaster: Forecaster) -> np.ndarray:
+    """Net cashflow series the forecaster is fitted on, oldest month first."""
+    df = history_df.sort_values('month')
+    if forecaster.contiguous_history:
+        first = date.fromisoformat(f"{df['month'].iloc[0]}-01")
+        last = date.fromisoformat(f"{df['month'].iloc[-1]}-01")
+        span = (last.year - first.year) * 12 + last.month - first.month + 1
+        months = [(first + relativedelta(months=i)).strftime("%Y-%m") for i in range(span)]
+        return df.set_index('month')['net_cashflow'].reindex(months, fill_value=0.0).to_numpy(dtype=np.float64)
+    return df['net_cashflow'].to_numpy(dtype=np.float64)
+
+
+def forecast_frame(
+    history_df: pd.DataFrame,
+    months_to_forecast: int,
+    forecaster: Forecaster,
+    params: Optional[dict] = None
+) -> pd.DataFrame:
+    """
+    Runs a forecaster over monthly history.
+
+    Args:
+        history_df: DataFrame with ['month', 'net_cashflow']
+        params: Previously fitted parameters for this history (skips fit()).
+
     Returns:
         DataFrame with ['forecast_month', 'predicted_cashflow', 'lower_bound', 'upper_bound']
     """
     if history_df.empty or 'net_cashflow' not in history_df.columns:
-         return pd.DataFrame()
+        return pd.DataFrame()
 
-    # Ensure sorted
-    df = history_df.sort_values('month').copy()
-    
-    # 1. Determine Baseline
-    values = df['net_cashflow'].values
-    
-    if len(values) >= 3:
-        # Simple weighted average of last 3
-        # Giving slight weight to most recent
-        baseline = (values[-3] * 0.3) + (values[-2] * 0.3) + (values[-1] * 0.4)
-    else:
-        # Not enough data, use global mean
-        baseline = np.mean(values)
-        
-    # 2. Project Forward
-    # Get last actual month
-    last_month_str = df['month'].iloc[-1]
+    if params is None:
+        params = forecaster.fit(history_values(history_df, forecaster))
+    prediction, lower, upper = forecaster.predict(params, months_to_forecast)
+
+    last_month_str = history_df['month'].max()
     last_date = date.fromisoformat(f"{last_month_str}-01")
-    
+
     forecast_rows = []
-    
-    for i in range(1, months_to_forecast + 1):
-        next_date = last_date + relativedelta(months=i)
-        next_month_str = next_date.strftime("%Y-%m")
-        
-        # In a real model, we'd apply a trend or seasonality here.
-        # For MVP, flat line projection is often safer than wild polynomial fits.
-        prediction = float(baseline)
-        
-        # Uncertainty (20%)
-        # TODO: Calculate std dev of history for dynamic bounds
-        uncertainty = abs(prediction) * 0.2
-        
+    for i, (p, lo, hi) in enumerate(zip(prediction.tolist(), lower.tolist(), upper.tolist()), start=1):
         forecast_rows.append({
-            "forecast_month": next_month_str,
-            "predicted_cashflow": round(prediction, 2),
-            "lower_bound": round(prediction - uncertainty, 2),
-            "upper_bound": round(prediction + uncertainty, 2)
+            "forecast_month": (last_date + relativedelta(months=i)).strftime("%Y-%m"),
+            "predicted_cashflow": round(p, 2),
+            "lower_bound": round(lo, 2),
+            "upper_bound": round(hi, 2)
         })
-        
     return pd.DataFrame(forecast_rows)
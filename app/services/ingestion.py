@@ -1,17 +1,184 @@
 
 import io
+import time
 import uuid
+import asyncio
+import hashlib
+import numpy as np
 import pandas as pd
 from decimal import Decimal
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, BinaryIO
+from typing import List, BinaryIO, Optional, Callable, Dict
 
 from app.models.database_schema import Transaction, FinancialAccount
 from app.schemas.common import TransactionDirection
+from app.services.bulk_writer import build_transaction_rows, bulk_insert_transactions
+from app.services.categorization import categorize_frame, load_user_rules
+from app.services.data_processing import normalize_merchant_column
+from app.services.recurring import detect_recurring
 
 REQUIRED_COLUMNS = {"date", "description", "amount"}
 
+# Cap on how many bad rows are spelled out in the error message.
+# The full list is always available on RowValidationError.errors.
+MAX_REPORTED_ERRORS = 20
+
+# Rows parsed per chunk in streaming mode. Bounds peak memory to roughly one chunk
+# of raw rows plus its row dicts, independent of the file size.
+STREAM_CHUNK_ROWS = 50_000
+
+
+class RowValidationError(ValueError):
+    """
+    Raised when one or more CSV rows fail normalization.
+    `errors` holds every bad row as {"row": <line in file>, "error": <reason>}.
+    """
+
+    def __init__(self, errors: List[dict], rows_committed: int = 0):
+        self.errors = errors
+        self.rows_committed = rows_committed
+        preview = "; ".join(f"row {e['row']}: {e['error']}" for e in errors[:MAX_REPORTED_ERRORS])
+        if len(errors) > MAX_REPORTED_ERRORS:
+            preview += f"; ... and {len(errors) - MAX_REPORTED_ERRORS} more"
+        message = f"Row data error in {len(errors)} row(s): {preview}"
+        if rows_committed:
+            message += f" ({rows_committed} rows from earlier chunks were already committed)"
+        super().__init__(message)
+
+
+def parse_date_column(raw: pd.Series) -> pd.Series:
+    """
+    Parses a whole date column at once.
+
+    The fast path lets pandas infer a single format from the column. Rows that
+    don't fit the inferred format (mixed-format exports) are retried with
+    per-element parsing, which matches what per-row `pd.to_datetime` accepted.
+    """
+    parsed = pd.to_datetime(raw, errors="coerce")
+    retry = parsed.isna() & raw.notna()
+    if retry.any():
+        parsed.loc[retry] = pd.to_datetime(raw[retry], errors="coerce", format="mixed")
+    return parsed
+
+
+def parse_amount_column(raw: pd.Series) -> pd.Series:
+    """
+    Converts a whole amount column to float64.
+    Handles '$', thousands separators, whitespace and accounting-style
+    parenthesized negatives, e.g. "(1,200.50)" -> -1200.5. Unparseable cells become NaN.
+    """
+    if pd.api.types.is_numeric_dtype(raw):
+        return raw.astype("float64")
+
+    text = raw.astype("string").str.strip()
+    negative = text.str.startswith("(") & text.str.endswith(")")
+    cleaned = text.str.replace(r"[\s$,()]", "", regex=True)
+    amounts = pd.to_numeric(cleaned, errors="coerce").astype("float64")
+    return amounts.where(~negative.fillna(False), -amounts)
+
+
+def normalize_transactions_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Column-at-a-time normalization of a raw CSV frame.
+
+    Args:
+        df: Frame with (already lower-cased) date, description, amount columns.
+            Its index is assumed to be the 0-based data row position in the file,
+            which holds for frames and chunks coming out of `pd.read_csv`.
+
+    Returns:
+        DataFrame with ['transaction_date', 'description', 'merchant_name', 'amount',
+        'direction', 'raw_import_data']. 'amount' is the absolute value, 'direction' is
+        derived from the sign, 'merchant_name' is the normalized merchant key.
+
+    Raises:
+        RowValidationError listing every bad row (line numbers in the file, header is line 1).
+    """
+    dates = parse_date_column(df["date"])
+    amounts = parse_amount_column(df["amount"])
+
+    bad_date = dates.isna()
+    bad_amount = amounts.isna()
+    if bad_date.any() or bad_amount.any():
+        errors = []
+        for idx in df.index[bad_date | bad_amount]:
+            reasons = []
+            if bad_date[idx]:
+                reasons.append(f"invalid date {df.at[idx, 'date']!r}")
+            if bad_amount[idx]:
+                reasons.append(f"invalid amount {df.at[idx, 'amount']!r}")
+            errors.append({"row": int(idx) + 2, "error": ", ".join(reasons)})
+        raise RowValidationError(errors)
+
+    values = amounts.to_numpy()
+    # Income > 0, everything else (including zero) is an expense, same as the row-wise path
+    direction = np.where(
+        values > 0, TransactionDirection.INCOME.value, TransactionDirection.EXPENSE.value
+    )
+
+    description = df["description"].astype(str).str.strip()
+    return pd.DataFrame({
+        "transaction_date": dates.dt.date,
+        "description": description,
+        "merchant_name": normalize_merchant_column(description),
+        "amount": np.abs(values),
+        "direction": direction,
+        # Store raw row for ML/Audit later, stringified to stay JSON serializable
+        "raw_import_data": df.astype(str).to_dict("records"),
+    }, index=df.index)
+
+
+def compute_fingerprints(
+    clean: pd.DataFrame,
+    account_id: uuid.UUID,
+    seen_counts: Optional[Dict[str, int]] = None
+) -> pd.Series:
+    """
+    Stable per-row fingerprint: SHA-256 of account, date, signed amount,
+    normalized description and the row's import ordinal.
+
+    The ordinal numbers identical rows within one upload (0, 1, 2, ...), so two
+    genuine same-day coffees stay distinct while a re-upload of the same export
+    maps onto exactly the same fingerprints.
+
+    Args:
+        seen_counts: Running {key: occurrences} across chunks of one streamed
+            upload, so ordinals continue over chunk boundaries. Updated in place.
+    """
+    desc = clean["description"].str.lower().str.replace(r"\s+", " ", regex=True)
+    signed = np.where(
+        clean["direction"] == TransactionDirection.INCOME.value, clean["amount"], -clean["amount"]
+    )
+    key = (
+        f"{account_id}|"
+        + clean["transaction_date"].astype(str)
+        + "|" + pd.Series(np.char.mod("%.4f", signed), index=clean.index)
+        + "|" + desc
+    )
+
+    ordinal = key.groupby(key, sort=False).cumcount()
+    if seen_counts is not None:
+        ordinal += key.map(seen_counts).fillna(0).astype(int)
+        for k, n in key.value_counts(sort=False).items():
+            seen_counts[k] = seen_counts.get(k, 0) + n
+
+    return pd.Series(
+        [hashlib.sha256(f"{k}|{o}".encode()).hexdigest() for k, o in zip(key, ordinal)],
+        index=clean.index,
+    )
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Lower-cases/strips headers and validates the required columns are present."""
+    # We strip whitespace from columns to be forgiving
+    df.columns = df.columns.str.strip().str.lower()
+    missing = REQUIRED_COLUMNS - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+    return df
+
+
 class IngestionService:
     
     @staticmethod
@@ -26,9 +193,12 @@ class IngestionService:
         
         Logic:
         - Validates columns (date, description, amount)
-        - Normalizes types (Decimals, Dates)
+        - Normalizes types column-wise (Decimals, Dates)
         - Infers Direction (Income > 0, Expense < 0)
+        - Categorizes rows (user override rules first, then the built-in rules)
         - Stores raw row in JSONB for audit
+        - Skips rows already imported earlier (fingerprint dedup)
+        - Re-runs recurring detection for the merchants in the file
         """
         
         if not file_content:
@@ -39,73 +209,35 @@ class IngestionService:
             df = pd.read_csv(io.BytesIO(file_content))
             
             # 1. Validate Columns
-            # We strip whitespace from columns to be forgiving
-            df.columns = df.columns.str.strip().str.lower()
-            missing = REQUIRED_COLUMNS - set(df.columns)
-            if missing:
-                raise ValueError(f"Missing required columns: {missing}")
+            df = normalize_columns(df)
             
             # 2. empty check
             if df.empty:
                 raise ValueError("CSV contains no data rows")
 
-            objects_to_add = []
-            
-            # 3. Iterate and Normalize
-            # using itertuples for speed, but iterrows is fine for MVP volumes
-            for _, row in df.iterrows():
-                # Data cleanup
-                try:
-                    raw_date = row['date']
-                    raw_desc = row['description'] 
-                    raw_amount = row['amount']
-                    
-                    # Date Parsing (Handle common formats)
-                    # pandas to_datetime is smart but we want strict python objects
-                    txn_date = pd.to_datetime(raw_date).date()
-                    
-                    # Decimal conversion (handle currency symbols if present? MVP assumes clean #s)
-                    # TODO: Add robust string cleaning (remove '$', ',')
-                    amount_val = Decimal(str(raw_amount))
-                    
-                    # Infer Direction
-                    if amount_val > 0:
-                        direction = TransactionDirection.INCOME
-                        clean_amount = amount_val
-                    else:
-                        direction = TransactionDirection.EXPENSE
-                        clean_amount = abs(amount_val)
-                    
-                    # Store Raw Data for ML/Audit later
-                    # Convert row to dict, ensure JSON serializable
-                    raw_data = row.to_dict()
-                    # Pandas timestamps aren't JSON serializable by default, cast to str if needed
-                    # but pure read_csv usually keeps strings unless parsed. row.to_dict handles basic types.
-                    
-                    txn = Transaction(
-                        id=uuid.uuid4(),
-                        account_id=account_id,
-                        user_id=user_id,
-                        transaction_date=txn_date,
-                        description=str(raw_desc).strip(),
-                        amount=clean_amount,
-                        direction=direction,
-                        raw_import_data={k: str(v) for k, v in raw_data.items()} # Safest for JSONB
-                    )
-                    objects_to_add.append(txn)
-                    
-                except Exception as e:
-                    # In a real app, we might log errors formatted and continue partial insert,
-                    # or fail hard. For MVP, failing hard on bad data is safer integration.
-                    raise ValueError(f"Row data error: {e} | Content: {row.to_dict()}")
-
-            if objects_to_add:
-                db.add_all(objects_to_add)
-                await db.commit()
+            # 3. Normalize whole columns at once (raises with every bad row)
+            clean = normalize_transactions_frame(df)
+
+            clean["fingerprint"] = compute_fingerprints(clean, account_id)
+            clean[["category_primary", "category_detailed"]] = categorize_frame(
+                clean, await load_user_rules(db, user_id)
+            )
+
+            # 4. Bulk write (Core INSERT / COPY, committed in batches).
+            # Rows already present from an earlier upload are skipped by the unique fingerprint index.
+            rows = build_transaction_rows(clean, user_id, account_id)
+            rows_ingested = await bulk_insert_transactions(db, rows)
+
+            # 5. Re-classify only the merchant groups this file touched
+            recurring_updated = 0
+            if rows_ingested:
+                recurring_updated = await detect_recurring(db, user_id, clean["merchant_name"].unique())
             
             return {
                 "status": "success", 
-                "rows_ingested": len(objects_to_add)
+                "rows_ingested": rows_ingested,
+                "rows_skipped": len(rows) - rows_ingested,
+                "recurring_updated": recurring_updated
             }
 
         except pd.errors.EmptyDataError:
@@ -117,3 +249,120 @@ class IngestionService:
             if isinstance(e, ValueError):
                 raise e
             raise RuntimeError(f"Ingestion failed: {str(e)}")
+
+    @staticmethod
+    async def process_csv_stream(
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        account_id: uuid.UUID,
+        file_obj: BinaryIO,
+        chunk_rows: int = STREAM_CHUNK_ROWS,
+        on_chunk: Optional[Callable[[dict], None]] = None
+    ) -> dict:
+        """
+        Streaming variant of process_csv_upload for very large exports.
+
+        Logic:
+        - Parses the file `chunk_rows` rows at a time (parsing runs in a worker
+          thread so the event loop stays responsive)
+        - Normalizes and bulk-writes each chunk before reading the next one,
+          so peak memory stays flat
+        - Reports per-chunk stats; `on_chunk` (if given) is called with each one
+        - Runs recurring detection once at the end, over the merchants of every
+          chunk that inserted rows
+
+        A bad chunk aborts the upload; chunks before it stay committed and the
+        error says how many rows that was. Since rows are fingerprinted, simply
+        re-uploading the fixed file picks up where it stopped.
+
+        Import ordinals only carry across a chunk boundary for rows dated like
+        the chunk's last row, so the file must be in date order (either way);
+        a row dated on a day an earlier chunk already closed aborts the upload
+        like a bad chunk. What's kept between chunks is that carry plus the set
+        of closed days, neither of which grows with the file.
+        """
+        try:
+            reader = pd.read_csv(file_obj, chunksize=chunk_rows)
+            chunks = []
+            total_rows = 0
+            total_skipped = 0
+            seen_counts: Dict[str, int] = {}
+            closed_dates = set()
+            touched_merchants = set()
+            user_rules = await load_user_rules(db, user_id)
+
+            while True:
+                started = time.perf_counter()
+                df = await asyncio.to_thread(next, reader, None)
+                if df is None:
+                    break
+
+                df = normalize_columns(df)
+                if df.empty:
+                    continue
+
+                try:
+                    clean = await asyncio.to_thread(normalize_transactions_frame, df)
+                except RowValidationError as e:
+                    raise RowValidationError(e.errors, rows_committed=total_rows)
+                dates = clean["transaction_date"].astype(str)
+                reopened = dates.isin(closed_dates)
+                if reopened.any():
+                    row = int(reopened.idxmax())
+                    raise ValueError(
+                        f"Row {row + 2} is dated {dates[row]}, a day earlier chunks already ended; "
+                        f"streamed exports must be sorted by date "
+                        f"({total_rows} rows from earlier chunks were already committed)"
+                    )
+                clean["fingerprint"] = compute_fingerprints(clean, account_id, seen_counts)
+                # Only the last row's day can continue in the next chunk
+                boundary = dates.iloc[-1]
+                closed_dates.update(dates.unique())
+                closed_dates.discard(boundary)
+                seen_counts = {k: n for k, n in seen_counts.items() if k.split("|", 2)[1] == boundary}
+                clean[["category_primary", "category_detailed"]] = categorize_frame(clean, user_rules)
+                rows = build_transaction_rows(clean, user_id, account_id)
+                parsed = time.perf_counter()
+
+                rows_ingested = await bulk_insert_transactions(db, rows)
+                total_rows += rows_ingested
+                total_skipped += len(rows) - rows_ingested
+                if rows_ingested:
+                    touched_merchants.update(clean["merchant_name"].unique())
+
+                stats = {
+                    "chunk": len(chunks) + 1,
+                    "first_row": int(df.index[0]) + 2,
+                    "last_row": int(df.index[-1]) + 2,
+                    "rows_ingested": rows_ingested,
+                    "rows_skipped": len(rows) - rows_ingested,
+                    "parse_ms": round((parsed - started) * 1000, 1),
+                    "write_ms": round((time.perf_counter() - parsed) * 1000, 1),
+                }
+                chunks.append(stats)
+                if on_chunk:
+                    on_chunk(stats)
+
+            if not chunks:
+                raise ValueError("CSV contains no data rows")
+
+            recurring_updated = 0
+            if touched_merchants:
+                recurring_updated = await detect_recurring(db, user_id, touched_merchants)
+
+            return {
+                "status": "success",
+                "rows_ingested": total_rows,
+                "rows_skipped": total_skipped,
+                "recurring_updated": recurring_updated,
+                "chunks": chunks
+            }
+
+        except pd.errors.EmptyDataError:
+            raise ValueError("The CSV file is empty")
+        except pd.errors.ParserError:
+            raise ValueError("Invalid CSV format")
+        except Exception as e:
+            if isinstance(e, ValueError):
+                raise e
+            raise RuntimeError(f"Ingestion failed: {str(e)}")
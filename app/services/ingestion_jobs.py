@@ -0,0 +1,171 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import tempfile
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional, Set
+
+from app.core.database import AsyncSessionLocal
+from app.services.ingestion import IngestionService, RowValidationError, MAX_REPORTED_ERRORS
+
+# How many ingestion jobs one worker process runs at the same time.
+# Further jobs wait in the queue until a slot frees up.
+MAX_CONCURRENT_JOBS = int(os.environ.get("INGESTION_MAX_CONCURRENT_JOBS", "2"))
+
+# Uploads are spooled here before processing and removed once the job ends.
+SPOOL_DIR = os.environ.get(
+    "INGESTION_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "fin26_ingestion")
+)
+
+# Finished jobs stay pollable for this long.
+JOB_RETENTION_SECONDS = 3600
+
+
+@dataclass
+class IngestionJob:
+    id: uuid.UUID
+    user_id: uuid.UUID
+    account_id: uuid.UUID
+    spool_path: str
+    size_bytes: int
+    status: str = "queued"  # queued | running | succeeded | failed
+    rows_parsed: int = 0
+    rows_inserted: int = 0
+    rows_skipped: int = 0
+    bytes_processed: int = 0
+    errors: List[dict] = field(default_factory=list)
+    detail: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Linear extrapolation from the share of the file consumed so far."""
+        if self.status != "running" or not self.started_at or not self.bytes_processed:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.size_bytes - self.bytes_processed, 0)
+        return round(elapsed / self.bytes_processed * remaining, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": str(self.id),
+            "status": self.status,
+            "rows_parsed": self.rows_parsed,
+            "rows_inserted": self.rows_inserted,
+            "rows_skipped": self.rows_skipped,
+            "bytes_processed": self.bytes_processed,
+            "size_bytes": self.size_bytes,
+            "eta_seconds": self.eta_seconds,
+            "errors": self.errors,
+            "detail": self.detail,
+        }
+
+
+class IngestionJobManager:
+    """
+    Runs CSV ingestion off the request path.
+
+    Uploads are spooled to local disk and processed by background tasks on the
+    worker's event loop (CSV parsing itself runs in threads, see
+    IngestionService.process_csv_stream). A semaphore caps concurrent jobs.
+
+    Job state lives in process memory, so a job is only visible on the worker
+    that accepted it.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_JOBS,
+        spool_dir: str = SPOOL_DIR,
+        session_factory=AsyncSessionLocal
+    ):
+        self.max_concurrent = max_concurrent
+        self.spool_dir = spool_dir
+        # Jobs outlive the request, so each opens its own session
+        self.session_factory = session_factory
+        self._jobs: Dict[uuid.UUID, IngestionJob] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def submit(self, file_obj: BinaryIO, user_id: uuid.UUID, account_id: uuid.UUID) -> IngestionJob:
+        """Spools the upload to disk and schedules it. Returns immediately after spooling."""
+        self._prune()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        job_id = uuid.uuid4()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"{job_id}.csv")
+        await asyncio.to_thread(self._spool, file_obj, path)
+
+        job = IngestionJob(
+            id=job_id,
+            user_id=user_id,
+            account_id=account_id,
+            spool_path=path,
+            size_bytes=os.path.getsize(path),
+        )
+        self._jobs[job_id] = job
+
+        task = asyncio.create_task(self._run(job))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: uuid.UUID) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    @staticmethod
+    def _spool(file_obj: BinaryIO, path: str) -> None:
+        with open(path, "wb") as out:
+            shutil.copyfileobj(file_obj, out, length=1024 * 1024)
+
+    async def _run(self, job: IngestionJob) -> None:
+        async with self._semaphore:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                with open(job.spool_path, "rb") as f:
+
+                    def on_chunk(stats: dict) -> None:
+                        job.rows_parsed += stats["rows_ingested"] + stats["rows_skipped"]
+                        job.rows_inserted += stats["rows_ingested"]
+                        job.rows_skipped += stats["rows_skipped"]
+                        job.bytes_processed = f.tell()
+
+                    async with self.session_factory() as db:
+                        await IngestionService.process_csv_stream(
+                            db, job.user_id, job.account_id, f, on_chunk=on_chunk
+                        )
+                job.bytes_processed = job.size_bytes
+                job.status = "succeeded"
+            except RowValidationError as e:
+                job.status = "failed"
+                job.errors = e.errors[:MAX_REPORTED_ERRORS]
+                job.detail = str(e)
+            except Exception as e:
+                job.status = "failed"
+                job.detail = str(e)
+            finally:
+                job.finished_at = time.time()
+                try:
+                    os.remove(job.spool_path)
+                except OSError:
+                    pass
+
+    def _prune(self) -> None:
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = IngestionJobManager()
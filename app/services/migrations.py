@@ -0,0 +1,109 @@
+from typing import List
+
+import pandas as pd
+from sqlalchemy import inspect, select, text, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.database_schema import Transaction, CashflowForecast, MonthlyCashflowRollup
+from app.services.data_processing import normalize_direction
+
+# Rows per fingerprint UPDATE executemany
+BACKFILL_BATCH_SIZE = 5_000
+
+# Nullable columns added to existing tables, as (model, column). Old rows keep
+# NULL here; rollup counts are filled in by reconcile_monthly_rollups.
+ADDED_COLUMNS = [
+    (CashflowForecast, "starting_balance"),
+    (MonthlyCashflowRollup, "excluded_income_count"),
+    (MonthlyCashflowRollup, "excluded_expense_count"),
+]
+
+
+async def upgrade_schema(conn: AsyncConnection) -> List[str]:
+    """
+    Brings a database created by an older version up to the current models.
+
+    create_all only creates missing tables; it never alters existing ones, so
+    columns and indexes added to existing tables are applied here, and
+    indexes whose column list has since changed are rebuilt. Every step
+    checks the live schema first, so this is idempotent and runs at startup
+    right after create_all (inside the same transaction).
+
+    Returns:
+        Names of the steps that were applied (empty when already current).
+    """
+    applied = []
+    columns = await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns("transactions")})
+
+    if "fingerprint" not in columns:
+        await conn.execute(text("ALTER TABLE transactions ADD COLUMN fingerprint VARCHAR(64)"))
+        await backfill_fingerprints(conn)
+        applied.append("transactions.fingerprint")
+
+    for model, name in ADDED_COLUMNS:
+        table = model.__table__
+        existing = await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns(table.name)})
+        if name not in existing:
+            column_type = table.c[name].type.compile(dialect=conn.dialect)
+            await conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+            applied.append(f"{table.name}.{name}")
+
+    indexes = await conn.run_sync(
+        lambda c: {ix["name"]: ix["column_names"] for ix in inspect(c).get_indexes("transactions")}
+    )
+    for index in Transaction.__table__.indexes:
+        existing = indexes.get(index.name)
+        if existing == [col.name for col in index.columns]:
+            continue
+        if existing is not None:
+            # Same name, older column list (e.g. before the listing's id tiebreaker)
+            await conn.run_sync(index.drop)
+        await conn.run_sync(index.create)
+        applied.append(index.name)
+
+    return applied
+
+
+async def backfill_fingerprints(conn: AsyncConnection) -> int:
+    """
+    Fingerprints rows imported before fingerprints existed, exactly as
+    ingestion would have (ingestion.compute_fingerprints, ordinals in insert
+    order per account), so re-uploading an old export is deduplicated
+    against them. A fingerprint that's already taken is left NULL rather
+    than failing the unique index; those rows were duplicates to begin with.
+
+    Returns:
+        Number of rows fingerprinted.
+    """
+    from app.services.ingestion import compute_fingerprints
+
+    t = Transaction.__table__
+    result = await conn.execute(
+        select(t.c.id, t.c.account_id, t.c.transaction_date, t.c.amount, t.c.direction, t.c.description)
+        .where(t.c.fingerprint.is_(None))
+        .order_by(t.c.account_id, text("transactions.rowid") if conn.dialect.name == "sqlite" else t.c.created_at)
+    )
+    rows = pd.DataFrame(result.all(), columns=["id", "account_id", "transaction_date", "amount", "direction", "description"])
+    if rows.empty:
+        return 0
+
+    rows["amount"] = rows["amount"].astype(float)
+    labels = rows["direction"].unique()
+    rows["direction"] = rows["direction"].map(dict(zip(labels, map(normalize_direction, labels))))
+    fingerprints = pd.concat([
+        compute_fingerprints(group, account_id) for account_id, group in rows.groupby("account_id", sort=False)
+    ])
+    rows["fingerprint"] = fingerprints.reindex(rows.index)
+
+    taken = await conn.execute(select(t.c.fingerprint).where(t.c.fingerprint.is_not(None)))
+    rows = rows[~rows["fingerprint"].isin(set(taken.scalars().all()))]
+
+    stmt = (
+        update(t)
+        .where(t.c.id == bindparam("row_id"))
+        .values(fingerprint=bindparam("fp"))
+    )
+    params = [{"row_id": row_id, "fp": fp} for row_id, fp in zip(rows["id"], rows["fingerprint"])]
+    for start in range(0, len(params), BACKFILL_BATCH_SIZE):
+        await conn.execute(stmt, params[start:start + BACKFILL_BATCH_SIZE])
+    return len(params)
@@ -0,0 +1,116 @@
+import os
+import uuid
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import MLModel, ModelType, User
+from app.services.forecast_cache import ForecastCache
+from app.services.forecasting import (
+    FORECASTERS, DEFAULT_MODEL, Forecaster, get_forecaster, history_values
+)
+
+# Fitted parameters are a handful of floats per user/model, so this can hold far more entries than the forecast cache
+FITTED_PARAMS_MAX_ENTRIES = int(os.environ.get("FITTED_PARAMS_MAX_ENTRIES", "100000"))
+
+fitted_params_cache = ForecastCache(max_entries=FITTED_PARAMS_MAX_ENTRIES)
+
+
+async def register_forecasters(db: AsyncSession) -> Dict[str, uuid.UUID]:
+    """
+    Makes sure every registered forecaster (name + version) has its MLModel
+    row. Runs at startup: INSERT ... ON CONFLICT DO NOTHING, so workers
+    starting together don't trip over uq_model_version. Commits, so give it
+    a session of its own.
+
+    Returns:
+        MLModel ids by forecaster key.
+    """
+    table = MLModel.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "name": forecaster.model_name,
+            "version": forecaster.version,
+            "model_type": ModelType.FORECASTING.value,
+            "is_active_production": forecaster.name == DEFAULT_MODEL,
+            "parameters": forecaster.describe(),
+            "training_metrics": {},
+            "artifact_path": f"builtin:{type(forecaster).__module__}.{type(forecaster).__name__}",
+        }
+        for forecaster in FORECASTERS.values()
+    ]
+    await db.execute(dialect.insert(table).on_conflict_do_nothing(index_elements=["name", "version"]), rows)
+    await db.commit()
+    model_ids = await _model_ids(db)
+    return {forecaster.key: model_ids[(forecaster.model_name, forecaster.version)] for forecaster in FORECASTERS.values()}
+
+
+async def get_model_id(db: AsyncSession, forecaster: Forecaster) -> Optional[uuid.UUID]:
+    """MLModel row of a forecaster (name + version); None if register_forecasters hasn't run on this database."""
+    result = await db.execute(
+        select(MLModel.id).where(MLModel.name == forecaster.model_name, MLModel.version == forecaster.version)
+    )
+    return result.scalar_one_or_none()
+
+
+async def list_forecasters(db: AsyncSession) -> List[dict]:
+    """Every registered forecaster with its MLModel id (None until registered), for listing. Read-only."""
+    model_ids = await _model_ids(db)
+    return [
+        {
+            "name": forecaster.name,
+            "label": forecaster.label,
+            "version": forecaster.version,
+            "model_id": model_ids.get((forecaster.model_name, forecaster.version)),
+            "is_default": forecaster.name == DEFAULT_MODEL,
+            "parameters": forecaster.describe(),
+        }
+        for forecaster in FORECASTERS.values()
+    ]
+
+
+async def _model_ids(db: AsyncSession) -> Dict[tuple, uuid.UUID]:
+    """MLModel ids of the registered forecasters' rows, by (name, version)."""
+    result = await db.execute(
+        select(MLModel.id, MLModel.name, MLModel.version)
+        .where(MLModel.name.in_([forecaster.model_name for forecaster in FORECASTERS.values()]))
+    )
+    return {(name, version): model_id for model_id, name, version in result.all()}
+
+
+async def resolve_forecaster(db: AsyncSession, user_id: uuid.UUID, model: Optional[str] = None) -> Forecaster:
+    """
+    Forecaster for a request: the explicit `model` if given (ValueError when
+    unknown), else the user's preferences["forecast_model"], else the default.
+    A stale or invalid preference falls back to the default instead of failing.
+    """
+    if model is not None:
+        return get_forecaster(model)
+
+    result = await db.execute(select(User.preferences).where(User.id == user_id))
+    preferences = result.scalar_one_or_none() or {}
+    return FORECASTERS.get(preferences.get("forecast_model"), FORECASTERS[DEFAULT_MODEL])
+
+
+def get_fitted_params(
+    user_id: uuid.UUID,
+    data_version: int,
+    forecaster: Forecaster,
+    history_df: pd.DataFrame
+) -> dict:
+    """
+    Fitted parameters for a user's history, fitted once per process and data version.
+    Keyed like the forecast cache, so new data makes the old entry unreachable.
+    """
+    key = (user_id, forecaster.key, data_version)
+    params = fitted_params_cache.get(key)
+    if params is None:
+        params = forecaster.fit(history_values(history_df, forecaster))
+        # Parameters are a few floats (Holt-Winters adds a 12-entry season)
+        fitted_params_cache.put(key, params, 64 * (len(params) + len(params.get("season", ()))))
+    return params
@@ -0,0 +1,199 @@
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import Transaction
+from app.services.data_processing import normalize_direction, normalize_merchant_column
+from app.services.data_version import bump_data_versions
+
+# Accepted gap in days between two occurrences, per Transaction.recurring_frequency
+FREQUENCY_WINDOWS = {
+    "weekly": (6, 8),
+    "biweekly": (13, 16),
+    "monthly": (26, 35),
+    "yearly": (355, 376),
+}
+
+# Occurrences needed before a series counts as recurring
+MIN_OCCURRENCES = {"weekly": 4, "biweekly": 3, "monthly": 3, "yearly": 2}
+
+# Share of gaps that must fall inside the window (tolerates a skipped or doubled charge)
+MIN_REGULAR_SHARE = 0.75
+
+# Amounts of one merchant within this relative range share a bucket, so a price
+# change of a few percent doesn't split a subscription in two
+AMOUNT_TOLERANCE = 0.2
+
+# Merchants / ids per IN (...) list, well below SQLite's bound-parameter limit
+IN_CHUNK = 500
+
+
+def detect_frequencies(rows: pd.DataFrame) -> pd.Series:
+    """
+    Recurring frequency per transaction (None when not recurring).
+
+    Rows are grouped by (merchant, direction) and, within that, into amount
+    buckets: walking the sorted amounts, a new bucket starts wherever one is
+    more than AMOUNT_TOLERANCE above the bucket's smallest. Each bucket's
+    distinct dates are then tested for weekly / biweekly / monthly / yearly
+    periodicity.
+
+    Args:
+        rows: Frame with 'merchant', 'direction', 'transaction_date', 'amount'.
+
+    Returns:
+        Series aligned with rows.index.
+    """
+    result = pd.Series(None, index=rows.index, dtype=object)
+    if rows.empty:
+        return result
+
+    ordered = rows.sort_values(["merchant", "direction", "amount"])
+    amount = ordered["amount"].to_numpy(dtype=np.float64)
+    new_group = (ordered[["merchant", "direction"]] != ordered[["merchant", "direction"]].shift()).any(axis=1).to_numpy()
+
+    # One pass over the sorted amounts; a bucket never spans more than AMOUNT_TOLERANCE
+    bucket = np.empty(len(amount), dtype=np.int64)
+    current, floor = -1, 0.0
+    for i, (value, first) in enumerate(zip(amount.tolist(), new_group.tolist())):
+        if first or value > floor * (1 + AMOUNT_TOLERANCE) + 0.01:
+            current, floor = current + 1, value
+        bucket[i] = current
+
+    # Distinct occurrence dates per bucket and the gaps between them, all buckets at once
+    occurrences = pd.DataFrame({
+        "bucket": bucket,
+        "date": pd.to_datetime(ordered["transaction_date"]).to_numpy().astype("datetime64[D]"),
+    }).drop_duplicates().sort_values(["bucket", "date"])
+    same_bucket = occurrences["bucket"].eq(occurrences["bucket"].shift()).to_numpy()
+    gaps = occurrences["date"].diff().dt.days.to_numpy(dtype=np.float64)
+    gaps = pd.Series(gaps[same_bucket], index=occurrences["bucket"].to_numpy()[same_bucket])
+    median = gaps.groupby(level=0).median()
+    count = occurrences.groupby("bucket").size().reindex(median.index)
+
+    frequency = pd.Series(None, index=median.index, dtype=object)
+    for name, (low, high) in FREQUENCY_WINDOWS.items():
+        regular = ((gaps >= low) & (gaps <= high)).groupby(level=0).mean()
+        matches = (
+            median.between(low, high)
+            & (regular >= MIN_REGULAR_SHARE)
+            & (count >= MIN_OCCURRENCES[name])
+        )
+        frequency[matches] = name
+
+    result.loc[ordered.index] = frequency.reindex(bucket).to_numpy()
+    return result
+
+
+async def detect_recurring(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    merchants: Optional[Iterable[str]] = None
+) -> int:
+    """
+    Sets is_recurring / recurring_frequency on a user's transactions.
+
+    With `merchants` (the merchant keys touched by an ingestion) only those
+    groups are re-read and re-classified, which keeps the cost proportional to
+    what was just written. Without it the user's whole ledger is scanned.
+    Either way, the user's rows without a merchant key (imported before keys
+    existed) get theirs filled in from the description, and with `merchants`
+    those whose key is one of them join their group.
+
+    Only rows whose flags actually change are written: one UPDATE ... WHERE id
+    IN (...) per frequency and chunk, committed together with a data version
+    bump so cached forecasts pick the new flags up.
+
+    Returns:
+        Number of transactions whose flags changed.
+    """
+    t = Transaction
+    columns = (
+        t.id, t.merchant_name, t.description, t.direction, t.transaction_date,
+        t.amount, t.is_recurring, t.recurring_frequency,
+    )
+    if merchants is None:
+        result = await db.execute(select(*columns).where(t.user_id == user_id))
+        records = result.all()
+    else:
+        merchants = sorted(set(m for m in merchants if m))
+        records = []
+        for start in range(0, len(merchants), IN_CHUNK):
+            result = await db.execute(
+                select(*columns).where(t.user_id == user_id, t.merchant_name.in_(merchants[start:start + IN_CHUNK]))
+            )
+            records.extend(result.all())
+        # Keyless rows are matched on their normalized description below
+        result = await db.execute(select(*columns).where(t.user_id == user_id, t.merchant_name.is_(None)))
+        records.extend(result.all())
+
+    rows = pd.DataFrame(records, columns=[c.key for c in columns])
+    if rows.empty:
+        return 0
+
+    missing = rows["merchant_name"].isna()
+    if missing.any():
+        rows.loc[missing, "merchant_name"] = normalize_merchant_column(rows.loc[missing, "description"])
+        await db.execute(
+            update(t.__table__)
+            .where(t.__table__.c.id == bindparam("row_id"))
+            .values(merchant_name=bindparam("merchant"))
+            .execution_options(synchronize_session=False),
+            [{"row_id": i, "merchant": m} for i, m in zip(rows.loc[missing, "id"], rows.loc[missing, "merchant_name"])],
+        )
+        if merchants is not None:
+            rows = rows[rows["merchant_name"].isin(merchants)]
+
+    labels = rows["direction"].unique()
+    rows["direction"] = rows["direction"].map(dict(zip(labels, map(normalize_direction, labels))))
+    rows["amount"] = rows["amount"].astype(float)
+    rows = rows.rename(columns={"merchant_name": "merchant"})
+
+    flows = rows["direction"].isin(["income", "expense"])
+    detected = pd.Series(None, index=rows.index, dtype=object)
+    detected[flows] = detect_frequencies(rows[flows])
+
+    current = rows["recurring_frequency"].where(rows["is_recurring"].fillna(False).astype(bool), None)
+    changed = (detected.fillna("") != current.fillna("")) | (
+        rows["is_recurring"].fillna(False).astype(bool) != detected.notna()
+    )
+
+    updates: Dict[Optional[str], list] = {}
+    for row_id, frequency in zip(rows.loc[changed, "id"], detected[changed]):
+        updates.setdefault(frequency if pd.notna(frequency) else None, []).append(row_id)
+    for frequency, ids in updates.items():
+        for start in range(0, len(ids), IN_CHUNK):
+            await db.execute(
+                update(t)
+                .where(t.id.in_(ids[start:start + IN_CHUNK]))
+                .values(is_recurring=frequency is not None, recurring_frequency=frequency)
+                .execution_options(synchronize_session=False)
+            )
+
+    if updates:
+        await bump_data_versions(db, [user_id])
+    await db.commit()
+    return int(changed.sum())
+
+
+async def backfill_merchant_keys(db: AsyncSession) -> List[uuid.UUID]:
+    """
+    Runs the full detect_recurring scan for every user with rows that have no
+    merchant key (imported before keys existed, or written around ingestion).
+    Incremental detection selects rows by merchant key, so without one those
+    rows would never be re-examined. Runs at startup; once every row has a
+    key this is a single lookup on ix_transactions_merchant_name. Commits.
+
+    Returns:
+        The users whose rows were backfilled.
+    """
+    t = Transaction
+    result = await db.execute(select(t.user_id).where(t.merchant_name.is_(None)).distinct())
+    user_ids = result.scalars().all()
+    for user_id in user_ids:
+        await detect_recurring(db, user_id)
+    return user_ids
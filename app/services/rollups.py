@@ -0,0 +1,290 @@
+import uuid
+from decimal import Decimal
+from typing import Iterable, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import select, delete, insert, func, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import Transaction, MonthlyCashflowRollup
+from app.services.data_processing import CASHFLOW_COLUMNS, normalize_direction, month_bucket
+from app.services.data_version import bump_data_versions, bump_all_data_versions
+
+KEY_COLUMNS = ["user_id", "account_id", "month"]
+TOTAL_COLUMNS = [
+    "income_total", "expense_total", "transfer_total",
+    "excluded_income_total", "excluded_expense_total",
+]
+COUNT_COLUMNS = [
+    "income_count", "expense_count", "transfer_count",
+    "excluded_income_count", "excluded_expense_count",
+]
+
+# Columns callers pass to compute_rollup_deltas (and that the bulk writer RETURNs)
+DELTA_SOURCE_COLUMNS = [
+    "user_id", "account_id", "transaction_date", "amount", "direction", "is_excluded_from_forecast",
+]
+
+
+def compute_rollup_deltas(rows: Iterable) -> List[dict]:
+    """
+    Aggregates freshly written transactions into per user/account/month deltas.
+
+    Args:
+        rows: Tuples in DELTA_SOURCE_COLUMNS order.
+
+    Returns:
+        One dict per (user_id, account_id, month) with every rollup column.
+    """
+    df = pd.DataFrame(list(rows), columns=DELTA_SOURCE_COLUMNS)
+    if df.empty:
+        return []
+
+    df["month"] = [f"{d.year:04d}-{d.month:02d}" for d in df["transaction_date"]]
+    # Normalize the handful of distinct labels, not every row
+    labels = df["direction"].unique()
+    direction = df["direction"].map(dict(zip(labels, map(normalize_direction, labels))))
+    amount = df["amount"].astype(float)
+    excluded = df["is_excluded_from_forecast"].astype(bool)
+
+    is_income = direction == "income"
+    is_expense = direction == "expense"
+    is_transfer = direction == "transfer"
+
+    df["income_total"] = amount.where(is_income, 0.0)
+    df["expense_total"] = amount.where(is_expense, 0.0)
+    df["transfer_total"] = amount.where(is_transfer, 0.0)
+    df["excluded_income_total"] = amount.where(is_income & excluded, 0.0)
+    df["excluded_expense_total"] = amount.where(is_expense & excluded, 0.0)
+    df["income_count"] = is_income.astype(int)
+    df["expense_count"] = is_expense.astype(int)
+    df["transfer_count"] = is_transfer.astype(int)
+    df["excluded_income_count"] = (is_income & excluded).astype(int)
+    df["excluded_expense_count"] = (is_expense & excluded).astype(int)
+
+    grouped = df.groupby(KEY_COLUMNS, sort=False)[TOTAL_COLUMNS + COUNT_COLUMNS].sum().reset_index()
+
+    deltas = []
+    for rec in grouped.to_dict("records"):
+        for col in TOTAL_COLUMNS:
+            rec[col] = Decimal(f"{rec[col]:.4f}")
+        for col in COUNT_COLUMNS:
+            rec[col] = int(rec[col])
+        deltas.append(rec)
+    return deltas
+
+
+async def apply_rollup_deltas(db: AsyncSession, deltas: List[dict]) -> None:
+    """
+    Adds deltas onto the rollup table with one upsert (INSERT ... ON CONFLICT DO UPDATE).
+    Does not commit, so it lands in the same transaction as the rows it describes.
+    """
+    if not deltas:
+        return
+
+    table = MonthlyCashflowRollup.__table__
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            **{col: table.c[col] + stmt.excluded[col] for col in TOTAL_COLUMNS + COUNT_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt, deltas)
+
+
+async def fetch_monthly_rollup_totals(db: AsyncSession, user_id: uuid.UUID) -> pd.DataFrame:
+    """
+    Monthly income/expense totals for a user from the rollup table, with the
+    forecast-excluded share of each and the number of income/expense rows not
+    excluded alongside, so both the full and the forecast view come from one
+    read (see rollup_cashflow).
+    Returns an empty frame when the user has no rollup rows.
+    """
+    r = MonthlyCashflowRollup
+    query = (
+        select(
+            r.month,
+            func.sum(r.income_total), func.sum(r.expense_total),
+            func.sum(r.excluded_income_total), func.sum(r.excluded_expense_total),
+            func.sum(included_count(r)),
+        )
+        .where(r.user_id == user_id)
+        # Months holding only transfers are not part of the P&L view
+        .where((r.income_count + r.expense_count) > 0)
+        .group_by(r.month)
+        .order_by(r.month)
+    )
+    result = await db.execute(query)
+    return pd.DataFrame(
+        [
+            (m, float(i or 0), float(e or 0), float(xi or 0), float(xe or 0), int(n or 0))
+            for m, i, e, xi, xe, n in result.all()
+        ],
+        columns=["month", "total_income", "total_expense", "excluded_income", "excluded_expense", "included_count"]
+    )
+
+
+def rollup_cashflow(totals: pd.DataFrame, exclude_from_forecast: bool = False) -> pd.DataFrame:
+    """
+    Monthly cashflow (CASHFLOW_COLUMNS) from fetch_monthly_rollup_totals output.
+    With exclude_from_forecast, months whose income and expense rows are all
+    excluded are dropped, as the ledger group-by in fetch_monthly_cashflow does.
+    """
+    df = totals[["month", "total_income", "total_expense"]].copy()
+    if exclude_from_forecast:
+        df["total_income"] = df["total_income"] - totals["excluded_income"]
+        df["total_expense"] = df["total_expense"] - totals["excluded_expense"]
+        df = df[totals["included_count"] > 0].reset_index(drop=True)
+    df["net_cashflow"] = df["total_income"] - df["total_expense"]
+    return df[CASHFLOW_COLUMNS]
+
+
+async def fetch_monthly_rollup(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    exclude_from_forecast: bool = False
+) -> pd.DataFrame:
+    """
+    Monthly cashflow (CASHFLOW_COLUMNS) for a user read from the rollup table.
+    Cost depends on the number of months, not the number of transactions.
+    Returns an empty frame when the user has no rollup rows.
+    """
+    return rollup_cashflow(await fetch_monthly_rollup_totals(db, user_id), exclude_from_forecast)
+
+
+async def roll_up_written_rows(db: AsyncSession, written: Sequence) -> None:
+    """
+    Folds freshly inserted transactions (DELTA_SOURCE_COLUMNS rows) into the
+    rollups. Users who have no rollup rows yet may still have transactions
+    written before rollups existed, so instead of starting their totals from
+    these rows alone, their rollups are rebuilt from the ledger (which already
+    holds the new rows). Everyone else gets the cheap delta upsert.
+    Does not commit.
+    """
+    user_ids = {row.user_id for row in written}
+    r = MonthlyCashflowRollup
+    result = await db.execute(select(r.user_id).where(r.user_id.in_(user_ids)).distinct())
+    covered = set(result.scalars().all())
+
+    first_touch = user_ids - covered
+    if first_touch:
+        await _replace_rollups(db, first_touch)
+    await apply_rollup_deltas(db, compute_rollup_deltas(row for row in written if row.user_id in covered))
+
+
+async def reconcile_monthly_rollups(db: AsyncSession) -> List[uuid.UUID]:
+    """
+    Rebuilds the rollups of every user whose rollup counts don't match their
+    transactions, e.g. rows imported before rollups existed or inserted
+    outside the bulk writer, or who have rows from before the excluded counts. Runs at startup, so the rollup read paths can
+    trust that a user's rollups cover their whole ledger. One grouped count
+    per table; only mismatched users are rebuilt. Commits.
+
+    Returns:
+        The users whose rollups were rebuilt.
+    """
+    t = Transaction
+    is_income, is_expense, is_transfer = _direction_conditions(t)
+    ledger = await db.execute(
+        select(t.user_id, func.count())
+        .where(is_income | is_expense | is_transfer)
+        .group_by(t.user_id)
+    )
+    r = MonthlyCashflowRollup
+    rolled = await db.execute(
+        select(r.user_id, func.sum(r.income_count + r.expense_count + r.transfer_count)).group_by(r.user_id)
+    )
+    ledger_counts = dict(ledger.all())
+    rollup_counts = {u: int(n or 0) for u, n in rolled.all()}
+    # Rolled up before the excluded counts existed
+    uncounted = await db.execute(
+        select(r.user_id).where(r.excluded_income_count.is_(None) | r.excluded_expense_count.is_(None)).distinct()
+    )
+
+    stale = [
+        u for u in ledger_counts.keys() | rollup_counts.keys()
+        if ledger_counts.get(u, 0) != rollup_counts.get(u, 0)
+    ]
+    stale += [u for u in uncounted.scalars().all() if u not in stale]
+    if stale:
+        await _replace_rollups(db, stale)
+        await bump_data_versions(db, stale)
+        await db.commit()
+    return stale
+
+
+async def rebuild_monthly_rollups(db: AsyncSession, user_id: Optional[uuid.UUID] = None) -> int:
+    """
+    Recomputes rollups from the transactions table (for backfills or repairs).
+    Replaces one user's rows, or the whole table when user_id is None, and
+    bumps the data versions of the affected users so cached forecasts are
+    recomputed. Commits.
+
+    Returns:
+        Number of rollup rows written.
+    """
+    written = await _replace_rollups(db, None if user_id is None else [user_id])
+    if user_id is not None:
+        await bump_data_versions(db, [user_id])
+    else:
+        await bump_all_data_versions(db)
+    await db.commit()
+    return written
+
+
+def included_count(r):
+    """Income/expense rows of a rollup row that are not excluded from forecasts."""
+    return r.income_count + r.expense_count - r.excluded_income_count - r.excluded_expense_count
+
+
+def _direction_conditions(t):
+    # like() also matches legacy 'TransactionDirection.INCOME' style values
+    direction = func.lower(t.direction)
+    return direction.like("%income"), direction.like("%expense"), direction.like("%transfer")
+
+
+async def _replace_rollups(db: AsyncSession, user_ids: Optional[Iterable[uuid.UUID]]) -> int:
+    """
+    Replaces the rollup rows of `user_ids` (all users when None) with a single
+    INSERT ... SELECT ... GROUP BY over their transactions. Does not commit.
+
+    Returns:
+        Number of rollup rows written.
+    """
+    t = Transaction
+    month = month_bucket(t.transaction_date, db.get_bind().dialect.name)
+    if month is None:
+        raise RuntimeError(f"Rollup rebuild is not supported on {db.get_bind().dialect.name}")
+
+    is_income, is_expense, is_transfer = _direction_conditions(t)
+    excluded = t.is_excluded_from_forecast == True
+
+    def total(cond):
+        return func.coalesce(func.sum(case((cond, t.amount), else_=0)), 0)
+
+    def count(cond):
+        return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+    source = select(
+        t.user_id, t.account_id, month,
+        total(is_income), total(is_expense), total(is_transfer),
+        total(is_income & excluded), total(is_expense & excluded),
+        count(is_income), count(is_expense), count(is_transfer),
+        count(is_income & excluded), count(is_expense & excluded),
+    ).group_by(t.user_id, t.account_id, month)
+
+    cleanup = delete(MonthlyCashflowRollup)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        source = source.where(t.user_id.in_(user_ids))
+        cleanup = cleanup.where(MonthlyCashflowRollup.user_id.in_(user_ids))
+
+    await db.execute(cleanup)
+    result = await db.execute(
+        insert(MonthlyCashflowRollup).from_select(KEY_COLUMNS + TOTAL_COLUMNS + COUNT_COLUMNS, source)
+    )
+    return result.rowcount
@@ -0,0 +1,552 @@
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, delete, update, insert, func, bindparam, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.database_schema import Scenario, ScenarioModification, CashflowForecast
+from app.schemas.common import (
+    ScenarioCreate, ScenarioUpdate, ScenarioSummary, ScenarioResponse,
+    ScenarioModificationCreate, ScenarioModificationResponse, ForecastResponse, ForecastPoint,
+    ScenarioComparison, ScenarioComparisonSeries
+)
+from app.services.simulation_engine import forecast_arrays, decision_mask, month_index
+
+MODIFICATION_TYPES = ("ONE_TIME", "RECURRING", "EMI")
+
+
+class ScenarioNotFound(LookupError):
+    pass
+
+
+def modification_costs(month_idx: np.ndarray, mod: ScenarioModification) -> np.ndarray:
+    """
+    Cost of one modification in each forecast month (positive = money out).
+
+    Same month rules as SimulationEngine.simulate_decision, plus end_date:
+    RECURRING stops after the end_date month, and EMI without
+    parameters["duration_months"] runs from start_date to end_date inclusive.
+    """
+    duration = (mod.parameters or {}).get("duration_months")
+    if mod.modification_type == "EMI" and duration is None and mod.end_date is not None:
+        duration = month_index(mod.end_date) - month_index(mod.start_date) + 1
+
+    mask = decision_mask(month_idx, mod.modification_type, mod.start_date, duration)
+    if mod.modification_type == "RECURRING" and mod.end_date is not None:
+        mask &= month_idx <= month_index(mod.end_date)
+    return float(mod.amount) * mask
+
+
+def build_series_rows(
+    user_id: uuid.UUID,
+    scenario_id: uuid.UUID,
+    current_balance: Decimal,
+    forecast_df: pd.DataFrame,
+    costs: np.ndarray,
+    model_id: Optional[uuid.UUID] = None
+) -> List[dict]:
+    """
+    CashflowForecast rows for a scenario: the baseline forecast minus the
+    summed modification costs, accumulated into balances. The rows record
+    the forecaster's MLModel id and the starting balance (see series_is_fresh).
+    """
+    month_idx, flows = forecast_arrays(forecast_df)
+    start = float(current_balance)
+    cumulative_cost = np.cumsum(costs)
+    balance = start + np.cumsum(flows) - cumulative_cost
+    lower = start + np.cumsum(forecast_df['lower_bound'].to_numpy(dtype=np.float64)) - cumulative_cost
+    upper = start + np.cumsum(forecast_df['upper_bound'].to_numpy(dtype=np.float64)) - cumulative_cost
+
+    rows = []
+    for m, flow, cost, bal, lo, hi in zip(
+        month_idx.tolist(), flows.tolist(), costs.tolist(), balance.tolist(), lower.tolist(), upper.tolist()
+    ):
+        rows.append({
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "scenario_id": scenario_id,
+            "generated_by_model_id": model_id,
+            "starting_balance": current_balance,
+            "forecast_date": date(m // 12, m % 12 + 1, 1),
+            "projected_balance": Decimal(f"{bal:.4f}"),
+            "projected_income": Decimal(f"{max(flow, 0.0):.4f}"),
+            "projected_expense": Decimal(f"{max(-flow, 0.0) + cost:.4f}"),
+            "confidence_interval_lower": Decimal(f"{lo:.4f}"),
+            "confidence_interval_upper": Decimal(f"{hi:.4f}"),
+        })
+    return rows
+
+
+def series_is_fresh(
+    rows: list,
+    data_changed_at: Optional[datetime],
+    model_id: Optional[uuid.UUID],
+    current_balance: Decimal
+) -> bool:
+    """
+    Whether stored CashflowForecast rows (with created_at,
+    generated_by_model_id and starting_balance) still match what they'd be
+    computed from now: no data change since, the same forecaster (name and
+    version) and the same cash on hand. Rows of an unregistered model never are.
+    """
+    if data_changed_at is not None and data_changed_at >= min(r.created_at for r in rows):
+        return False
+    return model_id is not None and all(
+        r.generated_by_model_id == model_id and r.starting_balance == current_balance for r in rows
+    )
+
+
+class ScenarioService:
+    """
+    Persisted what-if scenarios.
+
+    A scenario's projected series lives in CashflowForecast rows tagged with
+    its scenario_id. Creating a scenario (or reading one whose series is stale,
+    see series_is_fresh) computes the full series; adding, editing or
+    removing a single modification only shifts the stored rows by that
+    modification's cost delta, without touching the other modifications.
+    """
+
+    @staticmethod
+    def _apply_modification(mod: ScenarioModification, data: ScenarioModificationCreate) -> None:
+        if data.modification_type not in MODIFICATION_TYPES:
+            raise ValueError(f"Unknown modification_type '{data.modification_type}', expected one of {MODIFICATION_TYPES}")
+        mod.name = data.name
+        mod.modification_type = data.modification_type
+        mod.amount = data.amount
+        mod.start_date = data.start_date
+        mod.end_date = data.end_date
+        mod.recurrence_rule = "MONTHLY" if data.modification_type == "RECURRING" else None
+        mod.parameters = {"duration_months": data.duration_months} if data.duration_months is not None else {}
+
+    @staticmethod
+    def _modification_response(mod: ScenarioModification) -> ScenarioModificationResponse:
+        return ScenarioModificationResponse(
+            id=mod.id,
+            name=mod.name,
+            modification_type=mod.modification_type,
+            amount=mod.amount,
+            start_date=mod.start_date,
+            end_date=mod.end_date,
+            duration_months=(mod.parameters or {}).get("duration_months"),
+        )
+
+    @staticmethod
+    async def _get(db: AsyncSession, scenario_id: uuid.UUID) -> Scenario:
+        result = await db.execute(
+            select(Scenario).options(selectinload(Scenario.modifications)).where(Scenario.id == scenario_id)
+        )
+        scenario = result.scalar_one_or_none()
+        if scenario is None:
+            raise ScenarioNotFound(f"Scenario {scenario_id} not found")
+        return scenario
+
+    @staticmethod
+    async def _series_inputs(db: AsyncSession, user_id: uuid.UUID) -> Tuple[Optional[uuid.UUID], Decimal]:
+        """(MLModel id of the user's forecaster, current balance): what a series is computed from besides the data."""
+        from app.services.analytics import AnalyticsService
+        from app.services.model_registry import resolve_forecaster, get_model_id
+
+        model_id = await get_model_id(db, await resolve_forecaster(db, user_id))
+        return model_id, await AnalyticsService.get_current_balance(db, user_id)
+
+    @staticmethod
+    async def _stored_series(db: AsyncSession, scenario: Scenario) -> Optional[list]:
+        """
+        (id, forecast_date) of the stored rows, or None when there are none or
+        they are stale (see series_is_fresh).
+        """
+        from app.services.data_version import get_data_version
+
+        f = CashflowForecast
+        result = await db.execute(
+            select(f.id, f.forecast_date, f.created_at, f.generated_by_model_id, f.starting_balance)
+            .where(f.user_id == scenario.user_id, f.scenario_id == scenario.id)
+            .order_by(f.forecast_date)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+
+        _, data_changed_at = await get_data_version(db, scenario.user_id)
+        if not series_is_fresh(rows, data_changed_at, *await ScenarioService._series_inputs(db, scenario.user_id)):
+            return None
+        return rows
+
+    @staticmethod
+    async def recompute(db: AsyncSession, scenario: Scenario) -> None:
+        """Rebuilds the scenario's whole stored series from the current baseline. Does not commit."""
+        from app.services.analytics import AnalyticsService
+        from app.services.model_registry import resolve_forecaster, get_model_id
+
+        current_balance, forecast_df, _ = await AnalyticsService.get_simulation_baseline(db, scenario.user_id)
+        model_id = await get_model_id(db, await resolve_forecaster(db, scenario.user_id))
+        month_idx, _ = forecast_arrays(forecast_df)
+        costs = np.zeros(len(month_idx))
+        for mod in scenario.modifications:
+            costs += modification_costs(month_idx, mod)
+
+        await db.execute(delete(CashflowForecast).where(CashflowForecast.scenario_id == scenario.id))
+        rows = build_series_rows(scenario.user_id, scenario.id, current_balance, forecast_df, costs, model_id)
+        if rows:
+            await db.execute(insert(CashflowForecast), rows)
+
+    @staticmethod
+    async def _shift_series(
+        db: AsyncSession,
+        scenario: Scenario,
+        old: Optional[ScenarioModification],
+        new: Optional[ScenarioModification]
+    ) -> None:
+        """
+        Applies (new cost - old cost) of one modification to the stored rows
+        with a single executemany UPDATE. Falls back to a full recompute when
+        the stored series is missing or stale. Does not commit.
+        """
+        stored = await ScenarioService._stored_series(db, scenario)
+        if stored is None:
+            await ScenarioService.recompute(db, scenario)
+            return
+
+        month_idx = np.fromiter((month_index(r.forecast_date) for r in stored), dtype=np.int64, count=len(stored))
+        delta = np.zeros(len(stored))
+        if new is not None:
+            delta += modification_costs(month_idx, new)
+        if old is not None:
+            delta -= modification_costs(month_idx, old)
+        shift = np.cumsum(delta)
+
+        params = [
+            {"row_id": r.id, "cost": Decimal(f"{c:.4f}"), "shift": Decimal(f"{s:.4f}")}
+            for r, c, s in zip(stored, delta.tolist(), shift.tolist())
+            if c or s
+        ]
+        if not params:
+            return
+
+        table = CashflowForecast.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam("row_id"))
+            .values(
+                projected_expense=table.c.projected_expense + bindparam("cost"),
+                projected_balance=table.c.projected_balance - bindparam("shift"),
+                confidence_interval_lower=table.c.confidence_interval_lower - bindparam("shift"),
+                confidence_interval_upper=table.c.confidence_interval_upper - bindparam("shift"),
+            )
+        )
+        await db.execute(stmt, params)
+
+    @staticmethod
+    async def _touch(db: AsyncSession, scenario_id: uuid.UUID) -> None:
+        await db.execute(update(Scenario).where(Scenario.id == scenario_id).values(updated_at=func.now()))
+
+    @staticmethod
+    async def _response(db: AsyncSession, scenario: Scenario) -> ScenarioResponse:
+        result = await db.execute(
+            select(CashflowForecast)
+            .where(CashflowForecast.user_id == scenario.user_id, CashflowForecast.scenario_id == scenario.id)
+            .order_by(CashflowForecast.forecast_date)
+        )
+        points = [
+            ForecastPoint(
+                date=row.forecast_date,
+                balance=row.projected_balance,
+                income=row.projected_income,
+                expense=row.projected_expense,
+                predicted_balance=row.projected_balance,
+                lower_bound=row.confidence_interval_lower or Decimal(0),
+                upper_bound=row.confidence_interval_upper or Decimal(0),
+            )
+            for row in result.scalars().all()
+        ]
+        return ScenarioResponse(
+            id=scenario.id,
+            user_id=scenario.user_id,
+            name=scenario.name,
+            description=scenario.description,
+            modification_count=len(scenario.modifications),
+            updated_at=scenario.updated_at,
+            modifications=[ScenarioService._modification_response(m) for m in scenario.modifications],
+            forecast=ForecastResponse(scenario_name=scenario.name, data_points=points),
+        )
+
+    @staticmethod
+    async def get_validator(
+        db: AsyncSession,
+        *,
+        user_id: Optional[uuid.UUID] = None,
+        scenario_ids: Optional[List[uuid.UUID]] = None,
+        extra: Sequence = ()
+    ) -> Optional[Tuple[str, Optional[datetime]]]:
+        """
+        HTTP validators for reads of a user's scenarios (all of them, or
+        `scenario_ids`): the user's data version, the forecaster and balance
+        the series are computed from, plus every scenario and modification
+        column, so an edit changes the ETag even within the same second.
+        Reads the scenario rows only, never the series or transactions.
+        `extra` holds any other inputs the response depends on.
+
+        Returns None when `scenario_ids` matches nothing and no user_id was
+        given; the read itself then raises ScenarioNotFound.
+        """
+        from app.services.data_version import get_validator
+
+        s, m = Scenario, ScenarioModification
+        query = select(
+            s.id, s.user_id, s.name, s.description, s.updated_at,
+            m.id, m.name, m.modification_type, m.amount, m.start_date, m.end_date,
+            m.recurrence_rule, m.parameters, m.updated_at,
+        ).outerjoin(m, m.scenario_id == s.id).order_by(s.id, m.id)
+        if user_id is not None:
+            query = query.where(s.user_id == user_id)
+        if scenario_ids is not None:
+            query = query.where(s.id.in_(scenario_ids))
+        rows = [tuple(row) for row in (await db.execute(query)).all()]
+        if user_id is None:
+            if not rows:
+                return None
+            user_id = rows[0][1]
+
+        moments = [moment for row in rows for moment in (row[4], row[13]) if moment is not None]
+        latest = max(moments) if moments else None
+        series_inputs = await ScenarioService._series_inputs(db, user_id)
+        return await get_validator(db, user_id, rows, *series_inputs, *extra, latest)
+
+    @staticmethod
+    async def create_scenario(db: AsyncSession, data: ScenarioCreate) -> ScenarioResponse:
+        # An explicit empty collection, so a scenario without modifications never lazy-loads it
+        scenario = Scenario(
+            id=uuid.uuid4(), user_id=data.user_id, name=data.name, description=data.description, modifications=[]
+        )
+        for item in data.modifications:
+            mod = ScenarioModification(id=uuid.uuid4())
+            ScenarioService._apply_modification(mod, item)
+            scenario.modifications.append(mod)
+        db.add(scenario)
+        await db.flush()
+
+        await ScenarioService.recompute(db, scenario)
+        await db.commit()
+        return await ScenarioService.get_scenario(db, scenario.id)
+
+    @staticmethod
+    async def list_scenarios(db: AsyncSession, user_id: uuid.UUID) -> List[ScenarioSummary]:
+        count = (
+            select(func.count(ScenarioModification.id))
+            .where(ScenarioModification.scenario_id == Scenario.id)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(Scenario, count).where(Scenario.user_id == user_id).order_by(Scenario.created_at)
+        )
+        return [
+            ScenarioSummary(
+                id=s.id, user_id=s.user_id, name=s.name, description=s.description,
+                modification_count=n, updated_at=s.updated_at,
+            )
+            for s, n in result.all()
+        ]
+
+    @staticmethod
+    async def get_scenario(db: AsyncSession, scenario_id: uuid.UUID) -> ScenarioResponse:
+        # Fresh read so updated_at/modifications reflect the latest commit
+        db.expire_all()
+        scenario = await ScenarioService._get(db, scenario_id)
+        if await ScenarioService._stored_series(db, scenario) is None:
+            await ScenarioService.recompute(db, scenario)
+            await db.commit()
+        return await ScenarioService._response(db, scenario)
+
+    @staticmethod
+    async def update_scenario(db: AsyncSession, scenario_id: uuid.UUID, data: ScenarioUpdate) -> ScenarioResponse:
+        scenario = await ScenarioService._get(db, scenario_id)
+        if data.name is not None:
+            scenario.name = data.name
+        if data.description is not None:
+            scenario.description = data.description
+        await db.commit()
+        return await ScenarioService.get_scenario(db, scenario_id)
+
+    @staticmethod
+    async def delete_scenario(db: AsyncSession, scenario_id: uuid.UUID) -> None:
+        scenario = await ScenarioService._get(db, scenario_id)
+        await db.execute(delete(CashflowForecast).where(CashflowForecast.scenario_id == scenario_id))
+        await db.delete(scenario)
+        await db.commit()
+
+    @staticmethod
+    async def add_modification(
+        db: AsyncSession, scenario_id: uuid.UUID, data: ScenarioModificationCreate
+    ) -> ScenarioResponse:
+        scenario = await ScenarioService._get(db, scenario_id)
+        mod = ScenarioModification(id=uuid.uuid4())
+        ScenarioService._apply_modification(mod, data)
+        scenario.modifications.append(mod)
+        await db.flush()
+
+        await ScenarioService._shift_series(db, scenario, None, mod)
+        await ScenarioService._touch(db, scenario_id)
+        await db.commit()
+        return await ScenarioService.get_scenario(db, scenario_id)
+
+    @staticmethod
+    async def update_modification(
+        db: AsyncSession, scenario_id: uuid.UUID, modification_id: uuid.UUID, data: ScenarioModificationCreate
+    ) -> ScenarioResponse:
+        scenario = await ScenarioService._get(db, scenario_id)
+        mod = next((m for m in scenario.modifications if m.id == modification_id), None)
+        if mod is None:
+            raise ScenarioNotFound(f"Modification {modification_id} not found")
+
+        # Snapshot the old values before they are overwritten
+        old = ScenarioModification(
+            modification_type=mod.modification_type, amount=mod.amount, start_date=mod.start_date,
+            end_date=mod.end_date, parameters=dict(mod.parameters or {}),
+        )
+        ScenarioService._apply_modification(mod, data)
+        await db.flush()
+
+        await ScenarioService._shift_series(db, scenario, old, mod)
+        await ScenarioService._touch(db, scenario_id)
+        await db.commit()
+        return await ScenarioService.get_scenario(db, scenario_id)
+
+    @staticmethod
+    async def delete_modification(
+        db: AsyncSession, scenario_id: uuid.UUID, modification_id: uuid.UUID
+    ) -> ScenarioResponse:
+        scenario = await ScenarioService._get(db, scenario_id)
+        mod = next((m for m in scenario.modifications if m.id == modification_id), None)
+        if mod is None:
+            raise ScenarioNotFound(f"Modification {modification_id} not found")
+
+        scenario.modifications.remove(mod)
+        await db.flush()
+
+        await ScenarioService._shift_series(db, scenario, mod, None)
+        await ScenarioService._touch(db, scenario_id)
+        await db.commit()
+        return await ScenarioService.get_scenario(db, scenario_id)
+
+    @staticmethod
+    async def compare(
+        db: AsyncSession, user_id: uuid.UUID, scenario_ids: List[uuid.UUID]
+    ) -> ScenarioComparison:
+        """
+        Baseline plus N scenarios as aligned balance series.
+
+        Every stored series (the baseline has scenario_id NULL) comes back from
+        one query on idx_forecast_user_scenario_date. Series that are missing
+        or stale (see series_is_fresh) are computed in memory from the
+        baseline forecast and the scenario's modifications, without writing
+        anything.
+        """
+        from app.services.analytics import AnalyticsService
+        from app.services.data_version import get_data_version
+
+        result = await db.execute(
+            select(Scenario).options(selectinload(Scenario.modifications))
+            .where(Scenario.user_id == user_id, Scenario.id.in_(scenario_ids))
+        )
+        scenarios = {s.id: s for s in result.scalars().all()}
+        missing = [str(i) for i in scenario_ids if i not in scenarios]
+        if missing:
+            raise ScenarioNotFound(f"Scenarios not found: {', '.join(missing)}")
+
+        f = CashflowForecast
+        result = await db.execute(
+            select(
+                f.scenario_id, f.forecast_date, f.projected_balance,
+                f.created_at, f.generated_by_model_id, f.starting_balance,
+            )
+            .where(f.user_id == user_id, or_(f.scenario_id.in_(scenario_ids), f.scenario_id.is_(None)))
+            .order_by(f.scenario_id, f.forecast_date)
+        )
+        _, data_changed_at = await get_data_version(db, user_id)
+
+        stored = {}
+        for row in result.all():
+            series = stored.setdefault(row.scenario_id, {"dates": [], "balances": [], "rows": []})
+            series["dates"].append(row.forecast_date)
+            series["balances"].append(float(row.projected_balance))
+            series["rows"].append(row)
+        # The stored baseline comes from the nightly batch's model, so users on
+        # another model get theirs computed like their scenarios
+        inputs = await ScenarioService._series_inputs(db, user_id)
+        fresh = {
+            key: series for key, series in stored.items()
+            if series_is_fresh(series["rows"], data_changed_at, *inputs)
+        }
+
+        baseline_inputs = None
+        async def get_baseline_inputs():
+            nonlocal baseline_inputs
+            if baseline_inputs is None:
+                current_balance, forecast_df, _ = await AnalyticsService.get_simulation_baseline(db, user_id)
+                month_idx, flows = forecast_arrays(forecast_df)
+                baseline_inputs = (float(current_balance), month_idx, flows)
+            return baseline_inputs
+
+        # 1. Baseline defines the month axis
+        if None in fresh:
+            months = [d.strftime("%Y-%m") for d in fresh[None]["dates"]]
+            baseline = np.array(fresh[None]["balances"])
+            baseline_source = "stored"
+        else:
+            start, month_idx, flows = await get_baseline_inputs()
+            months = [f"{m // 12:04d}-{m % 12 + 1:02d}" for m in month_idx.tolist()]
+            baseline = start + np.cumsum(flows)
+            baseline_source = "computed"
+        position = {m: i for i, m in enumerate(months)}
+
+        def as_list(values):
+            # Months a stored series doesn't cover are NaN, sent as null
+            return [None if np.isnan(v) else round(v, 2) for v in values.tolist()]
+
+        def summarize(scenario_id, name, balances, source):
+            low = int(np.nanargmin(balances)) if not np.isnan(balances).all() else None
+            delta = balances - baseline
+            return ScenarioComparisonSeries(
+                scenario_id=scenario_id,
+                name=name,
+                source=source,
+                balance=as_list(balances),
+                delta_vs_baseline=as_list(delta),
+                min_balance=round(float(balances[low]), 2) if low is not None else None,
+                min_balance_month=months[low] if low is not None else None,
+                min_balance_delta=(
+                    round(float(balances[low] - baseline.min()), 2) if low is not None else None
+                ),
+            )
+
+        series = [summarize(None, "Baseline", baseline, baseline_source)]
+
+        # 2. Each scenario: stored rows aligned onto the axis, or computed on demand
+        for scenario_id in scenario_ids:
+            scenario = scenarios[scenario_id]
+            balances = np.full(len(months), np.nan)
+            if scenario_id in fresh:
+                for d, b in zip(fresh[scenario_id]["dates"], fresh[scenario_id]["balances"]):
+                    i = position.get(d.strftime("%Y-%m"))
+                    if i is not None:
+                        balances[i] = b
+                source = "stored"
+            else:
+                start, month_idx, flows = await get_baseline_inputs()
+                costs = np.zeros(len(month_idx))
+                for mod in scenario.modifications:
+                    costs += modification_costs(month_idx, mod)
+                for m, b in zip(month_idx.tolist(), (start + np.cumsum(flows - costs)).tolist()):
+                    i = position.get(f"{m // 12:04d}-{m % 12 + 1:02d}")
+                    if i is not None:
+                        balances[i] = b
+                source = "computed"
+            series.append(summarize(scenario_id, scenario.name, balances, source))
+
+        return ScenarioComparison(user_id=user_id, months=months, series=series)
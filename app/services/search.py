@@ -0,0 +1,201 @@
+import re
+import uuid
+import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import select, func, case, text, literal_column, table, column
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models.database_schema import Transaction
+from app.services.data_processing import normalize_direction
+from app.services.transactions import LIST_COLUMNS
+
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+
+# Terms beyond this are ignored; every term must match, so more only narrows the result
+MAX_SEARCH_TERMS = 8
+
+SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = "transactions_fts"
+
+# SQLite: external-content FTS5 index over the transactions table (text lives
+# only in transactions; the index holds postings keyed by rowid), kept in sync by
+# triggers, so every write path (bulk ingestion, merchant backfills) maintains it
+# in the same transaction. user_id is indexed too, so the per-user restriction is
+# a posting-list intersection instead of a post-filter over every user's matches.
+# prefix='2 3' adds prefix indexes for the short prefixes typed while searching.
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        user_id, merchant_name, description,
+        content='transactions', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, user_id, merchant_name, description)
+        VALUES (new.rowid, new.user_id, new.merchant_name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_id, merchant_name, description)
+        VALUES ('delete', old.rowid, old.user_id, old.merchant_name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transactions_fts_update
+    AFTER UPDATE OF user_id, merchant_name, description ON transactions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_id, merchant_name, description)
+        VALUES ('delete', old.rowid, old.user_id, old.merchant_name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, user_id, merchant_name, description)
+        VALUES (new.rowid, new.user_id, new.merchant_name, new.description);
+    END""",
+]
+
+# PostgreSQL: a stored generated tsvector (merchant weighted above description)
+# with a GIN index; the database keeps it current on every insert/update.
+POSTGRES_FTS_DDL = [
+    """ALTER TABLE transactions ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(merchant_name, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_search ON transactions USING GIN (search_vector)",
+]
+
+
+async def ensure_search_index(conn: AsyncConnection) -> None:
+    """
+    Creates the full-text index for the bound dialect if it's missing (idempotent,
+    run at startup). A freshly created SQLite index is filled from the existing rows.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        result = await conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        )
+        exists = result.first() is not None
+        for statement in SQLITE_FTS_DDL:
+            await conn.execute(text(statement))
+        if not exists:
+            await rebuild_search_index(conn)
+    elif dialect == "postgresql":
+        for statement in POSTGRES_FTS_DDL:
+            await conn.execute(text(statement))
+
+
+async def rebuild_search_index(conn: AsyncConnection) -> None:
+    """
+    Re-indexes every transaction from scratch (SQLite). Needed after a VACUUM,
+    which may renumber the implicit rowids the index is keyed on.
+    """
+    await conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def search_terms(query: str) -> List[str]:
+    """Lower-cased word tokens of a user query. Anything else (quotes, operators) is dropped."""
+    return [term.lower() for term in SEARCH_TERM.findall(query)][:MAX_SEARCH_TERMS]
+
+
+def fts5_match(user_id: uuid.UUID, terms: List[str]) -> str:
+    """FTS5 MATCH expression: the user's rows whose merchant or description has every term as a prefix."""
+    words = " AND ".join(f'"{term}"*' for term in terms)
+    return f'user_id : "{user_id.hex}" AND {{merchant_name description}} : ({words})'
+
+
+def tsquery(terms: List[str]) -> str:
+    """PostgreSQL to_tsquery input with every term as a prefix."""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+class SearchService:
+
+    @staticmethod
+    async def search_transactions(
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        query: str,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        offset: int = 0
+    ) -> dict:
+        """
+        Ranked full-text search over a user's transaction descriptions and merchants.
+
+        Every word of `query` must match, each as a prefix ("amaz pri" finds
+        "AMAZON PRIME"). Results are ordered by relevance (BM25 on SQLite,
+        ts_rank on PostgreSQL; merchant matches weigh more than description
+        matches), newest first among equals.
+
+        Returns:
+            {"items": one page of hits with their rank, "total_count",
+             "total_amount", "income_total", "expense_total"}; the totals cover
+             every match, not just the page.
+        """
+        empty = {
+            "items": [], "total_count": 0,
+            "total_amount": Decimal(0), "income_total": Decimal(0), "expense_total": Decimal(0),
+        }
+        terms = search_terms(query)
+        if not terms:
+            return empty
+
+        t = Transaction
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            fts_table = table(FTS_TABLE, column("rowid"))
+            fts = literal_column(FTS_TABLE)
+            source = select(t).join(fts_table, fts_table.c.rowid == literal_column("transactions.rowid"))
+            filters = [fts.op("MATCH")(fts5_match(user_id, terms))]
+            # bm25 is lower-is-better; weights per FTS column (user_id, merchant_name, description)
+            relevance = func.bm25(fts, 0.0, 2.0, 1.0)
+            order = relevance.asc()
+        elif dialect == "postgresql":
+            vector = literal_column("transactions.search_vector")
+            matched = func.to_tsquery("simple", tsquery(terms))
+            source = select(t)
+            filters = [t.user_id == user_id, vector.op("@@")(matched)]
+            relevance = func.ts_rank(vector, matched)
+            order = relevance.desc()
+        else:
+            raise RuntimeError(f"Full-text search is not supported on {dialect}")
+
+        if start_date is not None:
+            filters.append(t.transaction_date >= start_date)
+        if end_date is not None:
+            filters.append(t.transaction_date <= end_date)
+
+        # like() also matches legacy 'TransactionDirection.INCOME' style values
+        direction = func.lower(t.direction)
+        totals = await db.execute(
+            source.with_only_columns(
+                func.count(),
+                func.coalesce(func.sum(t.amount), 0),
+                func.coalesce(func.sum(case((direction.like("%income"), t.amount), else_=0)), 0),
+                func.coalesce(func.sum(case((direction.like("%expense"), t.amount), else_=0)), 0),
+            ).where(*filters)
+        )
+        count, total, income, expense = totals.one()
+        if not count:
+            return empty
+
+        result = await db.execute(
+            source.with_only_columns(*LIST_COLUMNS, relevance.label("rank"))
+            .where(*filters)
+            .order_by(order, t.transaction_date.desc(), t.id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+        items = []
+        for row in result.all():
+            item = row._asdict()
+            item["direction"] = normalize_direction(item["direction"])
+            item["rank"] = round(float(item["rank"]), 6)
+            items.append(item)
+
+        return {
+            "items": items,
+            "total_count": count,
+            "total_amount": Decimal(str(total)).quantize(Decimal("0.01")),
+            "income_total": Decimal(str(income)).quantize(Decimal("0.01")),
+            "expense_total": Decimal(str(expense)).quantize(Decimal("0.01")),
+        }
@@ -1,12 +1,114 @@
-
+import math
 from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import date
 from dateutil.relativedelta import relativedelta
+import numpy as np
 import pandas as pd
 
+# Hardcoded MVP heuristic. Should be dynamic (e.g. 1 month expenses)
+SAFETY_BUFFER = 1000.0
+
+# Monte Carlo defaults
+MC_PATHS = 10_000
+MC_BLOCK_MONTHS = 3 # consecutive history months drawn together, keeps short-range correlation
+
+
+def forecast_arrays(forecast_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extracts (month_index, predicted_cashflow) arrays from a forecast frame.
+    month_index is year * 12 + (month - 1), so month arithmetic is plain integer math.
+    """
+    months = forecast_df['forecast_month'].tolist()
+    month_idx = np.fromiter(
+        (int(m[:4]) * 12 + int(m[5:7]) - 1 for m in months), dtype=np.int64, count=len(months)
+    )
+    flows = forecast_df['predicted_cashflow'].to_numpy(dtype=np.float64)
+    return month_idx, flows
+
+
+def month_index(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def decision_matrix(
+    month_idx: np.ndarray,
+    decision_types: List[str],
+    start_dates: List[date],
+    durations: List[Optional[int]]
+) -> np.ndarray:
+    """
+    Boolean (decisions x months) matrix of the forecast months each decision costs money in.
+
+    ONE_TIME hits its start month, RECURRING every month from the start on,
+    EMI `duration_months` months from the start; unknown types never apply.
+    A ONE_TIME decision whose month falls outside the forecast is applied to
+    the first month instead, so outdated forecasts still show an immediate
+    drop in runway.
+    """
+    n = len(decision_types)
+    starts = np.fromiter((month_index(d) for d in start_dates), dtype=np.int64, count=len(start_dates))
+    dur = np.fromiter((d or 0 for d in durations), dtype=np.int64, count=len(durations))
+
+    offset = month_idx[None, :] - starts[:, None]
+    one_time = np.fromiter((t == "ONE_TIME" for t in decision_types), dtype=bool, count=n)[:, None]
+    recurring = np.fromiter((t == "RECURRING" for t in decision_types), dtype=bool, count=n)[:, None]
+    emi = np.fromiter((t == "EMI" for t in decision_types), dtype=bool, count=n)[:, None]
+
+    mask = (
+        (one_time & (offset == 0))
+        | (recurring & (offset >= 0))
+        | (emi & (offset >= 0) & (offset < dur[:, None]))
+    )
+
+    if mask.shape[1]:
+        missed = one_time[:, 0] & ~mask.any(axis=1)
+        mask[missed, 0] = True
+    return mask
+
+
+def decision_mask(
+    month_idx: np.ndarray,
+    decision_type: str,
+    start_date: date,
+    duration_months: Optional[int] = None
+) -> np.ndarray:
+    """Single-decision row of decision_matrix, without the batch bookkeeping."""
+    offset = month_idx - month_index(start_date)
+
+    if decision_type == "ONE_TIME":
+        mask = offset == 0
+        if len(mask) and not mask.any():
+            mask[0] = True
+    elif decision_type == "RECURRING":
+        mask = offset >= 0
+    elif decision_type == "EMI":
+        mask = (offset >= 0) & (offset < (duration_months or 0))
+    else:
+        mask = np.zeros(len(month_idx), dtype=bool)
+    return mask
+
+
+def recommend(lowest_balance: float, safety_buffer: float = SAFETY_BUFFER) -> Tuple[str, int, str]:
+    """Maps the lowest projected balance to (recommendation, confidence, explanation)."""
+    if lowest_balance < 0:
+        return (
+            "Avoid", 95,
+            f"This decision leads to negative balance (${lowest_balance:,.2f}) in future months."
+        )
+    if lowest_balance < safety_buffer:
+        return (
+            "Caution", 80,
+            f"Balance remains positive but dips below safety buffer (${safety_buffer}). Lowest: ${lowest_balance:,.2f}."
+        )
+    return (
+        "Safe", 90,
+        f"Your balance stays healthy (min ${lowest_balance:,.2f}) throughout the period."
+    )
+
+
 class SimulationEngine:
-    
+
     @staticmethod
     def simulate_decision(
         current_balance: Decimal,
@@ -18,7 +120,7 @@ class SimulationEngine:
     ) -> dict:
         """
         Simulates a financial decision against a forecast.
-        
+
         Args:
             current_balance: Starting cash on hand.
             forecast_df: DataFrame from generate_simple_forecast (cols: forecast_month, predicted_cashflow)
@@ -26,108 +128,25 @@ class SimulationEngine:
             amount: Cost of decision (Positive value treated as expense)
             start_date: When the decision starts.
             duration_months: For EMI only.
-            
+
         Returns:
             Dict with recommendation, confidence, explanation, and impact stats.
         """
         if forecast_df.empty:
             return {"error": "No forecast data available"}
 
-        # 1. Prepare Simulation DataFrame
-        # We work on copies to stay pure
-        sim_df = forecast_df.copy()
-        sim_df['simulated_cashflow'] = sim_df['predicted_cashflow']
-        
-        # 2. Apply Decision Logic
+        # 1. Apply Decision as a month mask
+        month_idx, flows = forecast_arrays(forecast_df)
         impact_amt = float(amount)
-        start_month_str = start_date.strftime("%Y-%m")
-        
-        months_affected_count = 0
-        
-        for idx, row in sim_df.iterrows():
-            row_date = date.fromisoformat(f"{row['forecast_month']}-01")
-            row_month_str = row['forecast_month']
-            
-            # Skip past months if start_date is in future
-            # Simplified logic: compare YYYY-MM strings or dates
-            if row_date < date(start_date.year, start_date.month, 1):
-                continue
-
-            apply_impact = False
-            
-            if decision_type == "ONE_TIME":
-                if row_month_str == start_month_str:
-                    apply_impact = True
-                    
-            elif decision_type == "RECURRING":
-                apply_impact = True # Applies to all future months in forecast
-                
-            elif decision_type == "EMI":
-                # Check if within duration
-                # Calculate months diff
-                diff = (row_date.year - start_date.year) * 12 + (row_date.month - start_date.month)
-                if 0 <= diff < (duration_months or 0):
-                    apply_impact = True
-            
-            if apply_impact:
-                # Subtract expense (assuming amount is cost)
-                sim_df.at[idx, 'simulated_cashflow'] -= impact_amt
-                months_affected_count += 1
-
-        # Fallback: If decision is ONE_TIME and no month was affected (date out of range),
-        # force apply to the first month if date < first, or last month if date > last.
-        # This prevents "zero cost" results for outdated data vs new simulations.
-        if decision_type == "ONE_TIME" and months_affected_count == 0 and not sim_df.empty:
-             # Heuristic: Apply to the first month if we missed it. 
-             # Why first? Because usually "Simulate Now" means "Immediate Impact".
-             # If the forecast is in the future relative to "Now", we can't do much.
-             # But here the forecast is likely OLD (2024) and "Now" is 2026.
-             # So effectively, the expense effectively happened "after" the forecast.
-             # BUT, for the user to see impact on their *runway*, we should apply it to the projected balance.
-             
-             # Let's apply it to the LAST month to show "Eventually you paid this".
-             # Actually, applying to the FIRST month is safer to show "Immediate drop in runway".
-             target_idx = sim_df.index[0]
-             sim_df.at[target_idx, 'simulated_cashflow'] -= impact_amt
-             months_affected_count = 1
-             # We don't modify explanation string here easily as it is generated later, 
-             # but the math will now reflect the drop.
-
-        # 3. Calculate Projected Balances
-        # We need to run a cumulative sum starting from current balance
-        # But wait, 'predicted_cashflow' is Net Flow (Income - Expense).
-        # So Balance[t] = Balance[t-1] + NetFlow[t]
-        
-        # Initialize
-        running_balance = float(current_balance)
-        sim_df['projected_balance'] = 0.0
-        
-        # Apply iteratively
-        lowest_balance = float('inf')
-        
-        for idx, row in sim_df.iterrows():
-            flow = row['simulated_cashflow']
-            running_balance += flow
-            sim_df.at[idx, 'projected_balance'] = running_balance
-            if running_balance < lowest_balance:
-                lowest_balance = running_balance
-
-        # 4. Generate Recommendation
-        # Thresholds
-        safety_buffer = 1000.0 # Hardcoded MVP heuristic. Should be dynamic (e.g. 1 month expenses)
-        
-        if lowest_balance < 0:
-            rec = "Avoid"
-            confidence = 95
-            explanation = f"This decision leads to negative balance (${lowest_balance:,.2f}) in future months."
-        elif lowest_balance < safety_buffer:
-            rec = "Caution"
-            confidence = 80
-            explanation = f"Balance remains positive but dips below safety buffer (${safety_buffer}). Lowest: ${lowest_balance:,.2f}."
-        else:
-            rec = "Safe"
-            confidence = 90
-            explanation = f"Your balance stays healthy (min ${lowest_balance:,.2f}) throughout the period."
+        mask = decision_mask(month_idx, decision_type, start_date, duration_months)
+        months_affected_count = int(mask.sum())
+
+        # 2. Projected Balances: Balance[t] = Balance[0] + cumsum(NetFlow - Cost)
+        balances = float(current_balance) + np.cumsum(flows - impact_amt * mask)
+        lowest_balance = float(balances.min())
+
+        # 3. Generate Recommendation
+        rec, confidence, explanation = recommend(lowest_balance)
 
         return {
             "recommendation": rec,
@@ -139,3 +158,216 @@ class SimulationEngine:
                 "total_cost": round(impact_amt * months_affected_count, 2)
             }
         }
+
+    @staticmethod
+    def simulate_batch(
+        current_balance: Decimal,
+        forecast_df: pd.DataFrame,
+        decisions: List[dict]
+    ) -> List[dict]:
+        """
+        Evaluates many candidate decisions against one forecast in a single pass.
+
+        Builds a (decisions x months) cost matrix, subtracts it from the
+        forecast's net flows and takes one cumulative sum along the month axis,
+        so the cost is one set of NumPy ops regardless of how many decisions come in.
+
+        Args:
+            decisions: Dicts with decision_type, amount, start_date and optionally
+                duration_months (same meaning as simulate_decision's arguments).
+
+        Returns:
+            One simulate_decision-style result per decision, in input order.
+        """
+        if forecast_df.empty:
+            return [{"error": "No forecast data available"} for _ in decisions]
+        if not decisions:
+            return []
+
+        month_idx, flows = forecast_arrays(forecast_df)
+        mask = decision_matrix(
+            month_idx,
+            [d["decision_type"] for d in decisions],
+            [d["start_date"] for d in decisions],
+            [d.get("duration_months") for d in decisions],
+        )
+        amounts = np.fromiter((float(d["amount"]) for d in decisions), dtype=np.float64, count=len(decisions))
+
+        balances = float(current_balance) + np.cumsum(flows[None, :] - amounts[:, None] * mask, axis=1)
+        lowest = balances.min(axis=1)
+        months_affected = mask.sum(axis=1)
+
+        results = []
+        for low, amt, n in zip(lowest.tolist(), amounts.tolist(), months_affected.tolist()):
+            rec, confidence, explanation = recommend(low)
+            results.append({
+                "recommendation": rec,
+                "confidence": confidence,
+                "explanation": explanation,
+                "projected_impact": {
+                    "lowest_balance": round(low, 2),
+                    "months_affected": n,
+                    "total_cost": round(amt * n, 2)
+                }
+            })
+        return results
+
+    @staticmethod
+    def max_affordable_amount(
+        current_balance: Decimal,
+        forecast_df: pd.DataFrame,
+        decision_type: str,
+        start_date: date,
+        duration_months: Optional[int] = None,
+        safety_buffer: float = SAFETY_BUFFER
+    ) -> dict:
+        """
+        Largest amount for a decision that keeps every projected balance at or above the safety buffer.
+
+        Closed form: with C[t] the cumulative forecast net flow and K[t] the
+        number of charged months up to t, the balance for amount `a` is
+        B0 + C[t] - a * K[t]. Each month with K[t] > 0 therefore caps `a` at
+        (B0 + C[t] - buffer) / K[t], and the answer is the tightest cap.
+        Months before the first charge only need B0 + C[t] >= buffer.
+
+        Returns:
+            Dict with max_amount (floored to cents, None if the decision never
+            costs anything in the horizon), binding_month, and baseline stats.
+        """
+        if forecast_df.empty:
+            return {"error": "No forecast data available"}
+
+        month_idx, flows = forecast_arrays(forecast_df)
+        mask = decision_mask(month_idx, decision_type, start_date, duration_months)
+
+        baseline = float(current_balance) + np.cumsum(flows)
+        charged = np.cumsum(mask)
+        headroom = baseline - safety_buffer
+        months = forecast_df['forecast_month'].tolist()
+
+        result = {
+            "decision_type": decision_type,
+            "safety_buffer": safety_buffer,
+            "baseline_lowest_balance": round(float(baseline.min()), 2),
+            "months_affected": int(mask.sum()),
+        }
+
+        uncharged = charged == 0
+        if uncharged.any() and headroom[uncharged].min() < 0:
+            # The baseline alone already dips below the buffer before the decision kicks in
+            t = int(np.argmin(np.where(uncharged, headroom, np.inf)))
+            return {**result, "max_amount": 0.0, "feasible": False, "binding_month": months[t]}
+
+        if not mask.any():
+            return {**result, "max_amount": None, "feasible": True, "binding_month": None}
+
+        caps = np.where(uncharged, np.inf, headroom / np.maximum(charged, 1))
+        t = int(np.argmin(caps))
+        max_amount = float(caps[t])
+        if max_amount < 0:
+            return {**result, "max_amount": 0.0, "feasible": False, "binding_month": months[t]}
+
+        # Floor to cents, then step down a cent if float rounding in the
+        # simulate_decision arithmetic would land a hair under the buffer
+        amount = math.floor(max_amount * 100) / 100
+        start = float(current_balance)
+        if (start + np.cumsum(flows - amount * mask)).min() < safety_buffer:
+            amount = max(round(amount - 0.01, 2), 0.0)
+
+        return {
+            **result,
+            "max_amount": amount,
+            "feasible": True,
+            "binding_month": months[t],
+        }
+
+    @staticmethod
+    def monte_carlo(
+        current_balance: Decimal,
+        history_df: pd.DataFrame,
+        months: int = 24,
+        n_paths: int = MC_PATHS,
+        block_size: int = MC_BLOCK_MONTHS,
+        seed: Optional[int] = None,
+        decision: Optional[dict] = None
+    ) -> dict:
+        """
+        Runway under uncertainty, by resampling the user's own monthly net cashflow.
+
+        Uses a circular block bootstrap: each path is stitched together from
+        random runs of `block_size` consecutive history months, so a bad month
+        followed by another bad month stays possible. All paths are drawn as one
+        (paths x months) index matrix and turned into balances with a single
+        cumulative sum, so 10k paths x 24 months is a few milliseconds.
+
+        Args:
+            history_df: Monthly cashflow (CASHFLOW_COLUMNS), e.g. from fetch_monthly_cashflow.
+            seed: Seed for np.random.default_rng; the same seed gives the same result.
+            decision: Optional simulate_decision-style dict (decision_type, amount,
+                start_date, duration_months) whose cost is applied to every path.
+
+        Returns:
+            Dict with overdraft probability, expected runway (months before the
+            balance first goes negative, capped at the horizon) and P5/P50/P95
+            balances per month.
+        """
+        if history_df.empty:
+            return {"error": "No cashflow history available"}
+
+        df = history_df.sort_values('month')
+        history = df['net_cashflow'].to_numpy(dtype=np.float64)
+        n_hist = len(history)
+        block = max(1, min(block_size, n_hist))
+
+        # Forecast months follow the last history month
+        last = df['month'].iloc[-1]
+        month_idx = int(last[:4]) * 12 + int(last[5:7]) + np.arange(months, dtype=np.int64)
+        labels = [f"{m // 12:04d}-{m % 12 + 1:02d}" for m in month_idx.tolist()]
+
+        # 1. Sample (paths x months) history indices, block by block
+        rng = np.random.default_rng(seed)
+        n_blocks = -(-months // block)
+        starts = rng.integers(0, n_hist, size=(n_paths, n_blocks))
+        idx = (starts[:, :, None] + np.arange(block)) % n_hist
+        flows = history[idx.reshape(n_paths, n_blocks * block)[:, :months]]
+
+        # 2. Balance paths, with the decision's cost shared by every path
+        balances = float(current_balance) + np.cumsum(flows, axis=1)
+        result = {}
+        if decision is not None:
+            baseline_overdraft = (balances.min(axis=1) < 0).mean()
+            mask = decision_mask(
+                month_idx, decision["decision_type"], decision["start_date"], decision.get("duration_months")
+            )
+            balances -= np.cumsum(float(decision["amount"]) * mask)
+            result["baseline_overdraft_probability"] = round(float(baseline_overdraft), 4)
+
+        # 3. Summaries
+        negative = balances < 0
+        overdrawn = negative.any(axis=1)
+        # argmax finds the first negative month; paths that never go negative are censored at the horizon
+        runway = np.where(overdrawn, negative.argmax(axis=1), months)
+        p5, p50, p95 = np.percentile(balances, [5, 50, 95], axis=0)
+        overdraft_by_month = np.cumsum(negative, axis=1).astype(bool).mean(axis=0)
+
+        return {
+            **result,
+            "paths": n_paths,
+            "horizon_months": months,
+            "history_months": n_hist,
+            "overdraft_probability": round(float(overdrawn.mean()), 4),
+            "expected_runway_months": round(float(runway.mean()), 2),
+            "runway_censored_share": round(float(1 - overdrawn.mean()), 4),
+            "bands": [
+                {
+                    "month": m,
+                    "p5": round(a, 2),
+                    "p50": round(b, 2),
+                    "p95": round(c, 2),
+                    "overdraft_probability": round(o, 4),
+                }
+                for m, a, b, c, o in zip(
+                    labels, p5.tolist(), p50.tolist(), p95.tolist(), overdraft_by_month.tolist()
+                )
+            ],
+        }
@@ -0,0 +1,122 @@
+import uuid
+import base64
+import binascii
+import datetime
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database_schema import Transaction
+from app.services.data_processing import normalize_direction
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# What a listing returns. raw_import_data (the heavy JSON audit column) is never selected.
+LIST_COLUMNS = (
+    Transaction.id,
+    Transaction.account_id,
+    Transaction.transaction_date,
+    Transaction.amount,
+    Transaction.direction,
+    Transaction.currency,
+    Transaction.description,
+    Transaction.merchant_name,
+    Transaction.category_primary,
+    Transaction.category_detailed,
+    Transaction.is_recurring,
+    Transaction.recurring_frequency,
+)
+
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that wasn't produced by encode_cursor."""
+
+
+def encode_cursor(transaction_date: datetime.date, transaction_id: uuid.UUID) -> str:
+    """Opaque cursor for the position after (transaction_date, id)."""
+    raw = f"{transaction_date.isoformat()}|{transaction_id.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.date, uuid.UUID]:
+    """Inverse of encode_cursor; raises InvalidCursor for anything it didn't produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, row_id = raw.split("|")
+        return datetime.date.fromisoformat(day), uuid.UUID(hex=row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+
+class TransactionService:
+
+    @staticmethod
+    async def list_transactions(
+        db: AsyncSession,
+        user_id: uuid.UUID,
+        account_id: Optional[uuid.UUID] = None,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        category: Optional[str] = None,
+        direction: Optional[str] = None,
+        min_amount: Optional[Decimal] = None,
+        max_amount: Optional[Decimal] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> dict:
+        """
+        One page of a user's transactions, newest first.
+
+        Keyset pagination on (transaction_date, id) under the user: a page is
+        a seek into idx_transactions_user_date followed by `limit` index-ordered
+        rows, so page 10,000 costs the same as page 1 (no OFFSET scan).
+        Pass the returned `next_cursor` back to continue; it is None on the last page.
+
+        Raises:
+            InvalidCursor (a ValueError) for malformed cursors.
+        """
+        t = Transaction
+        filters = [t.user_id == user_id]
+        if account_id is not None:
+            filters.append(t.account_id == account_id)
+        if start_date is not None:
+            filters.append(t.transaction_date >= start_date)
+        if end_date is not None:
+            filters.append(t.transaction_date <= end_date)
+        if category is not None:
+            filters.append(t.category_primary == category)
+        if direction is not None:
+            # Also match legacy 'TransactionDirection.INCOME' style values
+            filters.append(t.direction.in_([direction, f"TransactionDirection.{direction.upper()}"]))
+        if min_amount is not None:
+            filters.append(t.amount >= min_amount)
+        if max_amount is not None:
+            filters.append(t.amount <= max_amount)
+        if cursor is not None:
+            after_date, after_id = decode_cursor(cursor)
+            filters.append(tuple_(t.transaction_date, t.id) < (after_date, after_id))
+
+        result = await db.execute(
+            select(*LIST_COLUMNS)
+            .where(*filters)
+            .order_by(t.transaction_date.desc(), t.id.desc())
+            .limit(limit + 1)
+        )
+        rows = result.all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = []
+        for row in rows:
+            item = row._asdict()
+            item["direction"] = normalize_direction(item["direction"])
+            items.append(item)
+
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(rows[-1].transaction_date, rows[-1].id) if has_more else None,
+            "has_more": has_more,
+        }
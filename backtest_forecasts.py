@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+import numpy as np
+
+# Add current directory to path
+sys.path.append(os.getcwd())
+
+from app.services.backtesting import (
+    synthetic_histories, run_backtest, compare_reports, MIN_TRAIN_MONTHS, HORIZON_MONTHS
+)
+from app.services.forecasting import FORECASTERS
+
+
+def cell(value, width: int, decimals: int) -> str:
+    """A right-aligned table cell; "n/a" for metrics the backtest couldn't compute (e.g. no scorable actuals)."""
+    return f"{'n/a':>{width}}" if value is None else f"{value:>{width}.{decimals}f}"
+
+
+async def recorded_histories(limit: int, min_months: int):
+    """
+    Monthly net cashflow of up to `limit` users from the rollup table, as
+    calendar-aligned series (months without activity count as 0).
+    """
+    from sqlalchemy import select
+    from app.core.database import AsyncSessionLocal, engine
+    from app.models.database_schema import UserDataVersion
+    from app.services.batch_forecasting import fetch_page_history
+
+    engine.echo = False
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(select(UserDataVersion.user_id).limit(limit))).scalars().all()
+        history = await fetch_page_history(db, user_ids) if user_ids else None
+
+    series = []
+    if history is None or history.empty:
+        return series
+    history["net"] = history["income"] - history["expense"]
+    history["index"] = [int(m[:4]) * 12 + int(m[5:7]) - 1 for m in history["month"]]
+    for _, user in history.groupby("user_id"):
+        values = np.zeros(user["index"].max() - user["index"].min() + 1)
+        values[user["index"] - user["index"].min()] = user["net"]
+        if len(values) >= min_months:
+            series.append(values)
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the registered forecasting models.")
+    parser.add_argument("--users", type=int, default=50, help="Synthetic users per dataset shape")
+    parser.add_argument("--months", type=int, default=36, help="Synthetic history length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN_MONTHS)
+    parser.add_argument("--horizon", type=int, default=HORIZON_MONTHS)
+    parser.add_argument("--models", default=",".join(FORECASTERS), help="Comma-separated model names")
+    parser.add_argument("--recorded", type=int, default=0, help="Also replay up to N users' histories from the database")
+    parser.add_argument("--out", default="backtest_report.json")
+    parser.add_argument("--baseline", help="Previous report; exit 1 on accuracy or latency regressions against it")
+    args = parser.parse_args()
+
+    datasets = synthetic_histories(args.users, args.months, args.seed)
+    if args.recorded:
+        recorded = asyncio.run(recorded_histories(args.recorded, args.min_train + args.horizon))
+        if recorded:
+            datasets["recorded"] = recorded
+
+    report = run_backtest(datasets, args.models.split(","), args.min_train, args.horizon)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'model':<14}{'MAE':>12}{'MAPE %':>10}{'coverage':>10}{'fit p95 µs':>12}{'pred p95 µs':>12}")
+    for name, model in report["models"].items():
+        o = model["overall"]
+        print(
+            f"{name:<14}{cell(o.get('mae'), 12, 2)}{cell(o.get('mape'), 10, 1)}{cell(o.get('coverage'), 10, 2)}"
+            f"{cell(o.get('fit_us', {}).get('p95'), 12, 1)}{cell(o.get('predict_us', {}).get('p95'), 12, 1)}"
+        )
+    print(f"Report written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare_reports(json.load(f), report)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    # Usage: python backtest_forecasts.py [--recorded 500] [--baseline previous_report.json]
+    main()
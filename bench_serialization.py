@@ -0,0 +1,132 @@
+import os
+import sys
+import gzip
+import json
+import time
+import datetime
+import statistics
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add current directory to path
+sys.path.append(os.getcwd())
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, GZIP_LEVEL, BROTLI_QUALITY
+from app.core.responses import ORJSONResponse, json_response
+from app.schemas.common import ForecastPoint, ForecastResponse
+from app.services.analytics import AnalyticsService
+
+N_DAYS = int(os.environ.get("BENCH_DAYS", 3650))
+REPEAT = int(os.environ.get("BENCH_REPEAT", 20))
+
+
+def make_forecast(n: int) -> pd.DataFrame:
+    """A daily_forecasting.forecast_daily-shaped frame covering `n` days."""
+    rng = np.random.default_rng(42)
+    start = datetime.date(2025, 1, 1)
+    income = rng.uniform(0, 500, n).round(2)
+    expense = rng.uniform(0, 500, n).round(2)
+    balance = 10_000 + np.cumsum(income - expense)
+    spread = 25 * np.sqrt(np.arange(1, n + 1))
+    return pd.DataFrame({
+        "date": [start + datetime.timedelta(days=i) for i in range(n)],
+        "income": income,
+        "expense": expense,
+        "net": income - expense,
+        "balance": balance,
+        "lower_bound": balance - spread,
+        "upper_bound": balance + spread,
+    })
+
+
+def pydantic_payload(forecast_df: pd.DataFrame) -> ForecastResponse:
+    """The previous build: a validated ForecastPoint per day from string-formatted Decimals."""
+    points = [
+        ForecastPoint(
+            date=d,
+            balance=Decimal(f"{bal:.2f}"),
+            income=Decimal(f"{inc:.2f}"),
+            expense=Decimal(f"{exp:.2f}"),
+            predicted_balance=Decimal(f"{bal:.2f}"),
+            lower_bound=Decimal(f"{lo:.2f}"),
+            upper_bound=Decimal(f"{hi:.2f}")
+        )
+        for d, inc, exp, bal, lo, hi in zip(
+            forecast_df["date"], forecast_df["income"].tolist(), forecast_df["expense"].tolist(),
+            forecast_df["balance"].tolist(), forecast_df["lower_bound"].tolist(), forecast_df["upper_bound"].tolist()
+        )
+    ]
+    return ForecastResponse(scenario_name="Daily (day-of-month/weekday + recurring)", data_points=points)
+
+
+def timed(fn) -> float:
+    """Median milliseconds of `fn` over REPEAT runs."""
+    fn()
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def make_app(forecast_df: pd.DataFrame) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/before", response_model=ForecastResponse)
+    async def before():
+        return pydantic_payload(forecast_df)
+
+    @app.get("/after", response_model=ForecastResponse, response_class=ORJSONResponse)
+    async def after():
+        return json_response(AnalyticsService.format_daily_forecast(forecast_df))
+
+    return app
+
+
+def main():
+    forecast_df = make_forecast(N_DAYS)
+    print(f"Benchmarking a {N_DAYS:,}-day forecast series ({REPEAT} runs, median)")
+
+    before = pydantic_payload(forecast_df).model_dump_json().encode()
+    after = ORJSONResponse(AnalyticsService.format_daily_forecast(forecast_df)).body
+    assert json.loads(before) == json.loads(after), "Payloads differ"
+
+    build_before = timed(lambda: pydantic_payload(forecast_df).model_dump_json())
+    build_after = timed(lambda: ORJSONResponse(AnalyticsService.format_daily_forecast(forecast_df)).body)
+    print(f"{'Build + serialize, pydantic':<34} {build_before:8.2f} ms")
+    print(f"{'Build + serialize, rows + orjson':<34} {build_after:8.2f} ms  ({build_before / build_after:.1f}x)")
+
+    print(f"\n{'Encoding':<10} {'bytes':>12} {'ratio':>7} {'compress ms':>12}")
+    print(f"{'identity':<10} {len(after):>12,} {1:>7.1f} {0:>12.2f}")
+    gzipped = gzip.compress(after, GZIP_LEVEL)
+    print(f"{'gzip':<10} {len(gzipped):>12,} {len(after) / len(gzipped):>7.1f} "
+          f"{timed(lambda: gzip.compress(after, GZIP_LEVEL)):>12.2f}")
+    if compression.brotli is not None:
+        compressed = compression.brotli.compress(after, quality=BROTLI_QUALITY)
+        print(f"{'br':<10} {len(compressed):>12,} {len(after) / len(compressed):>7.1f} "
+              f"{timed(lambda: compression.brotli.compress(after, quality=BROTLI_QUALITY)):>12.2f}")
+    else:
+        print(f"{'br':<10} {'(brotli not installed)':>12}")
+
+    # End to end through FastAPI and the compression middleware
+    print(f"\n{'Request':<22} {'encoding':<10} {'bytes sent':>12} {'ms':>9}")
+    client = TestClient(make_app(forecast_df))
+    for path in ("/before", "/after"):
+        for encoding in ("identity", "gzip", "br"):
+            headers = {"Accept-Encoding": encoding}
+            response = client.get(path, headers=headers)
+            sent = int(response.headers.get("content-length", len(response.content)))
+            used = response.headers.get("content-encoding", "identity")
+            elapsed = timed(lambda: client.get(path, headers=headers))
+            print(f"GET {path:<18} {used:<10} {sent:>12,} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import uuid
+import asyncio
+from sqlalchemy import select
+from app.core.database import engine, AsyncSessionLocal
+from app.models.database_schema import Base, Transaction
+from app.services.recurring import detect_recurring
+
+async def run(user_id=None):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as session:
+        if user_id:
+            user_ids = [user_id]
+        else:
+            result = await session.execute(select(Transaction.user_id).distinct())
+            user_ids = result.scalars().all()
+
+        updated = 0
+        for uid in user_ids:
+            # Full scan (startup already fills in merchant keys of legacy rows)
+            updated += await detect_recurring(session, uid)
+
+    print(f"Recurring detection over {len(user_ids)} user(s): {updated} transactions re-flagged.")
+
+if __name__ == "__main__":
+    # Usage: python detect_recurring.py [user_id]
+    target = uuid.UUID(sys.argv[1]) if len(sys.argv) > 1 else None
+    asyncio.run(run(target))
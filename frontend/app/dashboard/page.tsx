@@ -1,6 +1,7 @@
 'use client';
 
 import { useFinanceStore } from '@/components/providers/StoreProvider';
+import { useDashboard } from '@/lib/queries';
 import { Navbar } from '@/components/layout/Navbar';
 import { CashflowBarChart } from '@/components/charts/CashflowBarChart';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
@@ -23,15 +24,19 @@ export default function DashboardPage() {
     const dateRange = useFinanceStore((state) => state.dateRange);
     const hasUploadedData = useFinanceStore((state) => state.hasUploadedData); // Explicit state check
     const appState = useFinanceStore((state) => state.appState);
-    const fetchMonthlyCashflow = useFinanceStore((state) => state.fetchMonthlyCashflow);
-    const isLoading = useFinanceStore((state) => state.isLoading);
+    const setUploadedData = useFinanceStore((state) => state.setUploadedData);
+    const setForecastData = useFinanceStore((state) => state.setForecastData);
+
+    // Cashflow, forecast and advice in one request; refetched after every upload
+    const { data: dashboard, isLoading } = useDashboard();
 
     useEffect(() => {
-        // Hydrate if missing
-        if (!cashflowData || cashflowData.length === 0) {
-            fetchMonthlyCashflow();
+        // Share the result with the forecast and simulate pages
+        if (dashboard) {
+            setUploadedData(dashboard.cashflow);
+            setForecastData(dashboard.forecast.data_points);
         }
-    }, [cashflowData, fetchMonthlyCashflow]);
+    }, [dashboard, setUploadedData, setForecastData]);
 
     // Filter data based on dateRange
     const filteredData = useMemo(() => {
@@ -16,7 +16,7 @@ export default function ForecastPage() {
     const appState = useFinanceStore((state) => state.appState);
     const forecastData = useFinanceStore((state) => state.forecastData);
     const setForecastData = useFinanceStore((state) => state.setForecastData);
-    const fetchForecastData = useFinanceStore((state) => state.fetchForecastData);
+    const fetchDashboard = useFinanceStore((state) => state.fetchDashboard);
     const storeLoading = useFinanceStore((state) => state.isLoading);
 
     useEffect(() => {
@@ -27,9 +27,9 @@ export default function ForecastPage() {
 
         // Optimistic fetch: Try fetching if we don't have data.
         if (!forecastData || forecastData.length === 0) {
-            fetchForecastData();
+            fetchDashboard();
         }
-    }, [forecastData, fetchForecastData]);
+    }, [forecastData, fetchDashboard]);
 
     const showEmptyState = appState === "EMPTY" && (!forecastData || forecastData.length === 0);
     // If we are fetching, show loading. If we have data, show content.
@@ -15,14 +15,14 @@ export default function SimulatePage() {
     const [result, setResult] = useState<SimResultType | null>(null);
     const cashflowData = useFinanceStore((state) => state.monthlyCashflowData); // Use correct property
     const appState = useFinanceStore((state) => state.appState);
-    const fetchMonthlyCashflow = useFinanceStore((state) => state.fetchMonthlyCashflow);
+    const fetchDashboard = useFinanceStore((state) => state.fetchDashboard);
 
     useMemo(() => {
         // Hydrate if missing and logic suggests we should have it (not enforcing strict empty check as it might be fine to sim without data but better with it)
         if (!cashflowData || cashflowData.length === 0) {
-            fetchMonthlyCashflow();
+            fetchDashboard();
         }
-    }, [cashflowData, fetchMonthlyCashflow]);
+    }, [cashflowData, fetchDashboard]);
 
     // Calculate context based on global data
     const context = useMemo(() => {
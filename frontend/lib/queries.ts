@@ -1,13 +1,36 @@
-import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import { api } from './api';
 
 // Types
 export interface Transaction {
-    id?: string;
-    date: string;
-    amount: number;
+    id: string;
+    account_id: string;
+    transaction_date: string;
+    amount: string; // Decimal, serialized as a string
+    direction: 'income' | 'expense' | 'transfer';
+    currency: string;
     description: string;
+    merchant_name?: string | null;
+    category_primary?: string | null;
+    category_detailed?: string | null;
+    is_recurring: boolean;
+    recurring_frequency?: string | null;
+}
+
+export interface TransactionPage {
+    items: Transaction[];
+    next_cursor: string | null;
+    has_more: boolean;
+}
+
+export interface TransactionFilters {
+    account_id?: string;
+    start_date?: string;
+    end_date?: string;
     category?: string;
+    direction?: 'income' | 'expense' | 'transfer';
+    min_amount?: number;
+    max_amount?: number;
 }
 
 export interface CashflowData {
@@ -24,6 +47,24 @@ export interface ForecastData {
     upper_bound: number;
 }
 
+export interface Advice {
+    id: string;
+    title: string;
+    content: string;
+    risk_level: string;
+    category: string;
+    created_at: string;
+}
+
+export interface DashboardData {
+    cashflow: CashflowData[];
+    forecast: {
+        scenario_name: string;
+        data_points: ForecastData[];
+    };
+    advice: Advice[];
+}
+
 export interface SimulationRequest {
     user_id: string; // Added user_id
     decision_type: string; // Changed to string to allow uppercase mapping
@@ -68,7 +109,24 @@ export const useUploadTransactions = () => {
         onSuccess: () => {
             queryClient.invalidateQueries({ queryKey: ['cashflow'] });
             queryClient.invalidateQueries({ queryKey: ['forecast'] });
+            queryClient.invalidateQueries({ queryKey: ['dashboard'] });
+            queryClient.invalidateQueries({ queryKey: ['transactions'] });
+        },
+    });
+};
+
+export const useTransactions = (filters: TransactionFilters = {}, pageSize = 50) => {
+    return useInfiniteQuery({
+        queryKey: ['transactions', filters, pageSize],
+        queryFn: async ({ pageParam }) => {
+            const response = await api.get<TransactionPage>('/transactions', {
+                params: { user_id: DEMO_USER_ID, limit: pageSize, cursor: pageParam ?? undefined, ...filters },
+            });
+            return response.data;
         },
+        initialPageParam: null as string | null,
+        // Keyset cursor from the previous page; undefined stops fetchNextPage
+        getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
     });
 };
 
@@ -92,6 +150,19 @@ export const useForecast = () => {
     });
 };
 
+// Cashflow, forecast and advice in a single request
+export const useDashboard = (days = 180) => {
+    return useQuery({
+        queryKey: ['dashboard', days],
+        queryFn: async () => {
+            const response = await api.get<DashboardData>(`/analytics/dashboard/${DEMO_USER_ID}`, {
+                params: { days },
+            });
+            return response.data;
+        },
+    });
+};
+
 export const useRunSimulation = () => {
     return useMutation({
         mutationFn: async (data: Omit<SimulationRequest, 'user_id' | 'start_date'> & { decision_type: 'one_time' | 'recurring' }) => {
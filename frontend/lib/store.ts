@@ -1,5 +1,5 @@
 import { createStore } from 'zustand';
-import { CashflowData, ForecastData } from './queries';
+import { CashflowData, DashboardData, ForecastData } from './queries';
 import { api } from './api'; // Import API client
 
 // Hardcoded for MVP
@@ -30,9 +30,8 @@ export interface FinanceStore {
     setDateRange: (range: { start: Date | null; end: Date | null }) => void;
     reset: () => void;
 
-    // Async Hydration
-    fetchMonthlyCashflow: () => Promise<void>;
-    fetchForecastData: () => Promise<void>;
+    // Async Hydration (cashflow and forecast in one request)
+    fetchDashboard: () => Promise<void>;
 }
 
 export const createFinanceStore = (initState: Partial<FinanceStore> = {}) => {
@@ -72,40 +71,20 @@ export const createFinanceStore = (initState: Partial<FinanceStore> = {}) => {
 
         setDateRange: (range) => set({ dateRange: range }),
 
-        fetchMonthlyCashflow: async () => {
+        fetchDashboard: async () => {
             set({ isLoading: true, error: null });
             try {
-                const response = await api.get(`/analytics/cashflow/${DEMO_USER_ID}`);
-                get().setUploadedData(response.data);
+                const response = await api.get<DashboardData>(`/analytics/dashboard/${DEMO_USER_ID}`);
+                get().setUploadedData(response.data.cashflow);
+                get().setForecastData(response.data.forecast.data_points);
             } catch (err) {
-                console.error("Failed to fetch cashflow:", err);
+                console.error("Failed to fetch dashboard:", err);
                 set({ error: "Failed to load data. Please try again." });
             } finally {
                 set({ isLoading: false });
             }
         },
 
-        fetchForecastData: async () => {
-            set({ isLoading: true, error: null });
-            try {
-                const response = await api.get(`/analytics/forecast/${DEMO_USER_ID}`);
-                // Handle different response structures if needed, reusing validation logic or keeping it simple
-                // Assuming service/schema fix made it consistent now
-                if (response.data && Array.isArray(response.data.data_points)) {
-                    get().setForecastData(response.data.data_points);
-                } else if (Array.isArray(response.data)) {
-                    get().setForecastData(response.data);
-                } else {
-                    console.error("Invalid forecast format in store fetch");
-                }
-            } catch (err) {
-                console.error("Failed to fetch forecast:", err);
-                set({ error: "Failed to generate forecast." });
-            } finally {
-                set({ isLoading: false });
-            }
-        },
-
         reset: () => set({
             appState: "EMPTY",
             hasUploadedData: false,
@@ -2,6 +2,7 @@
 import asyncio
 from app.core.database import engine
 from app.models.database_schema import Base
+from app.services.migrations import upgrade_schema
 
 async def init_models():
     async with engine.begin() as conn:
@@ -9,6 +10,9 @@ async def init_models():
         # Drop dependent tables if needed or just create
         # await conn.run_sync(Base.metadata.drop_all) 
         await conn.run_sync(Base.metadata.create_all)
+        applied = await upgrade_schema(conn)
+        if applied:
+            print(f"Upgraded existing tables: {', '.join(applied)}")
     print("Tables created.")
 
 if __name__ == "__main__":
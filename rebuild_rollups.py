@@ -0,0 +1,23 @@
+
+import sys
+import uuid
+import asyncio
+from app.core.database import engine, AsyncSessionLocal
+from app.models.database_schema import Base
+from app.services.rollups import rebuild_monthly_rollups
+
+async def rebuild(user_id=None):
+    async with engine.begin() as conn:
+        # Make sure the rollup table exists on databases created before it
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_monthly_rollups(session, user_id)
+
+    scope = f"user {user_id}" if user_id else "all users"
+    print(f"Rebuilt {rows} monthly rollup rows for {scope}.")
+
+if __name__ == "__main__":
+    # Usage: python rebuild_rollups.py [user_id]
+    target = uuid.UUID(sys.argv[1]) if len(sys.argv) > 1 else None
+    asyncio.run(rebuild(target))
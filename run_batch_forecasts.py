@@ -0,0 +1,25 @@
+import asyncio
+from app.core.database import engine, AsyncSessionLocal
+from app.models.database_schema import Base
+from app.services.batch_forecasting import run_batch_forecasts
+from app.services.model_registry import register_forecasters
+
+async def run():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    # The forecasts reference the model's ml_models row, as registered at app startup
+    async with AsyncSessionLocal() as session:
+        await register_forecasters(session)
+
+    async with AsyncSessionLocal() as session:
+        stats = await run_batch_forecasts(session)
+
+    print(
+        f"Forecast {stats['users_forecast']} of {stats['users']} users in {stats['pages']} pages "
+        f"({stats['rows_written']} rows, {stats['legacy_users']} without rollups) in {stats['seconds']}s."
+    )
+
+if __name__ == "__main__":
+    # Usage: python run_batch_forecasts.py  (schedule nightly; page size via FORECAST_BATCH_PAGE_SIZE)
+    asyncio.run(run())
@@ -83,5 +83,167 @@ def test_monthly_cashflow_computation():
     print("\n✅ SUCCESS: Monthly cashflow logic verified")
 
 
+def test_monthly_cashflow_views():
+    print("🔍 Testing Monthly Cashflow Views (dashboard)...")
+    import pandas as pd
+    from app.services.data_processing import pivot_monthly_totals
+    from app.services.rollups import rollup_cashflow
+    from app.services.analytics import AnalyticsService
+
+    # Grouped (month, direction, total) rows, legacy direction spellings included
+    rows = [
+        ("2024-01", "income", 5000.0),
+        ("2024-01", "TransactionDirection.EXPENSE", 150.1),
+        ("2024-01", "expense", 1200.2),
+        ("2024-01", "transfer", 999.0),
+        ("2024-02", "income", 3000.0),
+    ]
+    df = pivot_monthly_totals(rows)
+    assert df["month"].tolist() == ["2024-01", "2024-02"]
+    assert df["total_expense"].tolist() == [1350.3, 0.0]
+    assert_almost_equal(df["net_cashflow"].iloc[0], 3649.7)
+    assert pivot_monthly_totals([("2024-01", "transfer", 5.0)]).empty
+
+    # Both views come from one rollup read
+    totals = pd.DataFrame({
+        "month": ["2024-01", "2024-02", "2024-03"],
+        "total_income": [5000.0, 3000.0, 0.0],
+        "total_expense": [1350.0, 200.0, 80.0],
+        "excluded_income": [1000.0, 0.0, 0.0],
+        "excluded_expense": [0.0, 50.0, 80.0],
+        "included_count": [3, 2, 0],
+    })
+    full = rollup_cashflow(totals)
+    forecast = rollup_cashflow(totals, exclude_from_forecast=True)
+    assert full["net_cashflow"].tolist() == [3650.0, 2800.0, -80.0]
+    # A month whose rows are all excluded is left out, not shown as zero
+    assert forecast["month"].tolist() == ["2024-01", "2024-02"]
+    assert forecast["net_cashflow"].tolist() == [2650.0, 2850.0]
+
+    # The dashboard's cashflow rows are the last 12 months
+    months = pd.DataFrame({
+        "month": [f"2023-{m:02d}" for m in range(1, 13)] + ["2024-01", "2024-02"],
+        "total_income": 1.0, "total_expense": 0.5, "net_cashflow": 0.5,
+    })
+    rows = AnalyticsService.format_cashflow(months)
+    assert len(rows) == 12 and rows[0]["month"] == "2023-03" and rows[-1]["net"] == 0.5
+
+    print("\n✅ SUCCESS: Monthly cashflow views verified")
+
+
+def test_conditional_get():
+    print("🔍 Testing Conditional GET Validators...")
+    from datetime import datetime
+    from fastapi import Request, Response
+    from app.core.conditional import make_etag, etag_matches, conditional_response
+
+    etag = make_etag("user", 7, datetime(2024, 1, 1, 12, 0, 0))
+    assert etag.startswith('W/"') and etag == make_etag("user", 7, datetime(2024, 1, 1, 12, 0, 0))
+    # The version alone changes the ETag, even within the same second
+    assert etag != make_etag("user", 8, datetime(2024, 1, 1, 12, 0, 0))
+
+    assert etag_matches(etag, etag) and etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'"other", {etag}', etag) and etag_matches("*", etag)
+    assert not etag_matches(None, etag) and not etag_matches('"other"', etag)
+
+    def request(headers):
+        return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+    response = Response()
+    assert conditional_response(request({}), response, etag, datetime(2024, 1, 1, 12, 0, 0)) is None
+    assert response.headers["etag"] == etag
+    assert response.headers["last-modified"] == "Mon, 01 Jan 2024 12:00:00 GMT"
+
+    not_modified = conditional_response(request({"If-None-Match": etag}), Response(), etag)
+    assert not_modified.status_code == 304 and not_modified.headers["etag"] == etag and not not_modified.body
+
+    print("\n✅ SUCCESS: Conditional GET validators verified")
+
+
+def test_rollups_cover_legacy_rows():
+    print("🔍 Testing Rollups over Legacy Transactions...")
+    import asyncio
+    import sqlite3
+    import uuid
+    from sqlalchemy import select, update, delete
+    from app.models.database_schema import MonthlyCashflowRollup
+    from app.services.data_processing import fetch_monthly_cashflow, fetch_monthly_cashflows
+    from app.services.ingestion import IngestionService
+    from app.services.rollups import reconcile_monthly_rollups, rebuild_monthly_rollups
+    from verify_support import SHIPPED_DB, temp_database, csv_bytes
+
+    # fin26.db holds Oct-Dec 2023 rows written before the rollup table existed
+    user_id, account_id = map(uuid.UUID, sqlite3.connect(SHIPPED_DB).execute(
+        "SELECT user_id, account_id FROM transactions LIMIT 1"
+    ).fetchone())
+
+    async def ledger_cashflow(db):
+        result = await db.execute(select(Transaction).where(Transaction.user_id == user_id))
+        return compute_monthly_cashflow(result.scalars().all())
+
+    def same(df, expected):
+        assert df["month"].tolist() == expected["month"].tolist(), df["month"].tolist()
+        for col in ("total_income", "total_expense", "net_cashflow"):
+            for a, b in zip(df[col], expected[col]):
+                assert_almost_equal(a, b)
+
+    async def run():
+        async with temp_database(SHIPPED_DB) as sessions:
+            async with sessions() as db:
+                # The first upload into a history without rollups rebuilds them from the ledger
+                upload = csv_bytes([("2024-01-01", "Salary Credit", 90000), ("2024-01-02", "House Rent", -26000)])
+                result = await IngestionService.process_csv_upload(db, user_id, account_id, upload)
+                assert result["rows_ingested"] == 2
+
+                expected = await ledger_cashflow(db)
+                assert expected["month"].tolist() == ["2023-10", "2023-11", "2023-12", "2024-01"]
+                same(await fetch_monthly_cashflow(db, user_id), expected)
+                cashflow, forecast_history = await fetch_monthly_cashflows(db, user_id)
+                same(cashflow, expected)
+                same(forecast_history, expected)
+
+                # Later uploads add deltas on top
+                await IngestionService.process_csv_upload(db, user_id, account_id, csv_bytes([("2024-02-01", "Salary Credit", 90000)]))
+                same(await fetch_monthly_cashflow(db, user_id), await ledger_cashflow(db))
+
+                # Rows written around the bulk writer are picked up by the startup reconciliation
+                db.add(Transaction(
+                    account_id=account_id, user_id=user_id, amount=Decimal("500"),
+                    direction=TransactionDirection.EXPENSE, currency="USD", description="Cash withdrawal",
+                    transaction_date=date(2024, 2, 3), tags=[], is_recurring=False,
+                    is_excluded_from_forecast=False, raw_import_data={},
+                ))
+                await db.commit()
+                assert await reconcile_monthly_rollups(db) == [user_id]
+                assert await reconcile_monthly_rollups(db) == []
+                same(await fetch_monthly_cashflow(db, user_id), await ledger_cashflow(db))
+
+                # A month of excluded rows only is missing from the forecast history on both paths
+                await IngestionService.process_csv_upload(db, user_id, account_id, csv_bytes([("2024-03-05", "Bonus", 700)]))
+                await db.execute(
+                    update(Transaction)
+                    .where(Transaction.user_id == user_id, Transaction.transaction_date == date(2024, 3, 5))
+                    .values(is_excluded_from_forecast=True)
+                )
+                await rebuild_monthly_rollups(db, user_id)
+                _, rolled_up = await fetch_monthly_cashflows(db, user_id)
+                assert rolled_up["month"].tolist()[-1] == "2024-02", rolled_up
+                await db.execute(delete(MonthlyCashflowRollup).where(MonthlyCashflowRollup.user_id == user_id))
+                same(rolled_up, await fetch_monthly_cashflow(db, user_id, exclude_from_forecast=True))
+
+                # Rollups from before the excluded counts are rebuilt at startup
+                await rebuild_monthly_rollups(db, user_id)
+                await db.execute(update(MonthlyCashflowRollup).values(excluded_income_count=None))
+                await db.commit()
+                assert await reconcile_monthly_rollups(db) == [user_id]
+                same((await fetch_monthly_cashflows(db, user_id))[1], rolled_up)
+
+    asyncio.run(run())
+    print("\n✅ SUCCESS: Rollups cover legacy rows")
+
+
 if __name__ == "__main__":
     test_monthly_cashflow_computation()
+    test_monthly_cashflow_views()
+    test_conditional_get()
+    test_rollups_cover_legacy_rows()
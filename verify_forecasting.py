@@ -40,5 +40,452 @@ def test_forecast():
     
     print("\nSUCCESS: Forecast Logic Verified")
 
+def test_batch_forecast():
+    print("Testing Batch Forecast (users x months)...")
+    import uuid
+    import numpy as np
+    from app.services.batch_forecasting import forecast_page, build_forecast_rows
+
+    rng = np.random.default_rng(0)
+    frames = []
+    for n_months in [1, 2, 3, 5, 9]:
+        months = [f"2023-{m:02d}" for m in range(1, n_months + 1)]
+        frames.append(pd.DataFrame({
+            "user_id": uuid.uuid4(),
+            "month": months,
+            "income": rng.uniform(0, 5000, n_months).round(2),
+            "expense": rng.uniform(0, 5000, n_months).round(2),
+        }))
+    history = pd.concat(frames, ignore_index=True)
+
+    page = forecast_page(history)
+    # Users below a full 3-month window are left to the on-request fallback
+    assert len(page) == 3
+
+    rows = build_forecast_rows(page, {}, uuid.uuid4(), months=6)
+    for user_id, user_rows in pd.DataFrame(rows).groupby("user_id"):
+        user_history = history[history["user_id"] == user_id]
+        expected = generate_simple_forecast(
+            user_history.assign(net_cashflow=user_history["income"] - user_history["expense"]), 6
+        )
+        assert [d.strftime("%Y-%m") for d in user_rows["forecast_date"]] == expected["forecast_month"].tolist()
+        balances = user_rows["projected_balance"].astype(float).to_numpy()
+        assert np.allclose(balances, expected["predicted_cashflow"].cumsum(), atol=0.01)
+
+    print("SUCCESS: Batch Forecast Verified")
+
+def test_forecaster_registry():
+    print("Testing Forecaster Registry...")
+    import numpy as np
+    from app.services.forecasting import FORECASTERS, forecast_frame, get_forecaster
+
+    months = [f"{2021 + i // 12}-{i % 12 + 1:02d}" for i in range(36)]
+    seasonal = 1000 + 500 * np.sin(np.arange(36) * 2 * np.pi / 12)
+    history = pd.DataFrame({"month": months, "net_cashflow": seasonal})
+
+    for name, forecaster in FORECASTERS.items():
+        forecast = forecast_frame(history, 12, forecaster)
+        assert len(forecast) == 12 and forecast.iloc[0]["forecast_month"] == "2024-01", name
+        assert (forecast["lower_bound"] <= forecast["predicted_cashflow"]).all(), name
+        assert (forecast["predicted_cashflow"] <= forecast["upper_bound"]).all(), name
+        # Fitted parameters are reusable as-is
+        params = forecaster.fit(history["net_cashflow"].to_numpy())
+        assert forecast_frame(history, 12, forecaster, params).equals(forecast), name
+
+    # Holt-Winters picks up the yearly cycle the flat models can't
+    hw = forecast_frame(history, 12, get_forecaster("holt-winters"))["predicted_cashflow"].to_numpy()
+    truth = 1000 + 500 * np.sin(np.arange(36, 48) * 2 * np.pi / 12)
+    assert np.abs(hw - truth).max() < 50, hw
+
+    # The median ignores a one-off spike
+    spiky = history.copy()
+    spiky.loc[35, "net_cashflow"] = 100_000
+    median = forecast_frame(spiky, 1, get_forecaster("median"))["predicted_cashflow"].iloc[0]
+    assert median < 2000, median
+
+    # The default model is the one generate_simple_forecast has always used
+    assert forecast_frame(history, 6, get_forecaster()).equals(generate_simple_forecast(history, 6))
+    try:
+        get_forecaster("nope")
+        assert False, "Unknown models must raise"
+    except ValueError:
+        pass
+
+    # A model has to implement both fit and predict
+    from app.services.forecasting import Forecaster
+
+    class FitOnly(Forecaster):
+        def fit(self, values):
+            return {}
+    try:
+        FitOnly()
+        assert False, "Forecasters without predict must not instantiate"
+    except TypeError:
+        pass
+    print("SUCCESS: Forecaster Registry Verified")
+
+def test_model_registration():
+    print("Testing Forecast Model Registration...")
+    import asyncio
+    from sqlalchemy import select, func, delete
+    from app.models.database_schema import MLModel
+    from app.services.forecasting import FORECASTERS, get_forecaster
+    from app.services.model_registry import register_forecasters, get_model_id, list_forecasters
+    from verify_support import temp_database, api_client
+
+    async def count(sessions):
+        async with sessions() as db:
+            return (await db.execute(select(func.count()).select_from(MLModel))).scalar()
+
+    async def register(sessions):
+        async with sessions() as db:
+            return await register_forecasters(db)
+
+    async def run():
+        # temp_database registers like app startup does
+        async with temp_database() as first, temp_database() as second:
+            ids = await register(first)
+            assert set(ids) == {f.key for f in FORECASTERS.values()}
+            assert await count(first) == len(FORECASTERS)
+            async with first() as db:
+                assert await get_model_id(db, get_forecaster()) == ids[get_forecaster().key]
+                assert {m["model_id"] for m in await list_forecasters(db)} == set(ids.values())
+
+            # Ids belong to their database; nothing is remembered per process
+            async with second() as db:
+                await db.execute(delete(MLModel))
+                await db.commit()
+                assert await get_model_id(db, get_forecaster()) is None
+
+            # Listing is read-only: without registration there are no ids, and no rows get written
+            with api_client(second) as client:
+                response = client.get("/api/v1/analytics/forecast-models")
+                assert response.status_code == 200
+                assert [m["model_id"] for m in response.json()] == [None] * len(FORECASTERS)
+            assert await count(second) == 0
+
+            # Workers registering at the same time don't collide on uq_model_version
+            other, again = await asyncio.gather(register(second), register(second))
+            assert other == again and await count(second) == len(FORECASTERS)
+            assert not set(other.values()) & set(ids.values())
+
+    asyncio.run(run())
+    print("SUCCESS: Forecast Model Registration Verified")
+
+def test_backtesting():
+    print("Testing Backtest Harness...")
+    import copy
+    from app.services.backtesting import synthetic_histories, run_backtest, compare_reports
+
+    datasets = synthetic_histories(n_users=3, months=18, seed=1)
+    report = run_backtest(datasets, ["wma", "median"], min_train=6, horizon=3)
+
+    wma = report["models"]["wma"]["overall"]
+    # 5 shapes x 3 users x (18 - 6 - 3 + 1) origins
+    assert wma["forecasts"] == 5 * 3 * 10 and wma["points"] == wma["forecasts"] * 3
+    assert 0 <= wma["coverage"] <= 1 and wma["mae"] > 0
+    assert wma["fit_us"]["p50"] <= wma["fit_us"]["p95"] <= wma["fit_us"]["p99"]
+    assert set(report["models"]["wma"]["datasets"]) == set(datasets)
+
+    # A worse MAE is reported as a regression, an identical report is not
+    assert compare_reports(report, report) == []
+    worse = copy.deepcopy(report)
+    worse["models"]["wma"]["overall"]["mae"] *= 2
+    assert any(p.startswith("wma: mae") for p in compare_reports(report, worse))
+    print("SUCCESS: Backtest Harness Verified")
+
+def test_daily_forecast():
+    print("Testing Daily Forecast...")
+    import datetime
+    from app.services.daily_forecasting import forecast_daily
+
+    start = datetime.date(2024, 1, 1)
+    rows = []
+    for i in range(366):
+        d = start + datetime.timedelta(days=i)
+        if d.day == 1:
+            rows.append((d, "income", 4000.0))
+        if d.weekday() == 5:
+            rows.append((d, "expense", 100.0))
+    daily = pd.DataFrame(rows, columns=["date", "direction", "amount"])
+    anchor = datetime.date(2024, 12, 31)
+    recurring = pd.DataFrame(
+        [("Netflix", "monthly", datetime.date(2024, m, 15), "expense", 15.0) for m in range(1, 13)],
+        columns=["item", "frequency", "date", "direction", "amount"],
+    )
+
+    for days in (7, 45, 365):
+        forecast = forecast_daily(anchor, daily, recurring, 1000.0, days)
+        assert len(forecast) == days, f"Expected {days} points, got {len(forecast)}"
+        assert forecast["date"].iloc[0] == datetime.date(2025, 1, 1)
+
+    forecast = forecast_daily(anchor, daily, recurring, 1000.0, 60).set_index("date")
+    # Salary lands on the 1st, groceries on Saturdays, the subscription on the 15th
+    assert forecast.loc[datetime.date(2025, 2, 1), "income"] > 3000
+    assert forecast.loc[datetime.date(2025, 1, 4), "expense"] > forecast.loc[datetime.date(2025, 1, 6), "expense"]
+    assert forecast.loc[datetime.date(2025, 1, 15), "expense"] >= 15
+    assert abs(forecast["balance"].iloc[-1] - (1000 + forecast["net"].sum())) < 0.05
+    assert forecast_daily(None, daily.iloc[:0], recurring.iloc[:0], 0.0, 10).empty
+    print("SUCCESS: Daily Forecast Verified")
+
+def test_forecast_payload():
+    print("Testing Forecast Payload Serialization...")
+    import json
+    import datetime
+    from decimal import Decimal
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.core.compression import CompressionMiddleware, accepted_encodings
+    from app.core.responses import ORJSONResponse, json_response
+    from app.schemas.common import ForecastPoint, ForecastResponse
+    from app.services.analytics import AnalyticsService
+
+    daily = pd.DataFrame({
+        "date": [datetime.date(2025, 1, 1) + datetime.timedelta(days=i) for i in range(400)],
+        "income": [100.005 * (i % 3) for i in range(400)],
+        "expense": [55.5] * 400,
+        "balance": [1000 - 0.001 * i for i in range(400)],
+        "lower_bound": [-0.001] * 400,
+        "upper_bound": [2000.0] * 400,
+    })
+    # Same JSON as validated ForecastPoints built from Decimal(f"{x:.2f}")
+    expected = ForecastResponse(
+        scenario_name="Daily (day-of-month/weekday + recurring)",
+        data_points=[
+            ForecastPoint(
+                date=r.date, balance=Decimal(f"{r.balance:.2f}"), income=Decimal(f"{r.income:.2f}"),
+                expense=Decimal(f"{r.expense:.2f}"), predicted_balance=Decimal(f"{r.balance:.2f}"),
+                lower_bound=Decimal(f"{r.lower_bound:.2f}"), upper_bound=Decimal(f"{r.upper_bound:.2f}"),
+            )
+            for r in daily.itertuples()
+        ],
+    )
+    body = ORJSONResponse(AnalyticsService.format_daily_forecast(daily)).body
+    assert json.loads(body) == json.loads(expected.model_dump_json())
+
+    monthly = pd.DataFrame({
+        "forecast_month": ["2025-01", "2025-02"], "predicted_cashflow": [12.345, -3.0],
+        "lower_bound": [1.0, -5.0], "upper_bound": [20.0, 0.0],
+    })
+    payload = json.loads(ORJSONResponse(AnalyticsService.format_forecast(monthly, "WMA")).body)
+    assert payload["data_points"][1] == {
+        "date": "2025-02-01", "balance": "-3.00", "income": "0", "expense": "0",
+        "predicted_balance": "-3.00", "lower_bound": "-5.00", "upper_bound": "0.00",
+    }
+    assert ORJSONResponse({"amount": Decimal("1.50"), "point": expected.data_points[0]}).body.startswith(
+        b'{"amount":"1.50","point":{"date":"2025-01-01"'
+    )
+
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/payload")
+    async def serve(days: int):
+        return json_response(AnalyticsService.format_daily_forecast(daily.head(days)))
+
+    client = TestClient(app)
+    large = client.get("/payload?days=400", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip" and large.content == body
+    assert "content-encoding" not in client.get("/payload?days=1", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/payload?days=400", headers={"Accept-Encoding": "identity"}).headers
+    print("SUCCESS: Forecast Payload Serialization Verified")
+
+def test_batch_forecast_users():
+    print("Testing Batch Forecast User Paging...")
+    import asyncio
+    import sqlite3
+    import uuid
+    from sqlalchemy import select, func
+    from app.models.database_schema import CashflowForecast, UserDataVersion
+    from app.services.batch_forecasting import run_batch_forecasts, fetch_stored_forecast, BATCH_HORIZON_MONTHS
+    from app.services.data_processing import fetch_monthly_cashflow
+    from app.services.ingestion import IngestionService
+    from verify_support import SHIPPED_DB, temp_database, create_user, csv_bytes
+
+    # fin26.db's user has three months of data but has never had a data version bump
+    legacy_user = uuid.UUID(sqlite3.connect(SHIPPED_DB).execute("SELECT user_id FROM transactions").fetchone()[0])
+
+    async def run():
+        async with temp_database(SHIPPED_DB) as sessions:
+            async with sessions() as db:
+                assert (await db.execute(select(func.count()).select_from(UserDataVersion))).scalar() == 0
+                await create_user(db)  # no transactions, nothing to forecast
+                new_user, account_id = await create_user(db)
+                await IngestionService.process_csv_upload(
+                    db, new_user, account_id, csv_bytes([("2024-01-01", "Salary", 5000)])
+                )
+
+                # Cent amounts whose stored income - expense rounds apart from the net WMA
+                rollup_user, rollup_account = await create_user(db)
+                await IngestionService.process_csv_upload(db, rollup_user, rollup_account, csv_bytes([
+                    ("2024-01-02", "Salary", 1497.68), ("2024-01-09", "Rent", -488.72),
+                    ("2024-02-02", "Salary", 2813.99), ("2024-02-09", "Rent", -1211.60),
+                    ("2024-03-02", "Salary", 4907.62), ("2024-03-09", "Rent", -1269.02),
+                ]))
+
+                stats = await run_batch_forecasts(db, page_size=1)
+                assert stats["users"] == 3 and stats["pages"] == 3, stats
+                # The new user's single month is left to the on-request fallback
+                assert stats["users_forecast"] == 2, stats
+
+                result = await db.execute(select(CashflowForecast.user_id, func.count()).group_by(CashflowForecast.user_id))
+                assert dict(result.all()) == {legacy_user: BATCH_HORIZON_MONTHS, rollup_user: BATCH_HORIZON_MONTHS}
+
+                # The stored baseline is exactly the one computed on demand
+                for user_id in (legacy_user, rollup_user):
+                    history = await fetch_monthly_cashflow(db, user_id, exclude_from_forecast=True)
+                    stored = await fetch_stored_forecast(db, user_id, 6, None)
+                    assert stored.equals(generate_simple_forecast(history, 6)), stored
+
+    asyncio.run(run())
+    print("SUCCESS: Batch Forecast User Paging Verified")
+
+
+def test_forecast_granularity():
+    print("Testing Forecast Granularity Defaults...")
+    import asyncio
+    import datetime
+    from decimal import Decimal
+    from sqlalchemy import update
+    from app.models.database_schema import FinancialAccount
+    from app.services.daily_forecasting import DAILY_DEFAULT_BELOW_DAYS
+    from verify_support import temp_database, create_user, api_client, csv_bytes
+
+    export = []
+    for month in range(1, 7):
+        export += [
+            (f"2024-{month:02d}-01", "Salary", 5000),
+            (f"2024-{month:02d}-03", "Rent", -1500),
+            (f"2024-{month:02d}-15", "Groceries", -400),
+        ]
+
+    async def run():
+        async with temp_database() as sessions:
+            async with sessions() as db:
+                user_id, account_id = await create_user(db)
+            with api_client(sessions) as client:
+                response = client.post(
+                    f"/api/v1/transactions/upload-csv?user_id={user_id}",
+                    data={"account_id": str(account_id)},
+                    files={"file": ("export.csv", csv_bytes(export), "text/csv")},
+                )
+                assert response.status_code == 200, response.text
+
+                def points(**params):
+                    response = client.get(f"/api/v1/analytics/forecast/{user_id}", params=params)
+                    assert response.status_code == 200, response.text
+                    return [datetime.date.fromisoformat(p["date"]) for p in response.json()["data_points"]]
+
+                # Short horizons are day by day unless a granularity is asked for
+                daily = points(days=30)
+                assert len(daily) == 30 and daily[1] - daily[0] == datetime.timedelta(days=1)
+                assert len(points(days=DAILY_DEFAULT_BELOW_DAYS - 1)) == DAILY_DEFAULT_BELOW_DAYS - 1
+                assert len(points(days=30, granularity="monthly")) == 1
+
+                # Longer ones stay monthly, or daily on request
+                monthly = points(days=180)
+                assert len(monthly) == 6 and all(d.day == 1 for d in monthly)
+                assert len(points(days=DAILY_DEFAULT_BELOW_DAYS)) == DAILY_DEFAULT_BELOW_DAYS // 30
+                assert len(points(days=180, granularity="daily")) == 180
+
+                response = client.get(f"/api/v1/analytics/forecast/{user_id}", params={"days": 5000, "granularity": "daily"})
+                assert response.status_code == 400
+
+                # A balance change (no data version bump) moves the cached daily balances along with the ETag
+                url = f"/api/v1/analytics/forecast/{user_id}"
+                before = client.get(url, params={"days": 30})
+                async with sessions() as db:
+                    await db.execute(
+                        update(FinancialAccount).where(FinancialAccount.id == account_id).values(current_balance=Decimal("250"))
+                    )
+                    await db.commit()
+                after = client.get(url, params={"days": 30}, headers={"If-None-Match": before.headers["etag"]})
+                assert after.status_code == 200 and after.headers["etag"] != before.headers["etag"]
+                for old, new in zip(before.json()["data_points"], after.json()["data_points"]):
+                    for field in ("balance", "lower_bound", "upper_bound"):
+                        assert Decimal(new[field]) - Decimal(old[field]) == 250
+
+    asyncio.run(run())
+    print("SUCCESS: Forecast Granularity Defaults Verified")
+
+
+def test_forecast_cache():
+    print("Testing Forecast Cache...")
+    from app.services.forecast_cache import ForecastCache
+
+    cache = ForecastCache(max_entries=3, max_bytes=100)
+    assert cache.stats()["hit_rate"] is None
+    for key in "abc":
+        cache.put(key, key.upper(), 10)
+
+    # A hit makes the entry most recently used, so the least recent one is evicted first
+    assert cache.get("a") == "A"
+    cache.put("d", "D", 10)
+    assert cache.get("b") is None and cache.get("a") == "A"
+    assert list(cache._entries) == ["c", "d", "a"]
+
+    # The memory cap evicts from the LRU end until the new entry fits
+    cache.put("e", "E", 85)
+    assert list(cache._entries) == ["a", "e"] and cache.current_bytes == 95
+    # Replacing an entry swaps its size instead of adding to it
+    cache.put("e", "E2", 80)
+    assert cache.current_bytes == 90 and cache.get("e") == "E2"
+    # Values bigger than the whole cache are not stored and evict nothing
+    cache.put("huge", "H", 101)
+    assert cache.get("huge") is None and list(cache._entries) == ["a", "e"]
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 90, 3)
+    assert (stats["hits"], stats["misses"]) == (3, 2) and stats["hit_rate"] == 0.6
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.current_bytes == 0
+    print("SUCCESS: Forecast Cache Verified")
+
+
+def test_forecast_cache_invalidation():
+    print("Testing Forecast Cache Invalidation...")
+    import asyncio
+    from app.services.analytics import AnalyticsService
+    from app.services.forecast_cache import forecast_cache
+    from app.services.ingestion import IngestionService
+    from verify_support import temp_database, create_user, csv_bytes
+
+    export = [(f"2024-{m:02d}-01", "Salary", 5000) for m in range(1, 7)]
+
+    async def run():
+        async with temp_database() as sessions:
+            async with sessions() as db:
+                user_id, account_id = await create_user(db)
+                await IngestionService.process_csv_upload(db, user_id, account_id, csv_bytes(export))
+
+                before = forecast_cache.stats()
+                first = await AnalyticsService.generate_forecast(db, user_id, 180)
+                second = await AnalyticsService.generate_forecast(db, user_id, 180)
+                after = forecast_cache.stats()
+                assert first == second
+                assert after["misses"] - before["misses"] == 1 and after["hits"] - before["hits"] == 1
+
+                # An upload bumps the data version: the cached forecast is no longer reachable
+                await IngestionService.process_csv_upload(db, user_id, account_id, csv_bytes([("2024-06-15", "Rent", -4000)]))
+                third = await AnalyticsService.generate_forecast(db, user_id, 180)
+                assert forecast_cache.stats()["misses"] - after["misses"] == 1
+                assert third != first
+
+    asyncio.run(run())
+    print("SUCCESS: Forecast Cache Invalidation Verified")
+
+
 if __name__ == "__main__":
     test_forecast()
+    test_batch_forecast()
+    test_forecaster_registry()
+    test_model_registration()
+    test_backtesting()
+    test_daily_forecast()
+    test_forecast_payload()
+    test_batch_forecast_users()
+    test_forecast_granularity()
+    test_forecast_cache()
+    test_forecast_cache_invalidation()
@@ -1,6 +1,7 @@
 
 import pandas as pd
 from decimal import Decimal
+import uuid
 from datetime import date
 from app.services.simulation_engine import SimulationEngine
 
@@ -68,5 +69,401 @@ def test_simulation():
 
     print("\nSUCCESS: Simulation Logic Verified")
 
+def test_batch_simulation():
+    print("Testing Batch Simulation...")
+
+    df = pd.DataFrame({
+        "forecast_month": ["2024-03", "2024-04", "2024-05", "2024-06"],
+        "predicted_cashflow": [500.0, 500.0, 500.0, 500.0]
+    })
+    current_bal = Decimal(2000)
+    decisions = [
+        {"decision_type": "ONE_TIME", "amount": Decimal(3000), "start_date": date(2024, 3, 15)},
+        {"decision_type": "RECURRING", "amount": Decimal(20), "start_date": date(2024, 3, 1)},
+        {"decision_type": "EMI", "amount": Decimal(1000), "start_date": date(2024, 3, 1), "duration_months": 4},
+        # Outside the forecast window: falls back to the first month
+        {"decision_type": "ONE_TIME", "amount": Decimal(500), "start_date": date(2026, 1, 1)},
+    ]
+
+    batch = SimulationEngine.simulate_batch(current_bal, df, decisions)
+    assert len(batch) == len(decisions)
+
+    # Every row must match the single-decision path exactly
+    for decision, result in zip(decisions, batch):
+        single = SimulationEngine.simulate_decision(current_balance=current_bal, forecast_df=df, **decision)
+        assert result == single, f"{result} != {single}"
+
+    assert [r["recommendation"] for r in batch] == ["Avoid", "Safe", "Caution", "Safe"]
+    print("SUCCESS: Batch Simulation Verified")
+
+def test_max_affordable():
+    print("Testing Max Affordable Solver...")
+
+    df = pd.DataFrame({
+        "forecast_month": ["2024-03", "2024-04", "2024-05", "2024-06"],
+        "predicted_cashflow": [500.0, 500.0, 500.0, 500.0]
+    })
+    current_bal = Decimal(2000)
+
+    # ONE_TIME in March: 2000 + 500 - a >= 1000 -> a <= 1500
+    res = SimulationEngine.max_affordable_amount(current_bal, df, "ONE_TIME", date(2024, 3, 1))
+    print("Result:", res)
+    assert res["feasible"] and res["max_amount"] == 1500.0 and res["binding_month"] == "2024-03"
+
+    # EMI over 4 months: tightest at month 4 -> 2000 + 2000 - 4a >= 1000 -> a <= 750
+    res = SimulationEngine.max_affordable_amount(current_bal, df, "EMI", date(2024, 3, 1), duration_months=4)
+    assert res["max_amount"] == 750.0 and res["binding_month"] == "2024-06"
+
+    # The answer is Safe, one cent more is not
+    for decision_type, duration in [("ONE_TIME", None), ("RECURRING", None), ("EMI", 2)]:
+        res = SimulationEngine.max_affordable_amount(current_bal, df, decision_type, date(2024, 4, 1), duration)
+        at = SimulationEngine.simulate_decision(current_bal, df, decision_type, Decimal(str(res["max_amount"])), date(2024, 4, 1), duration)
+        over = SimulationEngine.simulate_decision(current_bal, df, decision_type, Decimal(str(res["max_amount"] + 0.01)), date(2024, 4, 1), duration)
+        assert at["recommendation"] == "Safe" and over["recommendation"] != "Safe"
+
+    # Baseline below the buffer before the decision starts -> infeasible
+    res = SimulationEngine.max_affordable_amount(Decimal(0), df, "ONE_TIME", date(2024, 6, 1))
+    assert not res["feasible"] and res["max_amount"] == 0.0
+    print("SUCCESS: Max Affordable Solver Verified")
+
+def test_monte_carlo():
+    print("Testing Monte Carlo Runway...")
+
+    history = pd.DataFrame({
+        "month": [f"2023-{m:02d}" for m in range(1, 13)],
+        "net_cashflow": [800.0, -1200.0, 500.0, 300.0, -900.0, 1000.0, 200.0, -400.0, 600.0, -100.0, 700.0, -300.0],
+    })
+    res = SimulationEngine.monte_carlo(Decimal(1000), history, months=24, n_paths=10_000, seed=7)
+    assert res == SimulationEngine.monte_carlo(Decimal(1000), history, months=24, n_paths=10_000, seed=7), "Seeded runs must match"
+    assert len(res["bands"]) == 24 and res["bands"][0]["month"] == "2024-01"
+    assert all(b["p5"] <= b["p50"] <= b["p95"] for b in res["bands"])
+    assert 0 < res["overdraft_probability"] < 1
+    assert 0 <= res["expected_runway_months"] <= 24
+
+    # A constant history has no spread: every path is the deterministic one
+    flat = history.assign(net_cashflow=100.0)
+    res = SimulationEngine.monte_carlo(Decimal(1000), flat, months=6, n_paths=1000, seed=1)
+    assert res["overdraft_probability"] == 0 and res["bands"][-1]["p5"] == res["bands"][-1]["p95"] == 1600.0
+
+    # A decision can only make things worse
+    decision = {"decision_type": "RECURRING", "amount": Decimal(250), "start_date": date(2024, 1, 1)}
+    res = SimulationEngine.monte_carlo(Decimal(1000), flat, months=12, n_paths=1000, seed=1, decision=decision)
+    assert res["baseline_overdraft_probability"] == 0 and res["overdraft_probability"] == 1.0
+    assert res["expected_runway_months"] == 6 # 1000 - 150/month goes negative in month 7
+    print("SUCCESS: Monte Carlo Verified")
+
+def test_scenario_costs():
+    print("Testing Scenario Modification Costs...")
+    import numpy as np
+    from app.models.database_schema import ScenarioModification
+    from app.services.scenarios import modification_costs
+    from app.services.simulation_engine import forecast_arrays
+
+    df = pd.DataFrame({
+        "forecast_month": ["2024-03", "2024-04", "2024-05", "2024-06"],
+        "predicted_cashflow": [500.0, 500.0, 500.0, 500.0]
+    })
+    month_idx, _ = forecast_arrays(df)
+
+    def mod(t, start, end=None, **params):
+        return ScenarioModification(modification_type=t, amount=Decimal(100), start_date=start, end_date=end, parameters=params)
+
+    assert modification_costs(month_idx, mod("RECURRING", date(2024, 4, 1), date(2024, 5, 31))).tolist() == [0, 100, 100, 0]
+    assert modification_costs(month_idx, mod("EMI", date(2024, 3, 1), date(2024, 4, 30))).tolist() == [100, 100, 0, 0]
+    assert modification_costs(month_idx, mod("EMI", date(2024, 4, 1), duration_months=3)).tolist() == [0, 100, 100, 100]
+
+    # A scenario's balances match simulate_decision for the same single modification
+    costs = modification_costs(month_idx, mod("EMI", date(2024, 3, 1), duration_months=4))
+    lowest = (2000 + np.cumsum(df["predicted_cashflow"].to_numpy() - costs)).min()
+    res = SimulationEngine.simulate_decision(Decimal(2000), df, "EMI", Decimal(100), date(2024, 3, 1), 4)
+    assert res["projected_impact"]["lowest_balance"] == lowest
+    print("SUCCESS: Scenario Costs Verified")
+
+def scenario_test_export():
+    """Six months of steady history (Jan-Jun 2024): +3100 net per month."""
+    rows = []
+    for month in range(1, 7):
+        rows += [
+            (f"2024-{month:02d}-01", "Salary", 5000),
+            (f"2024-{month:02d}-03", "Rent", -1500),
+            (f"2024-{month:02d}-15", "Groceries", -400),
+        ]
+    return rows
+
+
+async def backdate_data_change(db, user_id):
+    """
+    SQLite timestamps have one-second resolution, so rows written in the same
+    second as an upload count as stale. Moving the data change into the past
+    lets a check store series right after uploading.
+    """
+    from datetime import datetime
+    from sqlalchemy import update
+    from app.models.database_schema import UserDataVersion
+
+    await db.execute(
+        update(UserDataVersion).where(UserDataVersion.user_id == user_id).values(updated_at=datetime(2000, 1, 1))
+    )
+    await db.commit()
+
+
+def test_scenario_compare():
+    print("Testing Scenario Comparison...")
+    import asyncio
+    import numpy as np
+    from sqlalchemy import select, update, delete
+    from app.models.database_schema import CashflowForecast, FinancialAccount, User
+    from app.schemas.common import ScenarioCreate, ScenarioModificationCreate
+    from app.services.batch_forecasting import run_batch_forecasts
+    from app.services.ingestion import IngestionService
+    from app.services.scenarios import ScenarioService, ScenarioNotFound
+    from verify_support import temp_database, create_user, csv_bytes, api_client
+
+    def recurring(amount, start):
+        return ScenarioModificationCreate(name="Recurring", modification_type="RECURRING", amount=Decimal(amount), start_date=start)
+
+    def close(values, expected):
+        assert len(values) == len(expected), (values, expected)
+        for v, e in zip(values, expected):
+            assert (v is None and e is None) or abs(v - e) < 0.05, (values, expected)
+
+    async def run():
+        async with temp_database() as sessions:
+            async with sessions() as db:
+                user_id, account_id = await create_user(db)
+                await IngestionService.process_csv_upload(db, user_id, account_id, csv_bytes(scenario_test_export()))
+                await backdate_data_change(db, user_id)
+
+                rent = await ScenarioService.create_scenario(db, ScenarioCreate(
+                    user_id=user_id, name="Rent hike", modifications=[recurring(200, date(2024, 7, 1))]
+                ))
+                gap = await ScenarioService.create_scenario(db, ScenarioCreate(
+                    user_id=user_id, name="Gap", modifications=[recurring(100, date(2024, 8, 1))]
+                ))
+                far = await ScenarioService.create_scenario(db, ScenarioCreate(
+                    user_id=user_id, name="Far", modifications=[recurring(50, date(2024, 7, 1))]
+                ))
+                rent_delta = [-200.0 * (i + 1) for i in range(12)]
+
+                # No batch rows yet: computed baseline, stored scenario series
+                comparison = await ScenarioService.compare(db, user_id, [rent.id])
+                baseline, scenario = comparison.series
+                assert comparison.months == [f"2024-{m:02d}" for m in range(7, 13)] + [f"2025-{m:02d}" for m in range(1, 7)]
+                assert (baseline.source, scenario.source) == ("computed", "stored")
+                close(baseline.balance, [3100.0 * (i + 1) for i in range(12)])
+                close(scenario.delta_vs_baseline, rent_delta)
+                assert scenario.min_balance_month == "2024-07" and abs(scenario.min_balance - 2900.0) < 0.05
+                assert abs(scenario.min_balance_delta - -200.0) < 0.05
+
+                # The nightly batch's rows become the baseline
+                await run_batch_forecasts(db)
+                baseline, scenario = (await ScenarioService.compare(db, user_id, [rent.id])).series
+                assert (baseline.source, scenario.source) == ("stored", "stored")
+                close(scenario.delta_vs_baseline, rent_delta)
+
+                # ... unless the user forecasts with another model than the one the series were stored with
+                await db.execute(update(User).where(User.id == user_id).values(preferences={"forecast_model": "median"}))
+                await db.commit()
+                assert {s.source for s in (await ScenarioService.compare(db, user_id, [rent.id])).series} == {"computed"}
+                await db.execute(update(User).where(User.id == user_id).values(preferences={}))
+                await db.commit()
+
+                # ... or the cash on hand has changed since
+                account = update(FinancialAccount).where(FinancialAccount.id == account_id)
+                await db.execute(account.values(current_balance=Decimal("100")))
+                await db.commit()
+                baseline, scenario = (await ScenarioService.compare(db, user_id, [rent.id])).series
+                assert (baseline.source, scenario.source) == ("computed", "computed")
+                close(baseline.balance, [100 + 3100.0 * (i + 1) for i in range(12)])
+                await db.execute(account.values(current_balance=Decimal("0")))
+                await db.commit()
+                assert {s.source for s in (await ScenarioService.compare(db, user_id, [rent.id])).series} == {"stored"}
+
+                # Stored series are aligned on the baseline's months: a missing month is null,
+                # rows outside the axis are ignored
+                f = CashflowForecast
+                await db.execute(delete(f).where(f.scenario_id == gap.id, f.forecast_date == date(2024, 7, 1)))
+                rows = (await db.execute(select(f.id, f.forecast_date).where(f.scenario_id == far.id))).all()
+                for row_id, d in rows:
+                    await db.execute(update(f).where(f.id == row_id).values(forecast_date=d.replace(year=d.year + 10)))
+                await db.commit()
+
+                comparison = await ScenarioService.compare(db, user_id, [rent.id, gap.id, far.id])
+                assert [s.name for s in comparison.series] == ["Baseline", "Rent hike", "Gap", "Far"]
+                _, _, gap_series, far_series = comparison.series
+                assert gap_series.balance[0] is None and gap_series.delta_vs_baseline[0] is None
+                close(gap_series.delta_vs_baseline[1:], [-100.0 * (i + 1) for i in range(11)])
+                assert gap_series.min_balance_month == "2024-08"
+                # NaN everywhere: no minimum rather than an error
+                assert far_series.balance == [None] * 12 and far_series.min_balance is None
+                assert far_series.min_balance_month is None and far_series.min_balance_delta is None
+
+                # New data makes every stored series stale: all computed from the new baseline
+                await IngestionService.process_csv_upload(
+                    db, user_id, account_id, csv_bytes([("2024-06-20", "Bonus", 3000)])
+                )
+                comparison = await ScenarioService.compare(db, user_id, [rent.id, gap.id, far.id])
+                assert {s.source for s in comparison.series} == {"computed"}
+                baseline, rent_series, gap_series, far_series = comparison.series
+                close(rent_series.delta_vs_baseline, rent_delta)
+                close(gap_series.delta_vs_baseline, [0.0] + [-100.0 * (i + 1) for i in range(11)])
+                close(far_series.delta_vs_baseline, [-50.0 * (i + 1) for i in range(12)])
+
+                try:
+                    await ScenarioService.compare(db, user_id, [uuid.uuid4()])
+                    raise AssertionError("Expected ScenarioNotFound")
+                except ScenarioNotFound:
+                    pass
+
+            with api_client(sessions) as client:
+                url = "/api/v1/simulation/compare"
+                params = {"user_id": str(user_id), "scenario_ids": [str(rent.id), str(rent.id)]}
+                response = client.get(url, params=params)
+                assert response.status_code == 200, response.text
+                body = response.json()
+                assert [s["name"] for s in body["series"]] == ["Baseline", "Rent hike"]  # duplicates dropped
+                assert client.get(url, params=params, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+                # A scenario's ETag follows the balance its series is computed from
+                scenario_url = f"/api/v1/simulation/scenarios/{rent.id}"
+                before = client.get(scenario_url)
+                async with sessions() as db:
+                    await db.execute(
+                        update(FinancialAccount).where(FinancialAccount.id == account_id).values(current_balance=Decimal("75"))
+                    )
+                    await db.commit()
+                after = client.get(scenario_url, headers={"If-None-Match": before.headers["etag"]})
+                assert after.status_code == 200
+                assert Decimal(after.json()["forecast"]["data_points"][0]["predicted_balance"]) - Decimal(
+                    before.json()["forecast"]["data_points"][0]["predicted_balance"]
+                ) == 75
+                missing = client.get(url, params={"user_id": str(user_id), "scenario_ids": [str(uuid.uuid4())]})
+                assert missing.status_code == 404
+
+    asyncio.run(run())
+    print("SUCCESS: Scenario Comparison Verified")
+
+
+def test_scenario_incremental_updates():
+    print("Testing Incremental Scenario Updates...")
+    import asyncio
+    from sqlalchemy import select, update
+    from app.models.database_schema import CashflowForecast, FinancialAccount, User
+    from app.schemas.common import ScenarioCreate, ScenarioModificationCreate
+    from app.services.ingestion import IngestionService
+    from app.services.scenarios import ScenarioService
+    from verify_support import temp_database, create_user, csv_bytes
+
+    def modification(name, kind, amount, start, **extra):
+        return ScenarioModificationCreate(name=name, modification_type=kind, amount=Decimal(amount), start_date=start, **extra)
+
+    async def stored(db, scenario_id):
+        f = CashflowForecast
+        result = await db.execute(
+            select(f.id, f.forecast_date, f.projected_balance, f.projected_income, f.projected_expense,
+                   f.confidence_interval_lower, f.confidence_interval_upper)
+            .where(f.scenario_id == scenario_id).order_by(f.forecast_date)
+        )
+        return [tuple(row) for row in result.all()]
+
+    def values(rows):
+        return [tuple(round(float(v), 2) for v in row[2:]) for row in rows]
+
+    async def assert_matches_rebuild(db, scenario_id):
+        incremental = await stored(db, scenario_id)
+        scenario = await ScenarioService._get(db, scenario_id)
+        await ScenarioService.recompute(db, scenario)
+        await db.commit()
+        rebuilt = await stored(db, scenario_id)
+        assert [r[1] for r in incremental] == [r[1] for r in rebuilt]
+        assert values(incremental) == values(rebuilt), (values(incremental), values(rebuilt))
+        return rebuilt
+
+    async def run():
+        async with temp_database() as sessions:
+            async with sessions() as db:
+                user_id, account_id = await create_user(db)
+                await IngestionService.process_csv_upload(db, user_id, account_id, csv_bytes(scenario_test_export()))
+                await backdate_data_change(db, user_id)
+
+                # A scenario may start without modifications
+                scenario = await ScenarioService.create_scenario(db, ScenarioCreate(user_id=user_id, name="Plan"))
+                assert scenario.modification_count == 0
+                rows = await stored(db, scenario.id)
+                assert len(rows) == 12
+
+                steps = [
+                    lambda: ScenarioService.add_modification(
+                        db, scenario.id, modification("Car", "EMI", 250, date(2024, 8, 1), duration_months=4)),
+                    lambda: ScenarioService.add_modification(
+                        db, scenario.id, modification("Trip", "ONE_TIME", 1200, date(2024, 10, 1))),
+                    lambda: ScenarioService.add_modification(
+                        db, scenario.id, modification("Gym", "RECURRING", 60, date(2024, 7, 1))),
+                ]
+                for step in steps:
+                    await step()
+                    ids = [r[0] for r in await stored(db, scenario.id)]
+                    # Shifted in place, not recomputed
+                    assert ids == [r[0] for r in rows]
+                    rows = await assert_matches_rebuild(db, scenario.id)
+
+                current = await ScenarioService.get_scenario(db, scenario.id)
+                by_name = {m.name: m.id for m in current.modifications}
+
+                await ScenarioService.update_modification(
+                    db, scenario.id, by_name["Gym"],
+                    modification("Gym", "RECURRING", 80, date(2024, 9, 1), end_date=date(2025, 2, 28)),
+                )
+                assert [r[0] for r in await stored(db, scenario.id)] == [r[0] for r in rows]
+                rows = await assert_matches_rebuild(db, scenario.id)
+
+                await ScenarioService.delete_modification(db, scenario.id, by_name["Trip"])
+                assert [r[0] for r in await stored(db, scenario.id)] == [r[0] for r in rows]
+                rows = await assert_matches_rebuild(db, scenario.id)
+
+                # New data makes the stored series stale, so the next edit rebuilds it in full
+                # (SQLite timestamps have one-second resolution; the series check treats a data
+                # change in the same second as the rows as newer)
+                await IngestionService.process_csv_upload(
+                    db, user_id, account_id, csv_bytes([("2024-06-20", "Bonus", 3000)])
+                )
+                await ScenarioService.add_modification(
+                    db, scenario.id, modification("Phone", "ONE_TIME", 900, date(2024, 11, 1))
+                )
+                rebuilt = await stored(db, scenario.id)
+                assert not {r[0] for r in rebuilt} & {r[0] for r in rows}
+                assert values(rebuilt) != values(rows)
+                rows = await assert_matches_rebuild(db, scenario.id)
+                await backdate_data_change(db, user_id)
+
+                # So do a new account balance and another forecast model, neither of which bumps the data version
+                await db.execute(
+                    update(FinancialAccount).where(FinancialAccount.id == account_id).values(current_balance=Decimal("500"))
+                )
+                await db.commit()
+                read = await ScenarioService.get_scenario(db, scenario.id)
+                rebuilt = await stored(db, scenario.id)
+                assert not {r[0] for r in rebuilt} & {r[0] for r in rows}
+                assert [round(float(a[2] - b[2]), 2) for a, b in zip(rebuilt, rows)] == [500.0] * len(rows)
+                assert [p.predicted_balance for p in read.forecast.data_points] == [r[2] for r in rebuilt]
+                rows = rebuilt
+
+                await db.execute(update(User).where(User.id == user_id).values(preferences={"forecast_model": "median"}))
+                await db.commit()
+                await ScenarioService.get_scenario(db, scenario.id)
+                rebuilt = await stored(db, scenario.id)
+                assert not {r[0] for r in rebuilt} & {r[0] for r in rows}
+                assert await ScenarioService.get_scenario(db, scenario.id) == await ScenarioService.get_scenario(db, scenario.id)
+                assert [r[0] for r in await stored(db, scenario.id)] == [r[0] for r in rebuilt]
+
+    asyncio.run(run())
+    print("SUCCESS: Incremental Scenario Updates Verified")
+
+
 if __name__ == "__main__":
     test_simulation()
+    test_batch_simulation()
+    test_max_affordable()
+    test_monte_carlo()
+    test_scenario_costs()
+    test_scenario_compare()
+    test_scenario_incremental_updates()
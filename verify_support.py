@@ -0,0 +1,120 @@
+import os
+import uuid
+import shutil
+import tempfile
+import contextlib
+from decimal import Decimal
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.models.database_schema import Base, User, FinancialAccount, AccountType
+
+# The database shipped with the repo (created before fingerprints/rollups existed)
+SHIPPED_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fin26.db")
+
+
+@contextlib.asynccontextmanager
+async def temp_database(source: Optional[str] = None, prepare: bool = True):
+    """
+    Throwaway SQLite database for the verify scripts, so they never write to
+    fin26.db. Starts empty, or as a copy of `source`. With `prepare`, it is
+    brought up to date the way app startup does it (create_all, upgrade_schema,
+    search index, forecaster registration). Yields a session factory; the engine is exposed on it as
+    `.engine`. Connections aren't pooled, so the database can also be used
+    from api_client's event loop.
+    """
+    from app.services.migrations import upgrade_schema
+    from app.services.search import ensure_search_index
+    from app.services.model_registry import register_forecasters
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "verify.db")
+        if source:
+            shutil.copy(source, path)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        try:
+            if prepare:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                    await upgrade_schema(conn)
+                    await ensure_search_index(conn)
+            session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+            session_factory.engine = engine
+            if prepare:
+                async with session_factory() as session:
+                    await register_forecasters(session)
+            yield session_factory
+        finally:
+            await engine.dispose()
+
+
+@contextlib.contextmanager
+def app_database(session_factory):
+    """Points the app's get_db dependency and the ingestion job manager at `session_factory`."""
+    from app.main import app
+    from app.core.database import get_db
+    from app.services.ingestion_jobs import job_manager
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    previous, job_manager.session_factory = job_manager.session_factory, session_factory
+    try:
+        yield app
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        job_manager.session_factory = previous
+
+
+@contextlib.contextmanager
+def api_client(session_factory):
+    """
+    TestClient for the app on `session_factory` (see app_database). The
+    client isn't entered as a context manager, so app startup (which targets
+    fin26.db) doesn't run.
+    """
+    from fastapi.testclient import TestClient
+
+    with app_database(session_factory) as app:
+        yield TestClient(app)
+
+
+@contextlib.asynccontextmanager
+async def async_api_client(session_factory):
+    """
+    Like api_client, but an httpx.AsyncClient on the caller's event loop, so
+    background tasks started by a request (ingestion jobs) keep running
+    between requests. No lifespan events are sent, so startup doesn't run.
+    """
+    import httpx
+
+    with app_database(session_factory) as app:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://verify") as client:
+            yield client
+
+
+async def create_user(db: AsyncSession) -> tuple:
+    """Adds a user with one checking account. Returns (user_id, account_id)."""
+    user_id, account_id = uuid.uuid4(), uuid.uuid4()
+    db.add(User(id=user_id, email=f"verify_{user_id.hex}@example.com", full_name="Verify User"))
+    db.add(FinancialAccount(
+        id=account_id,
+        user_id=user_id,
+        institution_name="Verify Bank",
+        account_name="Checking",
+        account_type=AccountType.CHECKING,
+        current_balance=Decimal("0"),
+    ))
+    await db.commit()
+    return user_id, account_id
+
+
+def csv_bytes(rows) -> bytes:
+    """A bank export (date, description, amount; expenses negative) for (date, description, amount) tuples."""
+    return pd.DataFrame(rows, columns=["date", "description", "amount"]).to_csv(index=False).encode()